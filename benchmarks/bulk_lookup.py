@@ -0,0 +1,68 @@
+"""
+Compares the two paths of the bulk taxpayer lookup against the local stand-in server: batches sent to
+the batch endpoint, and pipelined concurrent single lookups. Fails when the paths disagree.
+
+    python -m benchmarks.bulk_lookup [--gstins 2000] [--latency 0.02] [--batch-size 100] [--workers 16]
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.synthetic import generate_gstins
+from scripts.mock_api.server import TAX_PAYER_BATCH_PATH, MockApiServer
+from scripts.utils.api_calls import ApiService, Env
+from scripts.utils.cache import CacheMode
+
+
+def run_bulk_lookup(server: MockApiServer, gstins: list, batch_endpoints: dict, workers: int) -> tuple:
+    api_service = ApiService(
+        Env.DEV.value,
+        token="benchmark",
+        pool_size=workers,
+        cache_mode=CacheMode.BYPASS,
+        batch_endpoints=batch_endpoints,
+        base_url=server.base_url,
+    )
+    start_time = time.perf_counter()
+    result = api_service.call_taxpayer_endpoint_bulk(gstins, max_workers=workers)
+    return result, time.perf_counter() - start_time
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gstins", type=int, default=2000, help="Number of GSTINs to look up.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds every request takes.")
+    parser.add_argument("--batch-size", type=int, default=ApiService.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent single lookups.")
+    args = parser.parse_args()
+
+    gstins = generate_gstins(args.gstins)
+    server = MockApiServer(("127.0.0.1", 0), latency=args.latency).start()
+    try:
+        batch_endpoint = {"endpoint": TAX_PAYER_BATCH_PATH, "batch_size": args.batch_size}
+        batch_endpoints = {ApiService.TAX_PAYER_CACHE_KEY: batch_endpoint}
+        outcomes = {
+            "batch endpoint": run_bulk_lookup(server, gstins, batch_endpoints, args.workers),
+            "single lookups": run_bulk_lookup(server, gstins, {}, args.workers),
+        }
+    finally:
+        server.stop()
+
+    failed = False
+    for name, (result, elapsed) in outcomes.items():
+        print(f"{name}: {len(gstins)} GSTINs in {elapsed:.2f}s, {len(gstins) / elapsed:.0f} GSTINs/s")
+        if result.errors:
+            print(f"FAIL: {len(result.errors)} lookups failed, e.g. {next(iter(result.errors.values()))}")
+            failed = True
+
+    (batch_result, _), (single_result, _) = outcomes.values()
+    batch_data = {gstin: response.json() for gstin, response in batch_result.responses.items()}
+    single_data = {gstin: response.json() for gstin, response in single_result.responses.items()}
+    if batch_data != single_data:
+        print("FAIL: the batch endpoint and the single lookups returned different results")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
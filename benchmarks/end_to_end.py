@@ -0,0 +1,203 @@
+"""
+Runs the API tasks end to end against the local mock GST API and reports their throughput in GSTINs/s,
+with the latency, error and throttling rates of the mock API set on the command line.
+
+The mock API listens on the address of the dev environment, which the tasks are run against with a
+temporary settings file: the response cache is bypassed, so every GSTIN is fetched.
+
+    python -m benchmarks.end_to_end [--gstins 2000] [--tasks tax_payer_details ...] [--workers 8]
+        [--latency 0.05] [--distribution lognormal] [--error-rate 0.01] [--throttle-rate 0.01]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+from urllib.parse import urlsplit
+
+from benchmarks.synthetic import generate_gstins, generate_rows, write_excel
+from scripts.mock_api.server import LATENCY_DISTRIBUTIONS, MockApiServer
+from scripts.utils import settings as settings_module
+from scripts.utils.api_calls import ApiService, Env
+
+RETURN_PERIOD = "03-2023"
+
+
+def run_tax_payer_details(directory: str, gstins: int) -> None:
+    from scripts.tasks.tax_payer_details_task import TaxPayerDetailsTask
+
+    with open(os.path.join(directory, "input.csv"), "w") as f:
+        f.write("\n".join(["gstin", *generate_gstins(gstins)]) + "\n")
+    task = TaxPayerDetailsTask()
+    task.set_params(directory)
+    task.execute()
+
+
+def run_tax_filing_status(directory: str, gstins: int) -> None:
+    from scripts.tasks.tax_filing_status import TaxFilingStatusTask
+
+    with open(os.path.join(directory, "input.csv"), "w") as f:
+        f.write("\n".join(["GSTIN", *generate_gstins(gstins)]) + "\n")
+    task = TaxFilingStatusTask()
+    task.set_params(directory, RETURN_PERIOD)
+    task.execute()
+
+
+def run_tax_filing_status_async(directory: str, gstins: int) -> None:
+    from scripts.tasks.tax_filing_status import TaxFilingStatusTask
+
+    with open(os.path.join(directory, "input.csv"), "w") as f:
+        f.write("\n".join(["GSTIN", *generate_gstins(gstins)]) + "\n")
+    task = TaxFilingStatusTask()
+    task.use_async = True
+    task.set_params(directory, RETURN_PERIOD)
+    task.execute()
+
+
+def run_preregister(directory: str, gstins: int) -> None:
+    from scripts.tasks.preregister_file_task import PreRegisterFileProcessingTask
+
+    write_excel(generate_rows(gstins), os.path.join(directory, "input.xlsx"))
+    task = PreRegisterFileProcessingTask()
+    task.set_params(directory)
+    task.execute()
+
+
+# Name of every benchmark and the function running its task on an empty directory with a number of GSTINs.
+TASKS: Dict[str, Callable[[str, int], None]] = {
+    "tax_payer_details": run_tax_payer_details,
+    "tax_filing_status": run_tax_filing_status,
+    "tax_filing_status_async": run_tax_filing_status_async,
+    "preregister": run_preregister,
+}
+
+
+def find_unprocessed_inputs(directory: str) -> list:
+    """
+    Get the input files a task left in its directory instead of moving them to its processed directory.
+    """
+    return [name for name in os.listdir(directory) if name.startswith("input.")]
+
+
+def count_metrics(metrics_dir: str) -> Dict[str, int]:
+    """
+    Sum the retries and status codes the API client recorded in the metrics files of the runs.
+    """
+    totals = {"retries": 0, "429": 0, "5xx": 0}
+    for name in os.listdir(metrics_dir):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(metrics_dir, name)) as f:
+            for stats in json.load(f)["endpoints"].values():
+                totals["retries"] += stats["retries"]
+                for code, count in stats["status_codes"].items():
+                    if code == "429":
+                        totals["429"] += count
+                    elif code.startswith("5"):
+                        totals["5xx"] += count
+    return totals
+
+
+def run_benchmark(name: str, gstins: int, settings: dict, server: MockApiServer) -> dict:
+    """
+    Run a task with the settings in a fresh directory. Output of the task is discarded.
+
+    :return: The throughput of the task, the requests the mock API got and the failures of the run.
+    """
+    directory = tempfile.mkdtemp(prefix=f"{name}_")
+    metrics_dir = os.path.join(directory, "metrics")
+    with open(settings_module.SETTINGS_FILE, "w") as f:
+        json.dump({**settings, "metrics_dir": metrics_dir}, f)
+    requests_before = sum(server.request_counts.values())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_time = time.perf_counter()
+            TASKS[name](directory, gstins)
+            seconds = time.perf_counter() - start_time
+        unprocessed = find_unprocessed_inputs(directory)
+        metrics = count_metrics(metrics_dir) if os.path.isdir(metrics_dir) else {}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "benchmark": name,
+        "gstins": gstins,
+        "seconds": round(seconds, 3),
+        "gstins_per_second": round(gstins / seconds, 1),
+        "requests": sum(server.request_counts.values()) - requests_before,
+        "unprocessed": unprocessed,
+        **metrics,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gstins", type=int, default=2000, help="GSTINs of the input file of every task.")
+    parser.add_argument("--tasks", nargs="+", choices=list(TASKS), default=list(TASKS))
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads of the tasks.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean seconds every request takes.")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--spread", type=float, default=0.5, help="Uniform relative spread or lognormal sigma.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with a 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of the 429 responses.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latencies and faults.")
+    parser.add_argument("--no-batch", dest="batch", action="store_false", help="Do not serve the batch endpoints.")
+    parser.add_argument("--output", help="Results file to write (optional).")
+    args = parser.parse_args()
+
+    address = urlsplit(ApiService.BASE_URLS[Env.DEV.value])
+    server = MockApiServer(
+        (address.hostname, address.port),
+        latency=args.latency,
+        batch=args.batch,
+        distribution=args.distribution,
+        spread=args.spread,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    ).start()
+    settings = {
+        "environment": Env.DEV.value,
+        Env.DEV.value: {"token": "mock-token"},
+        "cache_mode": "bypass",
+        "max_workers": args.workers,
+    }
+    settings_dir = tempfile.mkdtemp(prefix="end_to_end_settings_")
+    settings_module.SETTINGS_FILE = os.path.join(settings_dir, "settings.json")
+
+    results, failures = [], []
+    try:
+        print(f"Mock API on {server.base_url}: {args.distribution} latency of {args.latency}s mean")
+        for name in args.tasks:
+            result = run_benchmark(name, args.gstins, settings, server)
+            results.append(result)
+            if result["unprocessed"]:
+                failures.append(f"{name}: {', '.join(result['unprocessed'])} not processed")
+            faults = f"{result.get('429', 0)} throttled, {result.get('5xx', 0)} errors"
+            print(
+                f"  {name:<24} {result['gstins']:>7} GSTINs {result['seconds']:>8.2f}s "
+                f"{result['gstins_per_second']:>8.1f} GSTINs/s {result['requests']:>7} requests  {faults}, "
+                f"{result.get('retries', 0)} retries"
+            )
+    finally:
+        server.stop()
+        shutil.rmtree(settings_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"arguments": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""
+Times the file layer and the GSTIN utilities on synthetic inputs of 10k, 100k and 1M rows, and records
+the wall time and peak memory of every case to a results file. Fails when a case is slower or uses more
+memory than in a baseline results file by more than the allowed regression. The baseline defaults to
+benchmarks/results/file_layer_baseline.json; replace it with the results of a run on the machine the
+benchmark is compared on, with --output.
+
+Every case runs in a fresh interpreter, so its peak memory is not inflated by the cases before it.
+The inputs are generated once per size and reused by later runs.
+
+    python -m benchmarks.file_layer [--sizes 10000 100000 1000000] [--benchmarks csv_split ...]
+        [--baseline FILE] [--max-regression 0.25] [--output FILE] [--data-dir DIR] [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+BASELINE_FILE = os.path.join(RESULTS_DIR, "file_layer_baseline.json")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "automation-benchmarks")
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_MAX_REGRESSION = 0.25
+# Slower cases are only a regression above this many seconds, so the noise of fast cases is ignored.
+MIN_REGRESSION_SECONDS = 0.05
+# Files the inputs are split into, so every size produces the same number of chunks.
+SPLIT_CHUNKS = 10
+
+
+def prepare_csv_split(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    from scripts.files.csv import CsvFile
+
+    return lambda: CsvFile(paths["csv"]).split(work_dir, max(1, rows // SPLIT_CHUNKS))
+
+
+def prepare_excel_split(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    from scripts.files.excel import ExcelFile
+
+    return lambda: ExcelFile(paths["xlsx"]).split(work_dir, max(1, rows // SPLIT_CHUNKS))
+
+
+def prepare_excel_read(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    from scripts.files.excel import ExcelFile
+
+    return lambda: ExcelFile(paths["xlsx"]).read()
+
+
+def prepare_excel_read_cached(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    from scripts.files.excel import ExcelFile
+    from scripts.files.input_cache import InputCache
+
+    # The first read parses the file and stores it, the timed one loads it from the cache.
+    excel_file = ExcelFile(paths["xlsx"], cache=InputCache(os.path.join(work_dir, "input_cache")))
+    excel_file.read()
+    return excel_file.read
+
+
+def prepare_combine_files(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    from scripts.tasks.file_combine_task import FileCombineTask
+
+    task = FileCombineTask()
+    task.input_dir = paths["parts"]
+    task.output_file = os.path.join(work_dir, "combined.xlsx")
+    return task.execute
+
+
+def get_preregister_task():
+    from scripts.tasks.preregister_file_task import PreRegisterFileProcessingTask
+
+    # The constructor sets up the API client from the settings, which the cleaning does not use.
+    task = PreRegisterFileProcessingTask.__new__(PreRegisterFileProcessingTask)
+    task.input_cache = None
+    return task
+
+
+def prepare_clean_file(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    task = get_preregister_task()
+    return lambda: task.clean_file(paths["xlsx"])
+
+
+def prepare_create_duplicate_dfs(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    import pandas as pd
+
+    task = get_preregister_task()
+    df = pd.read_csv(paths["csv"], dtype={"phone_number": str})
+    gstin_duplicates_df = df[df.duplicated(subset=["gstin"], keep=False)]
+    phone_number_duplicates_df = df[df.duplicated(subset=["phone_number"], keep=False)]
+
+    def run():
+        task.create_duplicate_dfs(gstin_duplicates_df, "gstin")
+        task.create_duplicate_dfs(phone_number_duplicates_df, "phone_number")
+
+    return run
+
+
+def prepare_validate_gstin(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    import pandas as pd
+
+    from scripts.exceptions import ValidationError
+    from scripts.utils.gstin import validate_gstin
+
+    gstins = pd.read_csv(paths["csv"], usecols=["gstin"])["gstin"].tolist()
+
+    def run():
+        for gstin in gstins:
+            try:
+                validate_gstin(gstin)
+            except ValidationError:
+                pass
+
+    return run
+
+
+def prepare_validate_gstins(paths: Dict[str, str], rows: int, work_dir: str) -> Callable[[], None]:
+    import pandas as pd
+
+    from scripts.utils.gstin import validate_gstins
+
+    gstins = pd.read_csv(paths["csv"], usecols=["gstin"])["gstin"]
+    return lambda: validate_gstins(gstins)
+
+
+# Name of every benchmark and the function preparing it: it gets the paths of the inputs, the number
+# of rows and an empty directory for output files, and returns the function to time.
+BENCHMARKS: Dict[str, Callable[[Dict[str, str], int, str], Callable[[], None]]] = {
+    "csv_split": prepare_csv_split,
+    "excel_split": prepare_excel_split,
+    "excel_read": prepare_excel_read,
+    "excel_read_cached": prepare_excel_read_cached,
+    "combine_files": prepare_combine_files,
+    "preregister_clean_file": prepare_clean_file,
+    "preregister_create_duplicate_dfs": prepare_create_duplicate_dfs,
+    "validate_gstin": prepare_validate_gstin,
+    "validate_gstins": prepare_validate_gstins,
+}
+
+
+def get_peak_memory_mb() -> Optional[float]:
+    """
+    Get the peak resident memory of the process, or None where it can not be measured.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(benchmark: str, rows: int, data_dir: str) -> dict:
+    """
+    Run a single case in this interpreter. Output of the code under test is discarded.
+
+    :return: The wall time in seconds and the peak memory of the process in MB.
+    """
+    from benchmarks.synthetic import prepare_inputs
+
+    paths = prepare_inputs(data_dir, rows)
+    work_dir = tempfile.mkdtemp(prefix=f"{benchmark}_")
+    try:
+        function = BENCHMARKS[benchmark](paths, rows, work_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_time = time.perf_counter()
+            function()
+            seconds = time.perf_counter() - start_time
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"seconds": seconds, "peak_memory_mb": get_peak_memory_mb()}
+
+
+def measure(benchmark: str, rows: int, data_dir: str, repeat: int) -> dict:
+    """
+    Run a case in fresh interpreters and keep its best wall time and peak memory.
+
+    :return: The result of the case.
+    """
+    runs = []
+    for _ in range(max(1, repeat)):
+        command = [sys.executable, "-m", "benchmarks.file_layer", "--run-case", benchmark, str(rows), data_dir]
+        output = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True)
+        if output.returncode != 0:
+            raise RuntimeError(f"{benchmark} with {rows} rows failed:\n{output.stderr}")
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    peak_memory = [run["peak_memory_mb"] for run in runs if run["peak_memory_mb"] is not None]
+    return {
+        "benchmark": benchmark,
+        "rows": rows,
+        "seconds": round(min(run["seconds"] for run in runs), 4),
+        "peak_memory_mb": round(min(peak_memory), 1) if peak_memory else None,
+    }
+
+
+def find_regressions(result: dict, baseline: Optional[dict], max_regression: float) -> list:
+    """
+    Compare the result of a case with its baseline.
+
+    :return: Descriptions of the regressions, empty if there are none.
+    """
+    if baseline is None:
+        return []
+    regressions = []
+    limit = baseline["seconds"] * (1 + max_regression)
+    if result["seconds"] > max(limit, baseline["seconds"] + MIN_REGRESSION_SECONDS):
+        regressions.append(f"wall time {result['seconds']:.3f}s > {baseline['seconds']:.3f}s baseline")
+    if result["peak_memory_mb"] is not None and baseline.get("peak_memory_mb") is not None:
+        if result["peak_memory_mb"] > baseline["peak_memory_mb"] * (1 + max_regression):
+            regressions.append(
+                f"peak memory {result['peak_memory_mb']:.0f}MB > {baseline['peak_memory_mb']:.0f}MB baseline"
+            )
+    return regressions
+
+
+def main() -> int:
+    if len(sys.argv) == 5 and sys.argv[1] == "--run-case":
+        print(json.dumps(run_case(sys.argv[2], int(sys.argv[3]), sys.argv[4])))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of rows.")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE if os.path.exists(BASELINE_FILE) else None,
+        help="Results file of an earlier run to compare with. Defaults to benchmarks/results/file_layer_baseline.json.",
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=DEFAULT_MAX_REGRESSION,
+        help="Allowed increase of the wall time and peak memory over the baseline, as a fraction.",
+    )
+    parser.add_argument("--output", help="Results file to write. Defaults to a new file in benchmarks/results.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory of the generated inputs.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the best one is kept.")
+    args = parser.parse_args()
+
+    baselines = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baselines = {(result["benchmark"], result["rows"]): result for result in json.load(f)["results"]}
+
+    from benchmarks.synthetic import prepare_inputs
+
+    results, failures = [], []
+    for rows in args.sizes:
+        print(f"Preparing the inputs of {rows} rows...")
+        prepare_inputs(args.data_dir, rows)
+        for benchmark in args.benchmarks:
+            result = measure(benchmark, rows, args.data_dir, args.repeat)
+            results.append(result)
+            regressions = find_regressions(result, baselines.get((benchmark, rows)), args.max_regression)
+            failures += [f"{benchmark} ({rows} rows): {regression}" for regression in regressions]
+            peak_memory = f"{result['peak_memory_mb']:.0f}MB" if result["peak_memory_mb"] is not None else "-"
+            status = "REGRESSION" if regressions else "ok"
+            print(f"  {benchmark:<34} {rows:>9} rows {result['seconds']:>9.3f}s {peak_memory:>8}  {status}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"file_layer_{datetime.now():%Y%m%d%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        summary = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        json.dump(summary, f, indent=2)
+    print(f"Results written to {output}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Measures the startup time of the executor: importing it and discovering the tasks, i.e. everything
+that runs before the task menu is shown. Fails when the budget is exceeded or when a heavy
+dependency of the tasks is imported before a task is picked.
+
+    python -m benchmarks.startup [--budget SECONDS] [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET = 0.5
+DEFAULT_RUNS = 5
+
+# Modules only the tasks, signing in or the banner need; none of them may be imported to discover the tasks.
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl", "halo", "aiohttp", "requests", "art"]
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import executor
+tasks = executor.load_tasks()
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "tasks": len(tasks), "imported": [m for m in %r if m in sys.modules]}))
+""" % (
+    HEAVY_MODULES,
+)
+
+
+def measure_startup() -> dict:
+    """
+    Start a fresh interpreter that imports the executor and discovers the tasks.
+
+    :return: The elapsed seconds, the number of tasks found and the heavy modules imported.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Maximum median startup in seconds.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Number of interpreters to start.")
+    args = parser.parse_args()
+
+    results = [measure_startup() for _ in range(max(1, args.runs))]
+    median = statistics.median(result["elapsed"] for result in results)
+    imported = sorted({module for result in results for module in result["imported"]})
+    print(f"Tasks found: {results[0]['tasks']}")
+    print(f"Startup: median {median:.3f}s over {len(results)} runs (budget {args.budget:.3f}s)")
+
+    failed = False
+    if imported:
+        print(f"FAIL: imported before a task was picked: {', '.join(imported)}")
+        failed = True
+    if median > args.budget:
+        print("FAIL: startup budget exceeded")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
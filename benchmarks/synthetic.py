@@ -0,0 +1,111 @@
+"""
+Synthetic inputs for the benchmarks, shaped like the files the tasks process.
+"""
+import os
+import random
+import string
+from typing import Dict, List
+
+import pandas as pd
+
+from scripts.files.writers import ExcelRowWriter
+from scripts.utils.gstin import calculate_check_digit
+
+COLUMNS = ["gstin", "phone_number", "name", "email"]
+# Share of rows with an invalid GSTIN, a duplicated GSTIN and a duplicated phone number.
+INVALID_SHARE = 0.03
+DUPLICATE_SHARE = 0.02
+
+
+def generate_gstins(count: int, state_code: str = "27") -> List[str]:
+    """
+    Generate valid, distinct GSTINs: the PAN letters and digits encode the index of the GSTIN.
+
+    :param count: Number of GSTINs, at most 26 ** 5 * 10000.
+    :param state_code: State code of the GSTINs.
+    :return: The GSTINs.
+    """
+    gstins = []
+    for i in range(count):
+        prefix, number = divmod(i, 10000)
+        letters = ""
+        for _ in range(5):
+            prefix, letter = divmod(prefix, 26)
+            letters = string.ascii_uppercase[letter] + letters
+        gstin = f"{state_code}{letters}{number:04d}A1Z"
+        gstins.append(gstin + calculate_check_digit(gstin))
+    return gstins
+
+
+def generate_rows(count: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate pre-registration rows with some invalid GSTINs and duplicated GSTINs and phone numbers,
+    like the user files the tasks get.
+
+    :param count: Number of rows.
+    :param seed: Seed of the random choices, so the same rows are generated every time.
+    :return: DataFrame with the columns `COLUMNS`.
+    """
+    rng = random.Random(seed)
+    gstins = generate_gstins(count)
+    phone_numbers = [str(9000000000 + i) for i in range(count)]
+    for i in rng.sample(range(count), int(count * INVALID_SHARE)):
+        gstins[i] = gstins[i][:-1] + ("0" if gstins[i][-1] != "0" else "1")
+    for i in rng.sample(range(1, count), int(count * DUPLICATE_SHARE)):
+        gstins[i] = gstins[rng.randrange(i)]
+    for i in rng.sample(range(1, count), int(count * DUPLICATE_SHARE)):
+        phone_numbers[i] = phone_numbers[rng.randrange(i)]
+    return pd.DataFrame(
+        {
+            "gstin": gstins,
+            "phone_number": phone_numbers,
+            "name": [f"Supplier {i}" for i in range(count)],
+            "email": [f"supplier{i}@example.com" for i in range(count)],
+        },
+        columns=COLUMNS,
+    )
+
+
+def write_excel(df: pd.DataFrame, file_path: str) -> None:
+    """
+    Write a DataFrame to an Excel file with a write-only workbook, which is much faster than
+    `DataFrame.to_excel` for large files.
+    """
+    with ExcelRowWriter(file_path, list(df.columns)) as writer:
+        for row in df.itertuples(index=False):
+            writer.write_row(dict(zip(df.columns, row)))
+
+
+def prepare_inputs(data_dir: str, rows: int, parts: int = 10) -> Dict[str, str]:
+    """
+    Create the inputs of a size once and reuse them on later runs.
+
+    :param data_dir: Directory of the generated inputs.
+    :param rows: Number of rows.
+    :param parts: Number of files the rows are spread over for the combine benchmark.
+    :return: Paths of the CSV file, the Excel file and the directory of the parts.
+    """
+    directory = os.path.join(data_dir, str(rows))
+    paths = {
+        "csv": os.path.join(directory, "input.csv"),
+        "xlsx": os.path.join(directory, "input.xlsx"),
+        "parts": os.path.join(directory, "parts"),
+    }
+    done_marker = os.path.join(directory, ".done")
+    if os.path.exists(done_marker):
+        return paths
+
+    os.makedirs(paths["parts"], exist_ok=True)
+    df = generate_rows(rows)
+    df.to_csv(paths["csv"], index=False)
+    write_excel(df, paths["xlsx"])
+    part_size = -(-rows // parts)
+    for i in range(parts):
+        part = df.iloc[i * part_size : (i + 1) * part_size]
+        # Half of the parts are Excel files, like the mixed directories users combine.
+        if i % 2:
+            write_excel(part, os.path.join(paths["parts"], f"part{i + 1}.xlsx"))
+        else:
+            part.to_csv(os.path.join(paths["parts"], f"part{i + 1}.csv"), index=False)
+    open(done_marker, "w").close()
+    return paths
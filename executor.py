@@ -1,33 +1,23 @@
-import importlib
-import inspect
-import pkgutil
-
-from art import text2art
-
-from scripts.tasks.abstract_task import BaseTask
-from scripts.utils.api_calls import Env
+from scripts.tasks.registry import discover_tasks
+from scripts.utils.environments import Env
+from scripts.utils.profiling import PARAMETERS, RunProfiler, get_profiles_directory, write_profile_reports
 from scripts.utils.settings import generate_token, load_settings, save_settings
 from scripts.utils.strings import camel_case_to_sentence
 from scripts.utils.terminal import COLOUR_ORANGE, format_text, get_clean_input
 
 
 def load_tasks():
-    task_modules = {}
-    task_module_names = [name for _, name, _ in pkgutil.iter_modules(["scripts/tasks"])]
-    for modname in task_module_names:
-        module = importlib.import_module(f"scripts.tasks.{modname}")
-        for name, obj in inspect.getmembers(module):
-            if inspect.isclass(obj) and issubclass(obj, BaseTask) and obj != BaseTask:
-                task_modules[name] = obj
-    return task_modules
+    # Only the names and descriptions of the tasks are read here; a task module (and with it pandas,
+    # openpyxl, etc.) is imported when the task is picked.
+    return discover_tasks()
 
 
 def display_menu(task_modules):
     print("\n" + "-" * 40)
     print("       TASK SELECTION MENU")
     print("-" * 40)
-    for i, (task_name, task_class) in enumerate(task_modules.items(), start=1):
-        print(f"{i}. {camel_case_to_sentence(task_name)} - {task_class.description}")
+    for i, (task_name, task_spec) in enumerate(task_modules.items(), start=1):
+        print(f"{i}. {camel_case_to_sentence(task_name)} - {task_spec.description}")
     print(f"{len(task_modules) + 1}. Exit")
     print("-" * 40 + "\n")
 
@@ -46,13 +36,28 @@ def get_user_choice(task_modules):
 
 def run_task(task_modules, choice):
     task_name = list(task_modules.keys())[choice]
-    task_class = task_modules[task_name]
+    task_class = task_modules[task_name].load()
     task = task_class()
-    task.get_params()
-    task.execute()
+    settings = load_settings()
+    if not settings.get("profile"):
+        task.get_params()
+        task.execute()
+        return
+
+    # The time spent waiting for the user's answers is a phase of its own, so it stands apart from the rest.
+    profiler = RunProfiler(task_name, memory=settings.get("profile_memory", True))
+    try:
+        with profiler:
+            with profiler.phase(PARAMETERS):
+                task.get_params()
+            task.execute()
+    finally:
+        write_profile_reports(profiler, get_profiles_directory(task.get_output_directory()))
 
 
 def print_heading():
+    from art import text2art
+
     space = " "
     heading = text2art(f"{space*20} Automation Tasks {space*20}")
     fromated_heading = format_text(heading, colour=COLOUR_ORANGE, bold=True)
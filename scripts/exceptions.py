@@ -4,3 +4,11 @@ class ValidationError(Exception):
     def __init__(self, message, errors=None):
         super().__init__(message)
         self.errors = errors
+
+
+class GstinFetchError(Exception):
+    """Raised when the data for a single GSTIN could not be fetched"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
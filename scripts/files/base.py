@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 
 class BaseFile(ABC):
@@ -9,8 +10,8 @@ class BaseFile(ABC):
         self.file_path = file_path
 
     @abstractmethod
-    def split(self, output_dir: str, chunk_size: int) -> None:
-        """Split the file into chunks."""
+    def split(self, output_dir: str, chunk_size: int) -> List[str]:
+        """Split the file into chunks and return the paths of the chunk files."""
         pass
 
     @abstractmethod
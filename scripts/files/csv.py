@@ -1,37 +1,312 @@
+import mmap
 import os
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
+from ..utils.profiling import READ_INPUT, profile_phase
 from .base import BaseFile
 
+# Bytes read at a time when splitting; the memory a split needs does not grow beyond a few blocks.
+SPLIT_BLOCK_SIZE = 8 * 1024 * 1024
+# Longest record a split accepts. A longer one is almost always a quote that is never closed, which
+# would make the rest of the file a single record.
+MAX_RECORD_BYTES = 64 * 1024 * 1024
+QUOTE = b'"'
+NEWLINE = b"\n"
+
+
+def skip_records(block: bytes, pos: int, end: int, max_records: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Skip the complete records of a block of CSV data from `pos`, which starts a record, up to `end`.
+
+    A newline ends a record unless it is inside a quoted field, which is known from the number of quotes
+    before it in the record: an escaped quote is two quotes, so it does not change the count's parity.
+    Blocks without quotes are counted with a single C-level `count`.
+
+    :param block: Block of CSV data.
+    :param pos: Offset of the first record.
+    :param end: Offset to stop at.
+    :param max_records: Number of records to stop after (optional).
+    :return: Offset after the last skipped record, and the number of skipped records.
+    """
+    if block.find(QUOTE, pos, end) == -1:
+        newlines = block.count(NEWLINE, pos, end)
+        if max_records is None or newlines <= max_records:
+            return block.rfind(NEWLINE, pos, end) + 1 if newlines else pos, newlines
+        for _ in range(max_records):
+            pos = block.find(NEWLINE, pos, end) + 1
+        return pos, max_records
+
+    records, start, in_quotes = 0, pos, False
+    while max_records is None or records < max_records:
+        newline = block.find(NEWLINE, start, end)
+        if newline == -1:
+            break
+        in_quotes ^= block.count(QUOTE, start, newline) % 2 == 1
+        start = newline + 1
+        if not in_quotes:
+            records += 1
+            pos = start
+    return pos, records
+
+
+def find_last_record_end(block: bytes) -> int:
+    """
+    Find the end of the last complete record of a block of CSV data that starts with a record.
+
+    :return: Offset after the record, or 0 if the block has no complete record.
+    """
+    if block.find(QUOTE) == -1:
+        return block.rfind(NEWLINE) + 1
+    return skip_records(block, 0, len(block))[0]
+
+
+def iter_record_blocks(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Regroup blocks of CSV data so every block ends with a complete record, carrying the rest over to the
+    next block. The last block may end with a record without a newline.
+    """
+    pending = b""
+    for block in blocks:
+        if pending:
+            block = pending + block
+        end = find_last_record_end(block)
+        pending = block[end:]
+        if len(pending) > MAX_RECORD_BYTES:
+            raise ValueError(f"A record is longer than {MAX_RECORD_BYTES} bytes; the file may have an unclosed quote.")
+        if end:
+            yield block[:end] if pending else block
+    if pending:
+        yield pending
+
+
+class CsvSplitter:
+    """
+    Splits CSV data into chunk files on record boundaries, copying the rows as they are without parsing them.
+
+    Blocks of the file are fed in order. A record that is not complete at the end of a block is carried
+    over to the next one, so every block is split on its own. The first record is the header and starts
+    every chunk.
+
+        with CsvSplitter(output_dir, chunk_size=100000) as splitter:
+            for block in blocks:
+                splitter.feed(block)
+    """
+
+    def __init__(self, output_dir: str, chunk_size: Optional[int] = None, max_chunk_bytes: Optional[int] = None):
+        """
+        Initialize the CsvSplitter.
+
+        :param output_dir: Directory the chunk files are written to.
+        :param chunk_size: Number of rows per chunk.
+        :param max_chunk_bytes: Size limit of the chunk files in bytes, instead of a number of rows. A chunk
+            only exceeds it when its single row does not fit.
+        """
+        if (chunk_size is None) == (max_chunk_bytes is None):
+            raise ValueError("Either chunk_size or max_chunk_bytes should be given")
+        if (chunk_size or max_chunk_bytes) <= 0:
+            raise ValueError("chunk_size should be greater than 0")
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.header: Optional[bytes] = None
+        self.pending = b""
+        self.rows = 0
+        self.chunk = None
+        self.chunk_rows = 0
+        self.chunk_bytes = 0
+        self.chunk_paths: List[str] = []
+        self.chunk_row_counts: List[int] = []
+
+    def __enter__(self) -> "CsvSplitter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.finish()
+        elif self.chunk is not None:
+            self.chunk.close()
+
+    def feed(self, block: bytes) -> None:
+        """
+        Copy the complete records of the next block of the file to the chunk files.
+        """
+        if self.pending:
+            block = self.pending + block
+        end = find_last_record_end(block)
+        self.pending = block[end:]
+        if len(self.pending) > MAX_RECORD_BYTES:
+            raise ValueError(f"A record is longer than {MAX_RECORD_BYTES} bytes; the file may have an unclosed quote.")
+        self.write_records(block, end)
+
+    def finish(self) -> None:
+        """
+        Write the last record, which has no newline at the end of the file, and close the last chunk.
+        """
+        if self.pending:
+            last_record, self.pending = self.pending, b""
+            if self.header is None:
+                self.header = last_record
+            else:
+                if self.chunk is not None and self.max_chunk_bytes and len(last_record) > self.get_free_bytes():
+                    self.close_chunk()
+                if self.chunk is None:
+                    self.open_chunk()
+                self.chunk.write(last_record)
+                self.add_rows(1, len(last_record))
+        if self.chunk is not None:
+            self.close_chunk()
+
+    def write_records(self, block: bytes, end: int) -> None:
+        """
+        Write the records of the block up to `end` to the chunk files.
+        """
+        pos = 0
+        if self.header is None:
+            if not end:
+                return
+            pos = skip_records(block, 0, end, 1)[0]
+            self.header = block[:pos]
+
+        view = memoryview(block)
+        while pos < end:
+            if self.chunk is None:
+                self.open_chunk()
+            if self.chunk_size:
+                stop, rows = skip_records(block, pos, end, self.chunk_size - self.chunk_rows)
+                full = self.chunk_rows + rows == self.chunk_size
+            else:
+                stop, rows = self.fit_records(block, pos, end)
+                full = stop < end or self.get_free_bytes() == stop - pos
+            self.chunk.write(view[pos:stop])
+            self.add_rows(rows, stop - pos)
+            pos = stop
+            if full:
+                self.close_chunk()
+
+    def fit_records(self, block: bytes, pos: int, end: int) -> Tuple[int, int]:
+        """
+        Find the records from `pos` that fit in the chunk, at least one if the chunk has no rows yet.
+
+        :return: Offset after the last record that fits, and the number of records.
+        """
+        cut = pos + max(self.get_free_bytes(), 0)
+        if cut >= end:
+            return skip_records(block, pos, end)
+        newline = block.rfind(NEWLINE, pos, cut)
+        while newline != -1 and block.count(QUOTE, pos, newline) % 2:
+            newline = block.rfind(NEWLINE, pos, newline)
+        if newline != -1:
+            return skip_records(block, pos, newline + 1)
+        return skip_records(block, pos, end, 0 if self.chunk_rows else 1)
+
+    def get_free_bytes(self) -> int:
+        return self.max_chunk_bytes - len(self.header) - self.chunk_bytes if self.max_chunk_bytes else 0
+
+    def open_chunk(self) -> None:
+        path = os.path.join(self.output_dir, f"chunk{len(self.chunk_paths) + 1}.csv")
+        self.chunk = open(path, "wb")
+        self.chunk.write(self.header)
+        self.chunk_paths.append(path)
+        self.chunk_rows = self.chunk_bytes = 0
+
+    def close_chunk(self) -> None:
+        self.chunk.close()
+        self.chunk = None
+        self.chunk_row_counts.append(self.chunk_rows)
+
+    def add_rows(self, count: int, size: int) -> None:
+        self.rows += count
+        self.chunk_rows += count
+        self.chunk_bytes += size
+
 
 class CsvFile(BaseFile):
     """Class representing a CSV file."""
 
-    def split(self, output_dir: str, chunk_size: int) -> None:
-        """Split the CSV file into chunks."""
+    def split(
+        self,
+        output_dir: str,
+        chunk_size: Optional[int] = None,
+        max_chunk_bytes: Optional[int] = None,
+        use_mmap: bool = False,
+    ) -> List[str]:
+        """
+        Split the CSV file into chunks, each starting with the header row.
+
+        The file is streamed once and its rows are copied byte for byte, without parsing them, so
+        memory stays constant however large the file is. Quoted fields may contain newlines.
+
+        :param output_dir: Directory where the chunks will be saved.
+        :param chunk_size: Number of rows each chunk should contain.
+        :param max_chunk_bytes: Target size of the chunk files in bytes, instead of a number of rows.
+        :param use_mmap: Whether to memory-map the file instead of reading it in blocks.
+        :return: Paths of the chunk files.
+        """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        chunk_number = 1
-        for i, chunk in enumerate(pd.read_csv(self.file_path, chunksize=chunk_size)):
-            base_name = f"chunk{chunk_number}.csv"
-            if i == 0:
-                chunk.to_csv(os.path.join(output_dir, base_name), index=False)
-                column_names = chunk.columns  # Extract column headings from the first chunk
-            else:
-                chunk.to_csv(os.path.join(output_dir, base_name), index=False, header=False)
+        with CsvSplitter(output_dir, chunk_size, max_chunk_bytes) as splitter:
+            for block in self.iter_blocks(use_mmap):
+                splitter.feed(block)
+        return splitter.chunk_paths
 
-            # Append column headings to each split file
-            if i > 0:
-                with open(os.path.join(output_dir, base_name), "r+") as file:
-                    content = file.read()
-                    file.seek(0, 0)
-                    file.write(",".join(column_names) + "\n" + content)
+    def iter_blocks(self, use_mmap: bool = False, block_size: int = SPLIT_BLOCK_SIZE) -> Iterator[bytes]:
+        """
+        Read the file in blocks of bytes.
 
-            chunk_number += 1
+        :param use_mmap: Whether to memory-map the file, so the blocks are copied straight from the page cache.
+        :param block_size: Size of the blocks.
+        """
+        with open(self.file_path, "rb") as f:
+            if use_mmap and os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mapped, "madvise"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    for offset in range(0, len(mapped), block_size):
+                        yield mapped[offset : offset + block_size]
+                return
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    return
+                yield block
 
     def read(self, columns_to_read: Optional[List[str]] = None):
-        df = pd.read_csv(self.file_path, usecols=columns_to_read)
+        with profile_phase(READ_INPUT):
+            df = pd.read_csv(self.file_path, usecols=columns_to_read)
         return df
+
+    def read_columns(self) -> List[str]:
+        """
+        Read the column names from the header row.
+        """
+        return pd.read_csv(self.file_path, nrows=0).columns.tolist()
+
+    def iter_batches(self, batch_size: int, as_text: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Read the file in batches of rows, so only a batch is in memory at a time.
+
+        :param batch_size: Number of rows per batch.
+        :param as_text: Whether to keep the values as text instead of inferring their types.
+        :return: DataFrames of the rows of the file.
+        """
+        with pd.read_csv(self.file_path, chunksize=batch_size, dtype=str if as_text else None) as reader:
+            while True:
+                with profile_phase(READ_INPUT):
+                    batch = next(reader, None)
+                if batch is None:
+                    return
+                yield batch
+
+    def count_rows(self) -> int:
+        """
+        Count the rows of the file without parsing them, like `split` does.
+        """
+        records = 0
+        for block in iter_record_blocks(self.iter_blocks()):
+            records += skip_records(block, 0, len(block))[1]
+            if block[-1:] != NEWLINE:
+                records += 1
+        return max(records - 1, 0)
@@ -1,60 +1,273 @@
 import os
+import posixpath
+import zipfile
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from xml.etree import ElementTree
 
 import pandas as pd
 from openpyxl import load_workbook
 
+from ..utils.profiling import READ_INPUT, WRITE_OUTPUT, profile_phase
 from .base import BaseFile
+from .input_cache import InputCache
+from .writers import ExcelRowWriter
+
+# Worksheet of the workbooks openpyxl writes with a single sheet, like the chunks of a split.
+FIRST_SHEET_PATH = "xl/worksheets/sheet1.xml"
+RELATIONSHIPS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+DOCUMENT_RELATIONSHIPS_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+SPREADSHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def get_relationships(archive: zipfile.ZipFile, part_path: str) -> Dict[str, Tuple[str, str]]:
+    """
+    Get the parts of an Excel file a part refers to, from the part's relationships.
+
+    :param archive: The Excel file.
+    :param part_path: Path of the part in the file, "" for the package itself.
+    :return: Dictionary of the relationship ids to the relationship types and paths of the parts.
+    """
+    folder, name = posixpath.split(part_path)
+    root = ElementTree.fromstring(archive.read(posixpath.join(folder, "_rels", f"{name}.rels")))
+    relationships = {}
+    for relationship in root.iter(f"{RELATIONSHIPS_NS}Relationship"):
+        if relationship.get("TargetMode") == "External":
+            continue
+        target = relationship.get("Target", "")
+        path = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        relationships[relationship.get("Id")] = (relationship.get("Type", ""), path)
+    return relationships
+
+
+def get_active_sheet_path(file_path: str) -> str:
+    """
+    Get the path of the active worksheet in an Excel file, the sheet openpyxl's `Workbook.active` is.
+
+    :param file_path: Path of the Excel file.
+    :return: Path of the worksheet in the file.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        workbook_path = next(
+            path for kind, path in get_relationships(archive, "").values() if kind.endswith("/officeDocument")
+        )
+        workbook = ElementTree.fromstring(archive.read(workbook_path))
+        sheets = workbook.findall(f"{SPREADSHEET_NS}sheets/{SPREADSHEET_NS}sheet")
+        view = workbook.find(f"{SPREADSHEET_NS}bookViews/{SPREADSHEET_NS}workbookView")
+        active = int(view.get("activeTab", 0)) if view is not None else 0
+        sheet = sheets[active if active < len(sheets) else 0]
+        return get_relationships(archive, workbook_path)[sheet.get(f"{DOCUMENT_RELATIONSHIPS_NS}id")][1]
+
+
+def count_sheet_rows(file_path: str, sheet_path: str = FIRST_SHEET_PATH) -> int:
+    """
+    Count the rows of a worksheet by scanning its XML for row elements, without parsing the cells.
+
+    :param file_path: Path of the Excel file.
+    :param sheet_path: Path of the worksheet in the file.
+    :return: Number of rows, including the header row.
+    """
+    count = 0
+    tail = b""
+    with zipfile.ZipFile(file_path) as archive, archive.open(sheet_path) as sheet:
+        while True:
+            block = sheet.read(1024 * 1024)
+            if not block:
+                return count
+            data = tail + block
+            count += data.count(b"<row ") + data.count(b"<row>")
+            # Shorter than the tags, so a tag is never counted twice.
+            tail = data[-4:]
+
+
+def get_column_names(headings: tuple) -> List[str]:
+    """
+    Name the columns of a header row like pandas does: empty headings are named by their position and
+    repeated ones get a suffix, e.g. "gstin.1".
+    """
+    columns = []
+    seen = {}
+    for index, heading in enumerate(headings):
+        column = heading if heading is not None else f"Unnamed: {index}"
+        if column in seen:
+            seen[column] += 1
+            column = f"{column}.{seen[column]}"
+        else:
+            seen[column] = 0
+        columns.append(column)
+    return columns
 
 
 class ExcelFile(BaseFile):
     """Class representing an Excel file."""
 
-    def split(self, output_dir: str, chunk_size: int) -> None:
+    def __init__(self, file_path: str, cache: Optional[InputCache] = None) -> None:
+        """
+        Initialize the ExcelFile.
+
+        :param file_path: Path of the Excel file.
+        :param cache: Cache of parsed files that `read` loads unchanged files from (optional).
+        """
+        super().__init__(file_path)
+        self.cache = cache
+
+    def split(self, output_dir: str, chunk_size: int) -> List[str]:
         """
         Split the Excel file into chunks of the given size and save them to the output directory.
 
+        Rows are streamed from a read-only workbook into write-only chunk workbooks, so memory stays
+        bounded however large the file is. Empty rows at the end of the sheet are dropped. The rows read
+        are checked against the row elements of the sheet's XML, so a stale dimension of the sheet can not
+        drop rows, and the rows in the written chunks are counted again and must match the rows read.
+
         :param output_dir: Directory where the chunks will be saved.
         :param chunk_size: Number of rows each chunk should contain.
+        :return: Paths of the chunk files.
         """
         if chunk_size <= 0:
             raise ValueError("chunk_size should be greater than 0")
 
         output_dir = Path(output_dir)
-
-        workbook = load_workbook(self.file_path)
-        sheet = workbook.active
-        total_rows = sheet.max_row
-        headings = [cell.value for cell in sheet[1]]
         base_name_without_ext = os.path.splitext(os.path.basename(self.file_path))[0]
-        print("\n")
-        for i in range(2, total_rows, chunk_size):
-            data = sheet[i : i + chunk_size] if i == 2 else sheet[i + 1 : i + chunk_size]
-            df = pd.DataFrame(([cell.value for cell in row] for row in data), columns=headings)
-            filepath = output_dir / f"{base_name_without_ext}_chunk_{i // chunk_size + 1}.xlsx"
-            df.to_excel(filepath, index=False)
-            print(filepath)
-            # first_row_data = sheet[i+1]
-            # first_row_values = [cell.value for cell in first_row_data]
-            # print(f"First row content of file chunk_{i // chunk_size + 1}.xlsx: {first_row_values}\n")
-            # last_row_data = sheet[i + chunk_size]
-            # last_row_values = [cell.value for cell in last_row_data]
-            # print(f"Last row content of file chunk_{i // chunk_size + 1}.xlsx: {last_row_values}")
-
-    def read(self, sheet: Optional[str] = None, columns_to_read: Optional[List[str]] = None) -> pd.DataFrame:
-        """
-        Read data from the Excel file.
+        chunk_paths = []
+        rows_read = 0
+        writer = None
+        workbook = load_workbook(self.file_path, read_only=True)
+        try:
+            sheet = workbook.active
+            # The rows of the sheet's dimension are not read past, and it is wrong in some files.
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            headings = list(next(rows, None) or [])
+            empty_rows = 0
+            print("\n")
+            for row in rows:
+                # Empty rows are only written once a row with values follows them.
+                if all(value is None for value in row):
+                    empty_rows += 1
+                    continue
+                for values in [()] * empty_rows + [row]:
+                    if writer is None or writer.rows_written == chunk_size:
+                        if writer is not None:
+                            writer.close()
+                        filepath = output_dir / f"{base_name_without_ext}_chunk_{len(chunk_paths) + 1}.xlsx"
+                        writer = ExcelRowWriter(str(filepath), headings)
+                        chunk_paths.append(str(filepath))
+                        print(filepath)
+                    writer.write_values(values)
+                    rows_read += 1
+                empty_rows = 0
+        finally:
+            workbook.close()
+            if writer is not None:
+                writer.close()
+
+        # Rows without values between other rows have no element, so more rows can be read than counted.
+        source_rows = count_sheet_rows(self.file_path, get_active_sheet_path(self.file_path)) - 1 - empty_rows
+        if rows_read < source_rows:
+            raise ValueError(f"The file has {source_rows} rows, but only {rows_read} rows were read from it.")
+        rows_written = sum(count_sheet_rows(path) - 1 for path in chunk_paths)
+        if rows_written != rows_read:
+            raise ValueError(f"The chunks have {rows_written} rows, but {rows_read} rows were read from the file.")
+        return chunk_paths
+
+    def read(
+        self,
+        sheet: Optional[str] = None,
+        columns_to_read: Optional[List[Union[str, int]]] = None,
+        header: Optional[int] = 0,
+    ) -> pd.DataFrame:
+        """
+        Read data from the Excel file, from the cache when the file has not changed since it was cached.
 
         :param sheet: Name of the sheet to read.
-        :param columns_to_read: List of columns to read.
+        :param columns_to_read: List of the names or positions of the columns to read.
+        :param header: Row of the column names, or None if the sheet has no header row.
         :return: DataFrame with the data from the file.
         """
         engine = self._get_engine_for_file_extension()
-        df = pd.read_excel(
-            self.file_path, sheet_name=sheet if sheet is not None else 0, usecols=columns_to_read, engine=engine
-        )
-        return df
+        sheet_name = sheet if sheet is not None else 0
+
+        def read_file() -> pd.DataFrame:
+            return pd.read_excel(
+                self.file_path, sheet_name=sheet_name, usecols=columns_to_read, header=header, engine=engine
+            )
+
+        with profile_phase(READ_INPUT):
+            if self.cache is None:
+                return read_file()
+            return self.cache.read(self.file_path, read_file, sheet=sheet_name, usecols=columns_to_read, header=header)
+
+    def read_columns(self) -> List[str]:
+        """
+        Read the column names from the header row of the first sheet, named like `read` names them.
+        """
+        if self._get_engine_for_file_extension() != "openpyxl":
+            return self.read().columns.tolist()
+        workbook = load_workbook(self.file_path, read_only=True)
+        try:
+            sheet = workbook.active
+            sheet.reset_dimensions()
+            return get_column_names(next(sheet.iter_rows(values_only=True), ()))
+        finally:
+            workbook.close()
+
+    def iter_batches(self, batch_size: int, as_text: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Read the first sheet in batches of rows from a read-only workbook, so only a batch is in memory at
+        a time. Empty rows at the end of the sheet are dropped, like `read` drops them.
+
+        :param batch_size: Number of rows per batch.
+        :param as_text: Whether to convert the values to text, e.g. to write them to a text-only format.
+        :return: DataFrames of the rows of the sheet.
+        """
+        if self._get_engine_for_file_extension() != "openpyxl":
+            df = self.read()
+            df = df.where(df.isna(), df.astype(str)) if as_text else df
+            for start in range(0, len(df), batch_size):
+                yield df.iloc[start : start + batch_size]
+            return
+
+        workbook = load_workbook(self.file_path, read_only=True)
+        try:
+            sheet = workbook.active
+            # The rows of the sheet's dimension are not read past, and it is wrong in some files.
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            columns = get_column_names(next(rows, ()))
+            width = len(columns)
+            batch = []
+            empty_rows = 0
+            while True:
+                with profile_phase(READ_INPUT):
+                    for row in rows:
+                        if all(value is None for value in row):
+                            empty_rows += 1
+                            continue
+                        if empty_rows:
+                            batch += [(None,) * width] * empty_rows
+                            empty_rows = 0
+                        batch.append(row[:width] if len(row) >= width else row + (None,) * (width - len(row)))
+                        if len(batch) >= batch_size:
+                            break
+                    if not batch:
+                        return
+                    df = pd.DataFrame(batch, columns=columns, dtype=object if as_text else None)
+                    if as_text:
+                        df = df.where(df.isna(), df.astype(str))
+                    batch = []
+                yield df
+        finally:
+            workbook.close()
+
+    def count_rows(self) -> int:
+        """
+        Count the rows of the active sheet, without the header row, by scanning its XML. The sheet's
+        dimension is not used, as it is wrong in some files.
+        """
+        if self._get_engine_for_file_extension() != "openpyxl":
+            return len(self.read())
+        return max(count_sheet_rows(self.file_path, get_active_sheet_path(self.file_path)) - 1, 0)
 
     def _get_engine_for_file_extension(self) -> str:
         """
@@ -77,4 +290,5 @@ class ExcelFile(BaseFile):
 
         :param df: DataFrame to be saved.
         """
-        df.to_excel(self.file_path, index=False)
+        with profile_phase(WRITE_OUTPUT):
+            df.to_excel(self.file_path, index=False)
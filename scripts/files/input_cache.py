@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+INPUT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "input_cache")
+DEFAULT_MAX_MB = 1024
+# Key of the source file's details in the metadata of an entry.
+METADATA_KEY = b"input_cache"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class InputCache:
+    """
+    Cache of parsed input files, so a file that did not change is only parsed once.
+
+    Every entry is a Parquet file of the DataFrame read from a file with a set of read options. The
+    path, size, mtime and content hash of the file are stored in the entry's metadata, and the entry
+    is only used while all of them match the file; the file is only hashed again when its size or mtime
+    changed. When an entry takes the cache over its size limit, the entries of files that changed or no
+    longer exist are evicted, and then the least recently used ones until the cache fits.
+
+    DataFrames Parquet can not store exactly, e.g. a column of both numbers and text, are not cached.
+
+        df = cache.read(file_path, lambda: pd.read_excel(file_path), header=0)
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str = INPUT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024) -> None:
+        """
+        Initialize the InputCache, creating its directory if needed.
+
+        Args:
+            directory: Directory of the entries.
+            max_bytes: Size limit of the entries together.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+        # Size of the entries together, counted when the first entry is stored and kept up to date by
+        # this process. Entries other processes store are only counted by the next eviction.
+        self.total_bytes: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def get_instance(cls, directory: str = INPUT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        """
+        Get the shared InputCache of the given directory.
+        """
+        directory = os.path.abspath(directory)
+        with cls._instances_lock:
+            if directory not in cls._instances:
+                cls._instances[directory] = cls(directory, max_bytes)
+            return cls._instances[directory]
+
+    def read(self, file_path: str, read: Callable[[], pd.DataFrame], **options: Any) -> pd.DataFrame:
+        """
+        Get the DataFrame of a file from the cache, or read it and store it.
+
+        Args:
+            file_path: Path of the file.
+            read: Function reading the file.
+            **options: Options the file is read with; the entry is only used for the same options.
+
+        Returns:
+            The DataFrame of the file.
+        """
+        entry_path = self.get_entry_path(os.path.abspath(file_path), options)
+        source = self.get_source(file_path, entry_path)
+        df = self.load(entry_path, source)
+        with self.lock:
+            self.counters["hits" if df is not None else "misses"] += 1
+        if df is not None:
+            return df
+        df = read()
+        self.store(entry_path, source, df)
+        return df
+
+    def get_source(self, file_path: str, entry_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the path, size, mtime and content hash of a file. The hash stored in the entry is reused
+        while the file has the size and mtime it was stored with, so a hit does not read the whole file.
+        """
+        import pyarrow as pa
+
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        source = {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        try:
+            metadata = self.get_metadata(entry_path) if entry_path is not None else None
+        except (OSError, ValueError, pa.ArrowException):
+            metadata = None
+        if metadata is not None and "hash" in metadata and all(metadata.get(k) == v for k, v in source.items()):
+            return {**source, "hash": metadata["hash"]}
+        content_hash = hashlib.blake2b()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                content_hash.update(block)
+        return {**source, "hash": content_hash.hexdigest()}
+
+    def get_entry_path(self, path: str, options: Dict[str, Any]) -> str:
+        key = json.dumps([path, options], sort_keys=True, default=str)
+        return os.path.join(self.directory, f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.parquet")
+
+    def load(self, entry_path: str, source: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """
+        Load an entry if it is of the file as it is now. An entry that can not be loaded is removed.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        try:
+            metadata = self.get_metadata(entry_path)
+            if metadata is None or any(metadata.get(key) != value for key, value in source.items()):
+                return None
+            df = pq.read_table(entry_path).to_pandas()
+        except (OSError, ValueError, pa.ArrowException):
+            self.remove(entry_path)
+            return None
+        # Parquet only has text column names, e.g. the column positions of a file read without a header.
+        if list(df.columns) != metadata["columns"]:
+            df.columns = metadata["columns"]
+        # Marks the entry as recently used.
+        os.utime(entry_path)
+        return df
+
+    def store(self, entry_path: str, source: Dict[str, Any], df: pd.DataFrame) -> None:
+        """
+        Store the DataFrame of a file, unless Parquet can not store it exactly, and evict stale entries.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = json.dumps({**source, "columns": df.columns.tolist()}).encode()
+        except (TypeError, ValueError, pa.ArrowException):
+            return
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: metadata})
+        temporary_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            pq.write_table(table, temporary_path)
+            replaced_bytes = os.path.getsize(entry_path) if os.path.exists(entry_path) else 0
+            os.replace(temporary_path, entry_path)
+            stored_bytes = os.path.getsize(entry_path)
+        except OSError:
+            self.remove(temporary_path)
+            return
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = self.get_total_bytes()
+            else:
+                self.total_bytes += stored_bytes - replaced_bytes
+            over_limit = self.total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def get_total_bytes(self) -> int:
+        """
+        Get the size of the entries together from the directory.
+        """
+        total_bytes = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    total_bytes += entry.stat().st_size if entry.name.endswith(".parquet") else 0
+                except OSError:
+                    pass
+        return total_bytes
+
+    def get_metadata(self, entry_path: str) -> Optional[Dict[str, Any]]:
+        import pyarrow.parquet as pq
+
+        if not os.path.exists(entry_path):
+            return None
+        metadata = pq.read_schema(entry_path).metadata or {}
+        return json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else None
+
+    def evict(self) -> int:
+        """
+        Remove the entries of files that changed or no longer exist, and then the least recently used
+        entries until the cache fits its size limit.
+
+        Returns:
+            Number of entries removed.
+        """
+        import pyarrow as pa
+
+        removed = 0
+        entries = []
+        with self.lock:
+            for name in os.listdir(self.directory):
+                entry_path = os.path.join(self.directory, name)
+                if not name.endswith(".parquet"):
+                    continue
+                try:
+                    metadata = self.get_metadata(entry_path)
+                    stat = os.stat(metadata["path"]) if metadata is not None else None
+                    entry_stat = os.stat(entry_path)
+                except (OSError, KeyError, ValueError, pa.ArrowException):
+                    stat = None
+                if stat is None or (stat.st_size, stat.st_mtime_ns) != (metadata["size"], metadata["mtime_ns"]):
+                    removed += self.remove(entry_path)
+                    continue
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, entry_path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                removed += self.remove(entry_path)
+                total_bytes -= size
+            self.total_bytes = total_bytes
+        return removed
+
+    def remove(self, entry_path: str) -> bool:
+        try:
+            os.remove(entry_path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the hit and miss counters of this process.
+        """
+        with self.lock:
+            return dict(self.counters)
+
+
+def get_input_cache(settings: dict) -> Optional[InputCache]:
+    """
+    Get the shared input cache, unless it is turned off in the settings or pyarrow is not installed.
+
+    Args:
+        settings: Settings with "input_cache" to turn the cache on or off and "input_cache_max_mb" for
+            its size limit (optional).
+    """
+    if not settings.get("input_cache", True):
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return InputCache.get_instance(max_bytes=int(settings.get("input_cache_max_mb", DEFAULT_MAX_MB)) * 1024 * 1024)
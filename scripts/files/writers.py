@@ -0,0 +1,184 @@
+import datetime
+import os
+from typing import Any, Dict, List, Sequence
+
+import pandas as pd
+from openpyxl import Workbook
+
+from ..utils.profiling import WRITE_OUTPUT, profile_phase
+
+# Types openpyxl writes as they are; anything else (e.g. nested lists and dictionaries from API
+# responses) is written as its string representation.
+CELL_TYPES = (str, int, float, bool, datetime.date, datetime.datetime, datetime.time)
+
+
+class ExcelRowWriter:
+    """
+    Writes rows to an Excel file as they arrive, with constant memory.
+
+    Rows go through an openpyxl write-only workbook, which streams them to a temporary file instead of
+    keeping them in memory. The Excel file is created when the writer is closed, also when the task
+    failed or was interrupted, so a partial run still leaves a valid file with the rows done so far.
+
+        with ExcelRowWriter(file_path, ["gstin", "status"]) as writer:
+            writer.write_row({"gstin": gstin, "status": status})
+    """
+
+    def __init__(self, file_path: str, columns: List[str]) -> None:
+        """
+        Initialize the ExcelRowWriter and write the header row.
+
+        :param file_path: Path of the Excel file to create.
+        :param columns: Column names; rows are written in this column order.
+        """
+        self.file_path = file_path
+        self.columns = columns
+        self.rows_written = 0
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(columns)
+
+    def __enter__(self) -> "ExcelRowWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        """
+        Append a row to the file.
+
+        :param row: Dictionary of column names to values; missing columns are left empty.
+        """
+        with profile_phase(WRITE_OUTPUT):
+            self.sheet.append([self._to_cell(row.get(column)) for column in self.columns])
+        self.rows_written += 1
+
+    def write_values(self, values: Sequence[Any]) -> None:
+        """
+        Append a row of values that are already in column order and of cell types, e.g. read from another workbook.
+
+        :param values: Values of the row.
+        """
+        with profile_phase(WRITE_OUTPUT):
+            self.sheet.append(values)
+        self.rows_written += 1
+
+    def write_batch(self, df: pd.DataFrame) -> None:
+        """
+        Append the rows of a DataFrame whose columns are in column order. Missing values are left empty.
+
+        :param df: Rows to write.
+        """
+        with profile_phase(WRITE_OUTPUT):
+            for values in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+                self.sheet.append(values)
+        self.rows_written += len(df)
+
+    def close(self) -> None:
+        """
+        Create the Excel file with the rows written so far.
+        """
+        if self.workbook is not None:
+            with profile_phase(WRITE_OUTPUT):
+                self.workbook.save(self.file_path)
+            self.workbook = self.sheet = None
+
+    def discard(self) -> None:
+        """
+        Drop the rows without creating the Excel file. The workbook is saved to the null device, as saving
+        is how openpyxl removes the temporary file the rows were streamed to.
+        """
+        if self.workbook is not None:
+            self.workbook.save(os.devnull)
+            self.workbook = self.sheet = None
+
+    @staticmethod
+    def _to_cell(value: Any) -> Any:
+        if value is None or isinstance(value, CELL_TYPES):
+            return value
+        return str(value)
+
+
+class CsvBatchWriter:
+    """
+    Writes batches of rows to a CSV file as they arrive, with the header row first.
+
+        with CsvBatchWriter(file_path, columns) as writer:
+            for df in batches:
+                writer.write_batch(df)
+    """
+
+    def __init__(self, file_path: str, columns: List[str]) -> None:
+        """
+        Initialize the CsvBatchWriter and write the header row.
+
+        :param file_path: Path of the CSV file to create.
+        :param columns: Column names; the batches should have these columns in this order.
+        """
+        self.file_path = file_path
+        self.columns = columns
+        self.rows_written = 0
+        self.file = open(file_path, "w", newline="", encoding="utf-8")
+        pd.DataFrame(columns=columns).to_csv(self.file, index=False)
+
+    def __enter__(self) -> "CsvBatchWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_batch(self, df: pd.DataFrame) -> None:
+        with profile_phase(WRITE_OUTPUT):
+            df.to_csv(self.file, header=False, index=False)
+        self.rows_written += len(df)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ParquetBatchWriter:
+    """
+    Writes batches of rows to a Parquet file as they arrive, every batch as a row group. All columns are
+    strings, so batches read from different files have the same schema whatever types were inferred.
+
+    Needs pyarrow, which is only imported when a Parquet file is written.
+    """
+
+    def __init__(self, file_path: str, columns: List[str]) -> None:
+        """
+        Initialize the ParquetBatchWriter.
+
+        :param file_path: Path of the Parquet file to create.
+        :param columns: Column names; the batches should have these columns in this order.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.file_path = file_path
+        self.columns = columns
+        self.rows_written = 0
+        self.pyarrow = pa
+        self.schema = pa.schema([(str(column), pa.string()) for column in columns])
+        self.writer = pq.ParquetWriter(file_path, self.schema)
+
+    def __enter__(self) -> "ParquetBatchWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_batch(self, df: pd.DataFrame) -> None:
+        with profile_phase(WRITE_OUTPUT):
+            df = df.where(df.isna(), df.astype(str))
+            df.columns = self.schema.names
+            table = self.pyarrow.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            self.writer.write_table(table)
+        self.rows_written += len(df)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
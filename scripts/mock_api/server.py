@@ -0,0 +1,423 @@
+"""
+Local stand-in for the GST API, so API clients and tasks can be exercised and load-tested without a backend.
+
+    python -m scripts.mock_api.server [--port 8000] [--latency 0.05] [--distribution lognormal]
+        [--error-rate 0.01] [--throttle-rate 0.02] [--endpoint-latency internal/gst/filing=0.2] [--no-batch]
+
+The default address is the one of the DEV environment (http://127.0.0.1:8000/apis/). Served endpoints:
+
+    POST accounts/signin/otp, accounts/signin/otp/validate
+    GET  gst_lookup/taxpayer-info?gstin=...            (POST gst_lookup/taxpayer-info/bulk)
+    GET  internal/gst/filing?gstin=...&return_period=MM-YYYY
+    GET  supplier/gstr-filing-data?gstin=...
+    POST accounts/pre-register/file/upload, accounts/pre-register/file/{id}/process
+    GET  accounts/pre-register/file/{id}/result
+"""
+import argparse
+import ast
+import copy
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime
+from email.parser import BytesParser
+from email.policy import HTTP
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ..utils.date_time import is_valid_period
+from ..utils.endpoints import EndpointRegistry
+from ..utils.gstin import is_gstin_valid
+
+API_PREFIX = "/apis/"
+OTP_PATH = "accounts/signin/otp"
+VALIDATE_OTP_PATH = "accounts/signin/otp/validate"
+TAX_PAYER_PATH = "gst_lookup/taxpayer-info"
+TAX_PAYER_BATCH_PATH = "gst_lookup/taxpayer-info/bulk"
+TAX_FILING_PATH = "internal/gst/filing"
+TAX_FILING_STATUS_PATH = "supplier/gstr-filing-data"
+PRE_REGISTER_UPLOAD_PATH = "accounts/pre-register/file/upload"
+PRE_REGISTER_PROCESS_PATH = "accounts/pre-register/file/{id}/process"
+PRE_REGISTER_RESULT_PATH = "accounts/pre-register/file/{id}/result"
+
+# Sample response of the taxpayer endpoint the synthesized details are shaped like.
+TAX_PAYER_SAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "xxx.json")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+FILING_STATUSES = ("Filed", "Filed", "Filed", "Not Filed")
+# Months of filings returned by the filing status endpoint.
+FILING_STATUS_MONTHS = 12
+
+
+@lru_cache(maxsize=None)
+def load_tax_payer_sample() -> dict:
+    """
+    Load the sample taxpayer details.
+
+    :return: The sample details.
+    """
+    with open(TAX_PAYER_SAMPLE_FILE, encoding="utf-8") as file:
+        text = file.read()
+    try:
+        return json.loads(text)
+    except ValueError:
+        # The sample was copied from a Python session and uses `False`, which is not valid JSON.
+        return ast.literal_eval(text)
+
+
+def get_tax_payer_data(gstin: str) -> dict:
+    """
+    Synthesize the taxpayer details of a GSTIN from the sample; the same GSTIN always gets the same details.
+
+    :param gstin: A valid GSTIN.
+    :return: The taxpayer details, shaped like those of the taxpayer endpoint.
+    """
+    pan = gstin[2:12]
+    data = copy.deepcopy(load_tax_payer_sample())
+    data.update(
+        {
+            "gstin": gstin,
+            "trade_name": f"TRADER {pan}",
+            "legal_name": f"TRADER {pan} PRIVATE LIMITED",
+        }
+    )
+    return data
+
+
+def get_filing_data(gstin: str, return_period: str) -> dict:
+    """
+    Synthesize the filing status of a GSTIN for a return period. One in ten has nothing filed, which the
+    API answers with empty data.
+
+    :param gstin: A valid GSTIN.
+    :param return_period: The return period, in MM-YYYY format.
+    :return: The filing data, empty if nothing was filed.
+    """
+    digest = zlib.crc32(f"{gstin}{return_period}".encode("utf-8"))
+    if digest % 10 == 0:
+        return {}
+    return {
+        "gstin": gstin,
+        "return_period": return_period,
+        "gstr1": FILING_STATUSES[digest % len(FILING_STATUSES)],
+        "gstr3b": FILING_STATUSES[(digest >> 8) % len(FILING_STATUSES)],
+    }
+
+
+def get_filing_status_data(gstin: str) -> dict:
+    """
+    Synthesize the filings of a GSTIN for the last `FILING_STATUS_MONTHS` months.
+    """
+    today = datetime.now()
+    filings = []
+    for months_ago in range(1, FILING_STATUS_MONTHS + 1):
+        year, month = divmod(today.year * 12 + today.month - 1 - months_ago, 12)
+        filing = get_filing_data(gstin, f"{month + 1:02d}-{year}")
+        if filing:
+            filings.append(filing)
+    return {"gstin": gstin, "filings": filings}
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """
+    HTTP server answering the GST API endpoints with synthesized data.
+
+    Every request takes a latency drawn from the configured distribution, with the same mean for all
+    endpoints unless an endpoint has its own. A share of the requests is answered with a 500 error or a
+    429 with a Retry-After header instead, like an overloaded API.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 8000),
+        latency: float = 0.0,
+        batch: bool = True,
+        distribution: str = "constant",
+        spread: float = 0.5,
+        endpoint_latencies: Optional[Dict[str, float]] = None,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize the MockApiServer.
+
+        :param address: Host and port to listen on; port 0 picks a free port.
+        :param latency: Mean seconds every request takes.
+        :param batch: Whether the batch endpoints are served.
+        :param distribution: Distribution of the latencies, one of `LATENCY_DISTRIBUTIONS`.
+        :param spread: Relative spread of the uniform distribution, sigma of the lognormal distribution.
+        :param endpoint_latencies: Mean latency per endpoint path, e.g. {"internal/gst/filing": 0.2}
+            (optional). Paths are matched with numeric ids replaced by `{id}`.
+        :param error_rate: Share of the requests answered with a 500 error.
+        :param throttle_rate: Share of the requests answered with a 429 and a Retry-After header.
+        :param retry_after: Seconds in the Retry-After header of the 429 responses.
+        :param seed: Seed of the latencies and faults, for repeatable runs (optional).
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution `{distribution}`.")
+        super().__init__(address, MockApiRequestHandler)
+        self.latency = latency
+        self.batch = batch
+        self.distribution = distribution
+        self.spread = spread
+        self.endpoint_latencies = endpoint_latencies or {}
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.request_counts: Dict[str, int] = {}
+        self.status_counts: Dict[int, int] = {}
+        self.uploads: Dict[int, bytes] = {}
+        self.processed_uploads = set()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> "MockApiServer":
+        """
+        Serve requests on a background thread.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def count_request(self, path: str) -> None:
+        with self.lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def count_response(self, status_code: int) -> None:
+        with self.lock:
+            self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+
+    def sample_latency(self, endpoint: str) -> float:
+        """
+        Draw the latency of a request to an endpoint.
+
+        :param endpoint: Endpoint path, with numeric ids replaced by `{id}`.
+        :return: The latency in seconds.
+        """
+        mean = self.endpoint_latencies.get(endpoint, self.latency)
+        if mean <= 0 or self.distribution == "constant":
+            return max(0.0, mean)
+        if self.distribution == "uniform":
+            return self.random.uniform(mean * max(0.0, 1 - self.spread), mean * (1 + self.spread))
+        if self.distribution == "exponential":
+            return self.random.expovariate(1 / mean)
+        # The location is chosen so the mean of the lognormal distribution is `mean`.
+        return self.random.lognormvariate(math.log(mean) - self.spread**2 / 2, self.spread)
+
+    def sample_fault(self) -> Optional[int]:
+        """
+        Decide if a request fails.
+
+        :return: The status code of the failure, or None if the request is answered normally.
+        """
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+    def store_upload(self, content: bytes) -> int:
+        with self.lock:
+            file_id = len(self.uploads) + 1
+            self.uploads[file_id] = content
+        return file_id
+
+
+class MockApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        # Headers and body are written separately; without this, Nagle's algorithm delays every response.
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:
+        path, file_id, query = self.parse_path()
+        if self.send_fault():
+            return
+        gstin = query.get("gstin", [""])[0]
+        if path in (TAX_PAYER_PATH, TAX_FILING_PATH, TAX_FILING_STATUS_PATH) and not is_gstin_valid(gstin):
+            return self.send_json(400, {"success": False, "message": f"Invalid GSTIN {gstin}"})
+        if path == TAX_PAYER_PATH:
+            return self.send_json(200, {"success": True, "data": get_tax_payer_data(gstin)})
+        if path == TAX_FILING_PATH:
+            return_period = query.get("return_period", [""])[0]
+            if not is_valid_period(return_period, "%m-%Y"):
+                return self.send_json(400, {"success": False, "message": f"Invalid return period {return_period}"})
+            return self.send_json(200, {"success": True, "data": get_filing_data(gstin, return_period)})
+        if path == TAX_FILING_STATUS_PATH:
+            return self.send_json(200, {"success": True, "data": get_filing_status_data(gstin)})
+        if path == PRE_REGISTER_RESULT_PATH and file_id in self.server.processed_uploads:
+            # The processed file has the rows of the uploaded one.
+            return self.send_content(200, self.server.uploads[file_id], XLSX_CONTENT_TYPE)
+        self.send_json(404, {"success": False, "message": "Not found"})
+
+    def do_POST(self) -> None:
+        path, file_id, _ = self.parse_path()
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.send_fault():
+            return
+        if path == TAX_PAYER_BATCH_PATH and self.server.batch:
+            gstins = self.parse_json(body).get("gstins", [])
+            data = {gstin: get_tax_payer_data(gstin) for gstin in gstins if is_gstin_valid(gstin)}
+            return self.send_json(200, {"success": True, "data": data})
+        if path == OTP_PATH:
+            return self.send_json(200, {"success": True, "data": {}})
+        if path == VALIDATE_OTP_PATH:
+            return self.send_json(200, {"success": True, "data": {"token": "mock-token"}})
+        if path == PRE_REGISTER_UPLOAD_PATH:
+            content = self.parse_upload(body)
+            if content is None:
+                return self.send_json(400, {"success": False, "message": "No file uploaded"})
+            return self.send_json(200, {"success": True, "data": {"file_id": self.server.store_upload(content)}})
+        if path == PRE_REGISTER_PROCESS_PATH and file_id in self.server.uploads:
+            self.server.processed_uploads.add(file_id)
+            return self.send_json(200, {"success": True, "data": {"file_id": file_id}})
+        self.send_json(404, {"success": False, "message": "Not found"})
+
+    def parse_path(self) -> Tuple[str, Optional[int], dict]:
+        """
+        Parse the path of the request and wait for its latency.
+
+        :return: The endpoint path with numeric ids replaced by `{id}`, the first id and the query.
+        """
+        url = urlsplit(self.path)
+        path = url.path[len(API_PREFIX) :] if url.path.startswith(API_PREFIX) else url.path
+        ids = [int(part) for part in path.split("/") if part.isdigit()]
+        endpoint = EndpointRegistry.get_endpoint_key(path)
+        self.server.count_request(endpoint)
+        latency = self.server.sample_latency(endpoint)
+        if latency:
+            time.sleep(latency)
+        return endpoint, ids[0] if ids else None, parse_qs(url.query)
+
+    def send_fault(self) -> bool:
+        """
+        Answer the request with a failure if the server decides it fails.
+
+        :return: True if a failure was sent.
+        """
+        status_code = self.server.sample_fault()
+        if status_code == 429:
+            retry_after = f"{self.server.retry_after:g}"
+            self.send_json(429, {"success": False, "message": "Too many requests"}, {"Retry-After": retry_after})
+        elif status_code is not None:
+            self.send_json(status_code, {"success": False, "message": "Internal server error"})
+        return status_code is not None
+
+    @staticmethod
+    def parse_json(body: bytes) -> dict:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def parse_upload(self, body: bytes) -> Optional[bytes]:
+        """
+        Get the content of the first file of a multipart/form-data body.
+        """
+        content_type = self.headers.get("Content-Type", "")
+        if not content_type.startswith("multipart/form-data"):
+            return None
+        message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        for part in message.iter_parts():
+            if part.get_filename() is not None:
+                return part.get_payload(decode=True)
+        return None
+
+    def send_json(self, status_code: int, body: dict, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_content(status_code, json.dumps(body).encode("utf-8"), "application/json", headers)
+
+    def send_content(
+        self, status_code: int, content: bytes, content_type: str, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.server.count_response(status_code)
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def parse_endpoint_latency(value: str) -> Tuple[str, float]:
+    path, _, latency = value.rpartition("=")
+    try:
+        return path.strip("/"), float(latency)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected PATH=SECONDS, got `{value}`")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean seconds every request takes.")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="constant")
+    parser.add_argument("--spread", type=float, default=0.5, help="Uniform relative spread or lognormal sigma.")
+    parser.add_argument(
+        "--endpoint-latency",
+        type=parse_endpoint_latency,
+        action="append",
+        default=[],
+        metavar="PATH=SECONDS",
+        help="Mean latency of an endpoint, e.g. internal/gst/filing=0.2. Can be repeated.",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with a 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of the 429 responses.")
+    parser.add_argument("--seed", type=int, help="Seed of the latencies and faults.")
+    parser.add_argument("--no-batch", dest="batch", action="store_false", help="Do not serve the batch endpoints.")
+    args = parser.parse_args()
+
+    server = MockApiServer(
+        (args.host, args.port),
+        latency=args.latency,
+        batch=args.batch,
+        distribution=args.distribution,
+        spread=args.spread,
+        endpoint_latencies=dict(args.endpoint_latency),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    print(f"Serving the mock GST API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
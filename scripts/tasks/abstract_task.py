@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
+from typing import Optional, Tuple
 
 
 class BaseTask(ABC):
     description = "Base task"
+    # Extensions of the input files the task processes, for tasks that process a directory file by file.
+    input_extensions: Tuple[str, ...] = ()
 
     @abstractmethod
     def get_params(self) -> None:
@@ -11,3 +14,29 @@ class BaseTask(ABC):
     @abstractmethod
     def execute(self) -> None:
         raise NotImplementedError("Sub class should implement this function.")
+
+    def set_params(self, directory_path: str, **params) -> None:
+        """
+        Set the parameters without asking the user, as the headless worker does.
+
+        :param directory_path: Directory the input files are dropped in.
+        :param params: Task specific parameters, with the same values the user would enter.
+        """
+        raise NotImplementedError(f"{type(self).__name__} can not run without asking the user for parameters.")
+
+    def process_path(self, file_path: str) -> None:
+        """
+        Process a single input file of the directory given to `set_params`. Like `execute`, the file is
+        moved to the processed directory when it was processed successfully and left in place otherwise.
+
+        :param file_path: Path of the input file.
+        """
+        raise NotImplementedError(f"{type(self).__name__} can not process a single input file.")
+
+    def get_output_directory(self) -> Optional[str]:
+        """
+        Get the directory the task writes its output files to; profiles of its runs are saved next to it.
+
+        :return: The directory, or None if the task has none or its parameters are not set yet.
+        """
+        return None
@@ -1,16 +1,30 @@
+import itertools
 import os
 from datetime import datetime
-
-import pandas as pd
+from typing import List, Optional, Union
 
 from ..files.csv import CsvFile
 from ..files.excel import ExcelFile
+from ..files.writers import CsvBatchWriter, ExcelRowWriter, ParquetBatchWriter
+from ..utils.concurrency import chain_prefetched
 from ..utils.settings import load_settings
 from .abstract_task import BaseTask
 
+# Rows of a sheet in Excel, including the header row.
+EXCEL_MAX_ROWS = 1_048_576
+# Rows read from the input files at a time.
+BATCH_ROWS = 50_000
+
 
 class FileCombineTask(BaseTask):
-    """Task to combine files in a directory into a single file."""
+    """
+    Task to combine files in a directory into a single file.
+
+    The files are read in batches and every batch is appended to the output file, so memory does not
+    grow with the files. The columns of the output are those of all files, in the order they are first
+    seen, and the columns a file does not have are left empty. A combined file with more rows than an
+    Excel sheet can hold is written as CSV or Parquet instead.
+    """
 
     description = "Combine files in a directory into a single file"
 
@@ -19,12 +33,23 @@ class FileCombineTask(BaseTask):
         "xlsx": ExcelFile
         # Add other file types here
     }
+    OUTPUT_WRITERS = {
+        "xlsx": ExcelRowWriter,
+        "csv": CsvBatchWriter,
+        "parquet": ParquetBatchWriter,
+    }
 
     def __init__(self) -> None:
         """Initialize the task."""
         self.input_dir = None
         self.output_file = None
         self.settings = load_settings()
+        self.output_format = self.settings.get("combine_output_format", "xlsx")
+        self.overflow_format = self.settings.get("combine_overflow_format", "csv")
+        self.read_workers = int(self.settings.get("combine_read_workers", 1))
+        for output_format in (self.output_format, self.overflow_format):
+            if output_format not in self.OUTPUT_WRITERS:
+                raise ValueError(f"Unsupported output format: {output_format}")
 
     def get_params(self) -> None:
         """Get parameters for the task from the user."""
@@ -32,6 +57,9 @@ class FileCombineTask(BaseTask):
         self.check_input_directory()
         self.set_output_file()
 
+    def get_output_directory(self) -> Optional[str]:
+        return self.input_dir
+
     def check_input_directory(self) -> None:
         """Check if the input directory is valid."""
         if not os.path.isdir(self.input_dir):
@@ -44,10 +72,14 @@ class FileCombineTask(BaseTask):
 
     def execute(self) -> None:
         """Execute the task."""
-        file_paths = self.get_file_paths()
-        combined_df = self.combine_files(file_paths)
-        self.save_combined_file(combined_df)
-        print(f"Combined files saved to {self.output_file}")
+        files = self.get_files(self.get_file_paths())
+        if not files:
+            raise ValueError("No files to combine.")
+        columns = self.get_columns(files)
+        output_format = self.get_output_format(files)
+        self.output_file = f"{os.path.splitext(self.output_file)[0]}.{output_format}"
+        rows = self.write_combined_file(files, columns, output_format)
+        print(f"Combined {rows} rows of {len(files)} files saved to {self.output_file}")
 
     def get_file_paths(self) -> list[str]:
         """Get the file paths of all files in the input directory."""
@@ -58,19 +90,54 @@ class FileCombineTask(BaseTask):
                 file_paths.append(file_path)
         return file_paths
 
-    def combine_files(self, file_paths: list[str]) -> pd.DataFrame:
-        """Combine the files into a single DataFrame."""
-        dfs = []
+    def get_files(self, file_paths: list[str]) -> List[Union[CsvFile, ExcelFile]]:
+        """Get the files of the supported types."""
+        files = []
         for file_path in file_paths:
             extension = file_path.split(".")[-1].lower()
-            if extension not in self.FILE_CLASSES:
-                continue
-            file = self.FILE_CLASSES[extension](file_path)
-            df = file.read()
-            dfs.append(df)
-        combined_df = pd.concat(dfs, ignore_index=True)
-        return combined_df
-
-    def save_combined_file(self, combined_df: pd.DataFrame) -> None:
-        """Save the combined DataFrame to the output file."""
-        combined_df.to_excel(self.output_file, index=False)
+            if extension in self.FILE_CLASSES:
+                files.append(self.FILE_CLASSES[extension](file_path))
+        return files
+
+    def get_columns(self, files: List[Union[CsvFile, ExcelFile]]) -> list:
+        """Get the columns of all files, in the order they are first seen, from their header rows."""
+        columns = {}
+        for file in files:
+            columns.update(dict.fromkeys(file.read_columns()))
+        return list(columns)
+
+    def get_output_format(self, files: List[Union[CsvFile, ExcelFile]]) -> str:
+        """
+        Get the format of the output file: the overflow format when the rows do not fit in an Excel sheet.
+        The rows are only counted for Excel output.
+        """
+        if self.output_format != "xlsx":
+            return self.output_format
+        rows = sum(file.count_rows() for file in files)
+        if rows + 1 > EXCEL_MAX_ROWS:
+            print(f"{rows} rows do not fit in an Excel sheet; writing {self.overflow_format} instead.")
+            return self.overflow_format
+        return self.output_format
+
+    def write_combined_file(self, files: List[Union[CsvFile, ExcelFile]], columns: list, output_format: str) -> int:
+        """
+        Append the batches of all files to the output file, in the given columns.
+
+        With more than one read worker, the next files are read on a thread pool while a file is written.
+
+        :param files: Files to combine.
+        :param columns: Columns of the output file.
+        :param output_format: Format of the output file.
+        :return: Number of rows written.
+        """
+        # Text formats keep the values as they are in the files, e.g. leading zeros.
+        as_text = output_format != "xlsx"
+        batches = [file.iter_batches(BATCH_ROWS, as_text=as_text) for file in files]
+        if self.read_workers > 1:
+            batches = chain_prefetched(batches, self.read_workers)
+        else:
+            batches = itertools.chain.from_iterable(batches)
+        with self.OUTPUT_WRITERS[output_format](self.output_file, columns) as writer:
+            for batch in batches:
+                writer.write_batch(batch.reindex(columns=columns))
+        return writer.rows_written
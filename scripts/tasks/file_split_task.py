@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 from halo import Halo
 
@@ -6,6 +7,7 @@ from ..files.csv import CsvFile
 from ..files.excel import ExcelFile
 from ..utils.files import create_directory_if_not_exists, is_valid_directory_path
 from ..utils.settings import load_settings
+from ..utils.strings import parse_size
 from ..utils.terminal import get_clean_input
 from .abstract_task import BaseTask
 
@@ -24,6 +26,9 @@ class FileSplitTask(BaseTask):
     def __init__(self) -> None:
         """Initialize the task."""
         self.file = None
+        self.output_dir = None
+        self.chunk_size = None
+        self.max_chunk_bytes = None
         self.settings = load_settings()
 
     def get_params(self) -> None:
@@ -40,20 +45,36 @@ class FileSplitTask(BaseTask):
         self.output_dir = os.path.splitext(self.file.file_path)[0]
         create_directory_if_not_exists(self.output_dir)
 
+        # CSV files can also be split by size, since their rows are copied without being parsed.
+        is_csv = isinstance(self.file, CsvFile)
+        prompt = "Enter the chunk size: "
+        if is_csv:
+            prompt = "Enter the chunk size, as a number of rows or a size such as 50MB: "
         while True:
             try:
-                self.chunk_size = get_clean_input("Enter the chunk size: ", int)
+                value = get_clean_input(prompt)
+                if is_csv and not value.isdigit():
+                    self.max_chunk_bytes = parse_size(value)
+                else:
+                    self.chunk_size = int(value)
                 break
             except Exception as e:
                 print(str(e))
         print("\n")
 
+    def get_output_directory(self) -> Optional[str]:
+        return self.output_dir
+
     def execute(self) -> None:
         """Execute the task."""
         # spinner = Halo(text="Splitting File", spinner="dots")
         # spinner.start()
         try:
-            self.file.split(self.output_dir, self.chunk_size)
+            if isinstance(self.file, CsvFile):
+                use_mmap = self.settings.get("split_use_mmap", False)
+                self.file.split(self.output_dir, self.chunk_size, self.max_chunk_bytes, use_mmap=use_mmap)
+            else:
+                self.file.split(self.output_dir, self.chunk_size)
         except Exception as e:
             print(f"Failed to split the file. Error: {e}")
             # spinner.fail(f"Failed to split the file. Error: {e}")
@@ -1,5 +1,6 @@
 import os
 import shutil
+import threading
 from os import listdir
 from os.path import isfile, join
 from typing import Optional
@@ -8,16 +9,39 @@ import pandas as pd
 import requests
 from halo import Halo
 
+from ..exceptions import ValidationError
 from ..files.excel import ExcelFile
+from ..files.input_cache import get_input_cache
 from ..utils.api_calls import ApiService
+from ..utils.concurrency import DEFAULT_MAX_PARALLEL_FILES, map_as_completed
 from ..utils.files import create_directory_if_not_exists, is_valid_directory_path, move_file_to_destination_dir
+from ..utils.gstin import get_reason_message, validate_gstins
+from ..utils.metrics import record_run_metrics
 from ..utils.settings import load_settings
-from ..utils.terminal import get_clean_input
+from ..utils.terminal import get_clean_input, print_line
 from .abstract_task import BaseTask
 
 
+class FileSpinner(Halo):
+    """
+    Halo spinner that still prints its outcome when it is disabled, which it is while several files
+    are processed in parallel and their spinners would overwrite each other.
+    """
+
+    def __init__(self, label: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self.label = label
+
+    def stop_and_persist(self, symbol=" ", text=None):
+        if self.enabled:
+            return super().stop_and_persist(symbol, text)
+        print_line(f"{symbol} {self.label}{text if text is not None else self.text}")
+        return self
+
+
 class PreRegisterFileProcessingTask(BaseTask):
     description = "Task to upload, process, and download a file for pre-registration"
+    input_extensions = (".xlsx",)
 
     def __init__(self, token: Optional[str] = None):
         self.settings = load_settings()
@@ -25,6 +49,11 @@ class PreRegisterFileProcessingTask(BaseTask):
         token = self.settings.get(environment, {}).get("token")
         self.api_service = ApiService(token=token, environment=self.settings.get("environment"))
         self.simple_requests = self.api_service.requester
+        self.max_parallel_files = int(self.settings.get("max_parallel_files", DEFAULT_MAX_PARALLEL_FILES))
+        self.metrics_dir = self.settings.get("metrics_dir")
+        self.input_cache = get_input_cache(self.settings)
+        self.stop_event = threading.Event()
+        self.input_path = None
 
     def get_params(self) -> None:
         """Get parameters for the task from the user."""
@@ -35,11 +64,18 @@ class PreRegisterFileProcessingTask(BaseTask):
                 break
             print(f"\nInvalid input directory path '{self.input_path}'")
 
-    def execute(self) -> None:
-        """Execute the task."""
-        only_files = [file for file in listdir(self.input_path) if isfile(join(self.input_path, file))]
-        input_files = [f for f in only_files if os.path.splitext(f)[1].lower() == ".xlsx"]
+    def get_output_directory(self) -> Optional[str]:
+        return os.path.join(self.input_path, "Result") if self.input_path else None
+
+    def set_params(self, directory_path: str) -> None:
+        """Set the parameters without asking the user."""
+        if not is_valid_directory_path(directory_path):
+            raise ValidationError(f"Invalid input directory path '{directory_path}'")
+        self.input_path = directory_path
+        self.prepare_directories()
 
+    def prepare_directories(self) -> None:
+        """Create the directories of the processed, failed and result files."""
         self.processed_dir = os.path.join(self.input_path, "Processed")
         create_directory_if_not_exists(self.processed_dir)
 
@@ -49,24 +85,54 @@ class PreRegisterFileProcessingTask(BaseTask):
         self.result_dir = os.path.join(self.input_path, "Result")
         create_directory_if_not_exists(self.result_dir)
 
-        for file_name in input_files:
-            file_path = os.path.join(self.input_path, file_name)
-            print(f"\n- Processing {file_path}")
+    def execute(self) -> None:
+        """Execute the task."""
+        self.stop_event.clear()
+        only_files = [file for file in listdir(self.input_path) if isfile(join(self.input_path, file))]
+        input_files = [f for f in only_files if os.path.splitext(f)[1].lower() in self.input_extensions]
+        self.prepare_directories()
+
+        file_paths = [os.path.join(self.input_path, file_name) for file_name in input_files]
+        processed_files = 0
+        with self.record_run_metrics():
+            try:
+                files = map_as_completed(self.process_single_file, file_paths, self.max_parallel_files)
+                for file_path, future in files:
+                    processed_files += 1
+                    error = future.exception()
+                    if error is not None:
+                        print_line(f"\n- Failed to process {file_path}. Error: {error}")
+                    print_line(f"\nProgress: {processed_files} of {len(file_paths)} files done.\n")
+            except BaseException:
+                # Let the files that are still running stop before their next step.
+                self.stop_event.set()
+                raise
+
+    def record_run_metrics(self):
+        """Record the API metrics of a run and write them to the metrics directory when it ends."""
+        return record_run_metrics(
+            type(self).__name__, self.api_service.environment, self.api_service.requester.metrics, self.metrics_dir
+        )
+
+    def process_path(self, file_path: str) -> None:
+        """Process a single input file of the input directory."""
+        # The event of an earlier run that failed is still set, and the worker reuses the task for every file.
+        self.stop_event.clear()
+        with self.record_run_metrics():
             self.process_single_file(file_path)
-            print("\n")
 
     def process_single_file(self, parent_file_path: str):
-        self.file_path = parent_file_path
+        print_line(f"\n- Processing {parent_file_path}")
+        df, invalid_gstins_df, gstin_dups_df, phone_number_dups_df = self.clean_file(parent_file_path)
 
-        df, gstin_dups_df, phone_number_dups_df = self.clean_file()
-
-        input_file_name = os.path.basename(self.file_path)
+        input_file_name = os.path.basename(parent_file_path)
         name_without_extension, _ = os.path.splitext(input_file_name)
-        output_dir = os.path.join(os.path.dirname(self.file_path), "temp_files", name_without_extension)
+        output_dir = os.path.join(os.path.dirname(parent_file_path), "temp_files", name_without_extension)
         create_directory_if_not_exists(output_dir)
 
         files = [
             (df, self.generate_file_name(input_file_name, "unique")),
+            (invalid_gstins_df, self.generate_file_name(input_file_name, "invalid_gstins")),
             (gstin_dups_df, self.generate_file_name(input_file_name, "gstin_dups")),
             (phone_number_dups_df, self.generate_file_name(input_file_name, "phone_number_dups")),
         ]
@@ -74,17 +140,17 @@ class PreRegisterFileProcessingTask(BaseTask):
             output_file = os.path.join(output_dir, file_name)
             self.save_df_to_excel(df, output_file)
 
-        self.file_path = os.path.join(output_dir, self.generate_file_name(input_file_name, "unique"))
-        file_id = self.upload_file()
-        if file_id:
-            processed_file_id = self.process_file(file_id)
-            if processed_file_id:
-                output_file_path = self.download_file(processed_file_id)
+        file_path = os.path.join(output_dir, self.generate_file_name(input_file_name, "unique"))
+        file_id = self.upload_file(file_path)
+        if file_id and not self.stop_event.is_set():
+            processed_file_id = self.process_file(file_path, file_id)
+            if processed_file_id and not self.stop_event.is_set():
+                output_file_path = self.download_file(file_path, processed_file_id)
                 if output_file_path:
                     move_file_to_destination_dir(parent_file_path, self.processed_dir, can_overwrite=True)
                     move_file_to_destination_dir(output_file_path, self.result_dir, can_overwrite=True)
                     return
-        move_file_to_destination_dir(self.file_path, self.failed_dir, can_overwrite=True)
+        move_file_to_destination_dir(file_path, self.failed_dir, can_overwrite=True)
 
     def generate_file_name(self, input_file_name: str, descriptor: str) -> str:
         """Generate an output file name based on the input file name and a descriptor."""
@@ -108,10 +174,11 @@ class PreRegisterFileProcessingTask(BaseTask):
             phone_number = "+91" + phone_number
         return phone_number
 
-    def clean_file(self):
+    def clean_file(self, file_path: str):
         # Using ExcelFile class to read the Excel file
-        excel_file = ExcelFile(self.file_path)
+        excel_file = ExcelFile(file_path, cache=self.input_cache)
         df = excel_file.read()  # you can also specify a sheet name and columns to read
+        df, invalid_gstins_df = self.split_invalid_gstins(df)
 
         gstin_duplicates_df = df[df.duplicated(subset=["gstin"], keep=False)]
         gstin_duplicates_df = gstin_duplicates_df[["gstin", "phone_number", "name", "email"]]
@@ -124,7 +191,18 @@ class PreRegisterFileProcessingTask(BaseTask):
 
         df = df.drop_duplicates(subset=["gstin"], keep=False)
         df = df.drop_duplicates(subset=["phone_number"], keep=False)
-        return df, gstin_dups_df, phone_number_dups_df
+        return df, invalid_gstins_df, gstin_dups_df, phone_number_dups_df
+
+    def split_invalid_gstins(self, df: pd.DataFrame):
+        """Normalize the GSTINs and split off the rows with an invalid GSTIN, with the reason it is invalid."""
+        result = validate_gstins(df["gstin"])
+        df = df.assign(gstin=result.gstins)
+        invalid_gstins_df = df[~result.is_valid][["gstin", "phone_number", "name", "email"]]
+        reasons = [
+            get_reason_message(reason, gstin)
+            for gstin, reason in zip(invalid_gstins_df["gstin"], result.reasons[~result.is_valid])
+        ]
+        return df[result.is_valid], invalid_gstins_df.assign(reason=reasons)
 
     def create_duplicate_dfs(self, df, column):
         df = df.sort_values(by=column)
@@ -145,13 +223,20 @@ class PreRegisterFileProcessingTask(BaseTask):
 
         return result_df
 
-    def upload_file(self) -> str:
+    def start_spinner(self, text: str, file_path: str) -> Halo:
+        """Start a spinner for a step of a file, naming the file when files are processed in parallel."""
+        parallel = self.max_parallel_files > 1
+        label = f"[{os.path.basename(file_path)}] " if parallel else ""
+        spinner = FileSpinner(label=label, text=text, spinner="dots", enabled=not parallel)
+        spinner.start()
+        return spinner
+
+    def upload_file(self, file_path: str) -> str:
         """Upload the file."""
         file_id = None
-        spinner = Halo(text="Uploading File", spinner="dots")
-        spinner.start()
+        spinner = self.start_spinner("Uploading File", file_path)
         try:
-            with open(self.file_path, "rb") as f:
+            with open(file_path, "rb") as f:
                 response = self.simple_requests.post(
                     ApiService.PRE_REGISTER_FILE_UPLOAD_ENDPOINT,
                     files={"files": f},
@@ -166,13 +251,11 @@ class PreRegisterFileProcessingTask(BaseTask):
                 spinner.succeed("File uploaded successfully.")
         except requests.exceptions.RequestException as e:
             spinner.fail(f"Failed to upload the file. Error: {e}")
-            print(str(e))
         return file_id
 
-    def process_file(self, file_id: str) -> str:
+    def process_file(self, file_path: str, file_id: str) -> str:
         """Process the file."""
-        spinner = Halo(text="Processing File", spinner="dots")
-        spinner.start()
+        spinner = self.start_spinner("Processing File", file_path)
         try:
             response = self.simple_requests.post(f"accounts/pre-register/file/{file_id}/process", stream=True)
             if response.status_code == 200:
@@ -184,15 +267,14 @@ class PreRegisterFileProcessingTask(BaseTask):
 
         return None
 
-    def download_file(self, file_id: str) -> Optional[str]:
+    def download_file(self, file_path: str, file_id: str) -> Optional[str]:
         """Download the processed file."""
-        spinner = Halo(text="Downloading File", spinner="dots")
-        spinner.start()
+        spinner = self.start_spinner("Downloading File", file_path)
         try:
             response = self.simple_requests.get(f"accounts/pre-register/file/{file_id}/result", stream=True)
             if response:
-                split = os.path.splitext(self.file_path)
-                output_file_path = os.path.join(os.path.dirname(self.file_path), f"{split[0]}_output{split[1]}")
+                split = os.path.splitext(file_path)
+                output_file_path = os.path.join(os.path.dirname(file_path), f"{split[0]}_output{split[1]}")
                 with open(output_file_path, "wb") as file:
                     for chunk in response.iter_content(chunk_size=1024):
                         file.write(chunk)
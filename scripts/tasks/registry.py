@@ -0,0 +1,113 @@
+import ast
+import importlib
+import os
+import pkgutil
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+
+from .abstract_task import BaseTask
+
+TASKS_DIR = os.path.dirname(__file__)
+TASKS_PACKAGE = __name__.rsplit(".", 1)[0]
+BASE_TASK_NAME = BaseTask.__name__
+
+
+class TaskSpec(NamedTuple):
+    """A task found in the tasks package, described without importing its module."""
+
+    name: str  # Class name of the task.
+    module: str  # Fully qualified name of the module defining the task.
+    description: str
+
+    def load(self) -> Type[BaseTask]:
+        """
+        Import the module of the task, with all its dependencies, and return the task class.
+
+        :return: The task class.
+        """
+        return getattr(importlib.import_module(self.module), self.name)
+
+
+class _ClassInfo(NamedTuple):
+    module: str
+    bases: List[str]
+    defines_description: bool
+    description: Optional[str]  # None if the class does not define a literal description.
+
+
+def _get_base_name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _get_description(node: ast.ClassDef) -> Tuple[bool, Optional[str]]:
+    for statement in node.body:
+        if isinstance(statement, ast.Assign):
+            targets, value = statement.targets, statement.value
+        elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+            targets, value = [statement.target], statement.value
+        else:
+            continue
+        if any(isinstance(target, ast.Name) and target.id == "description" for target in targets):
+            try:
+                return True, str(ast.literal_eval(value))
+            except ValueError:
+                return True, None
+    return False, None
+
+
+def _scan_module(module: str, path: str) -> Dict[str, _ClassInfo]:
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read(), filename=path)
+    return {
+        node.name: _ClassInfo(module, [_get_base_name(base) for base in node.bases], *_get_description(node))
+        for node in tree.body
+        if isinstance(node, ast.ClassDef)
+    }
+
+
+def discover_tasks(tasks_dir: str = TASKS_DIR, package: str = TASKS_PACKAGE) -> Dict[str, TaskSpec]:
+    """
+    Find the BaseTask subclasses of the tasks package by parsing the source of its modules.
+
+    Nothing is imported, so the heavy dependencies of a task (pandas, openpyxl, halo, ...) are only
+    loaded by `TaskSpec.load` once the task is picked. Subclasses of other tasks are found too, and
+    inherit their description like the classes would. A description that is not a literal is read
+    by importing its module.
+
+    :param tasks_dir: Directory of the tasks package.
+    :param package: Name of the tasks package.
+    :return: Dictionary of task names to specs, ordered by module name and then by task name.
+    """
+    classes = {}
+    for module_info in pkgutil.iter_modules([tasks_dir]):
+        if module_info.ispkg:
+            continue
+        path = os.path.join(tasks_dir, f"{module_info.name}.py")
+        if os.path.isfile(path):
+            classes.update(_scan_module(f"{package}.{module_info.name}", path))
+
+    def is_task(name: str, seen: frozenset = frozenset()) -> bool:
+        info = classes.get(name)
+        if info is None or name in seen:
+            return False
+        return any(base == BASE_TASK_NAME or is_task(base, seen | {name}) for base in info.bases)
+
+    def get_description(name: str) -> str:
+        info = classes[name]
+        if info.defines_description:
+            if info.description is not None:
+                return info.description
+            return getattr(importlib.import_module(info.module), name).description
+        for base in info.bases:
+            if base in classes and base != BASE_TASK_NAME:
+                return get_description(base)
+        if any(base == BASE_TASK_NAME for base in info.bases):
+            return BaseTask.description
+        return getattr(importlib.import_module(info.module), name).description
+
+    task_names = [name for name in classes if name != BASE_TASK_NAME and is_task(name)]
+    task_names.sort(key=lambda name: (classes[name].module, name))
+    return {name: TaskSpec(name, classes[name].module, get_description(name)) for name in task_names}
@@ -1,22 +1,41 @@
+import asyncio
 import os
 import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import pandas as pd
-from halo import Halo
-from requests.exceptions import HTTPError
+from log_symbols import LogSymbols
+from requests.exceptions import RequestException
 
-from ..exceptions import ValidationError
+from ..exceptions import GstinFetchError, ValidationError
 from ..files.base import BaseFile
 from ..files.csv import CsvFile
 from ..files.excel import ExcelFile
+from ..files.input_cache import get_input_cache
+from ..files.writers import ExcelRowWriter
 from ..utils.api_calls import ApiService
-from ..utils.date_time import change_datetime_format, is_valid_period
+from ..utils.async_api_calls import AsyncApiService
+from ..utils.cache import CacheMode
+from ..utils.checkpoint import CheckpointJournal
+from ..utils.concurrency import (
+    DEFAULT_MAX_PARALLEL_FILES,
+    EventLoopThread,
+    bounded_ordered_map,
+    map_as_completed,
+)
+from ..utils.date_time import change_datetime_format, get_periods_in_range, is_valid_period
 from ..utils.files import create_directory_if_not_exists, is_valid_directory_path
+from ..utils.gstin import preflight_gstins
+from ..utils.metrics import record_run_metrics
+from ..utils.profiling import MOVE_FILES, profile_phase
+from ..utils.progress import ProgressReporter
+from ..utils.retry import DEFAULT_MAX_PAUSE_SECONDS, CircuitOpenError
 from ..utils.settings import load_settings
-from ..utils.terminal import COLOUR_ORANGE, COLOUR_RED, format_text, get_clean_input
+from ..utils.terminal import COLOUR_ORANGE, COLOUR_RED, format_text, get_clean_input, print_line
 from .abstract_task import BaseTask
 
 
@@ -27,6 +46,12 @@ class TaxFilingStatusTask(BaseTask):
 
     description = "Task to retrieve tax filing details for multiple GSTINs from a file."
     FILE_CLASSES = {"CSV": CsvFile, "XLSX": ExcelFile}
+    input_extensions = (".csv", ".xlsx")
+    DEFAULT_MAX_WORKERS = 8
+    MAX_PERIODS = 36
+    TAX_PAYER_COLUMNS = ["gstin", "trade_name", "legal_name", "status", "business_type", "registration_date"]
+    TAX_FILING_COLUMNS = ["return_period", "gstr1", "gstr3b"]
+    FAILED_GSTIN_COLUMNS = ["gstin", "reason"]
 
     def __init__(self, token: Optional[str] = None):
         """
@@ -34,10 +59,36 @@ class TaxFilingStatusTask(BaseTask):
         :param token: API token, optional
         """
         self.settings = load_settings()
-        environment = self.settings.get("environment", "")
-        token = self.settings.get(environment, {}).get("token")
-        self.api_service = ApiService(token=token, environment=self.settings.get("environment"))
-        self.failed_gstins = []
+        self.environment = self.settings.get("environment")
+        self.token = self.settings.get(self.environment or "", {}).get("token")
+        self.max_workers = int(self.settings.get("max_workers", self.DEFAULT_MAX_WORKERS))
+        self.keep_alive = self.settings.get("keep_alive", True)
+        self.use_async = self.settings.get("use_async", False)
+        self.cache_mode = self.settings.get("cache_mode", CacheMode.USE.value)
+        self.max_parallel_files = int(self.settings.get("max_parallel_files", DEFAULT_MAX_PARALLEL_FILES))
+        self.metrics_dir = self.settings.get("metrics_dir")
+        self.max_pause_seconds = float(self.settings.get("max_pause_seconds", DEFAULT_MAX_PAUSE_SECONDS))
+        self.input_cache = get_input_cache(self.settings)
+        self.api_service = ApiService(
+            token=self.token,
+            environment=self.environment,
+            pool_size=self.max_workers,
+            keep_alive=self.keep_alive,
+            cache_mode=self.cache_mode,
+            rate_limits=self.settings.get("rate_limits"),
+            retry_policies=self.settings.get("retry_policies"),
+            circuit_breakers=self.settings.get("circuit_breakers"),
+        )
+        self.async_api_service = None
+        self.gstin_executor = None
+        self.directory_path = None
+        self.period_executor = None
+        self.return_periods = []
+        self.pause_lock = threading.Lock()
+        self.paused_until = 0.0
+        self.paused_seconds = 0.0
+        self.stop_event = threading.Event()
+        self.progress = ProgressReporter("GSTINs")
 
     def get_params(self) -> None:
         """
@@ -45,32 +96,87 @@ class TaxFilingStatusTask(BaseTask):
         """
         while True:
             self.directory_path = get_clean_input("Give the directory path containing the input files: ")
-            print()
+            print_line()
             if is_valid_directory_path(self.directory_path):
                 break
             message = (
                 f"The path given `{self.directory_path}` is not valid or it is a file. "
                 "Please provide a valid directory path!"
             )
-            print(f"{format_text(message, colour=COLOUR_RED)}\n")
+            print_line(f"{format_text(message, colour=COLOUR_RED)}\n")
 
         while True:
             prompt_question = (
                 "For which filing period do you want to fetch the data "
-                "(format is MM-YYYY. e.g 03-2023 for March 2023): "
+                "(format is MM-YYYY. e.g 03-2023 for March 2023, "
+                "or a range like 04-2022:03-2023 for every month from April 2022 to March 2023): "
             )
-            return_period = get_clean_input(prompt_question)
-            print()
-            if not is_valid_period(return_period, "%m-%Y"):
-                message = (
-                    f"'{return_period}' has an invalid format. "
-                    "Please enter the filing period in the format 'MM-YYYY'.\n"
-                )
-                print(f"{format_text(message, colour=COLOUR_RED)}\n")
-                continue
-            self.return_period = return_period
-            self.return_period_desc = change_datetime_format(return_period, "%m-%Y", "%b %Y")
-            break
+            value = get_clean_input(prompt_question)
+            print_line()
+            try:
+                self.set_return_periods(value)
+                break
+            except ValidationError as e:
+                print_line(f"{format_text(str(e), colour=COLOUR_RED)}\n\n")
+
+    def get_output_directory(self) -> Optional[str]:
+        return os.path.join(self.directory_path, "output") if self.directory_path else None
+
+    def set_params(self, directory_path: str, return_period: str = "") -> None:
+        """
+        Set the parameters without asking the user.
+        :param directory_path: Directory containing the input files
+        :param return_period: Filing period as MM-YYYY, or a range as MM-YYYY:MM-YYYY
+        """
+        if not is_valid_directory_path(directory_path):
+            raise ValidationError(f"The path given `{directory_path}` is not valid or it is a file.")
+        self.directory_path = directory_path
+        self.set_return_periods(return_period)
+        self.prepare_output_directory()
+
+    def set_return_periods(self, value: str) -> None:
+        """
+        Set the return periods from a filing period or a range of filing periods.
+        :param value: Filing period as MM-YYYY, or a range as MM-YYYY:MM-YYYY
+        """
+        periods = [period.strip() for period in value.split(":")]
+        invalid_period = next((period for period in periods if not is_valid_period(period, "%m-%Y")), None)
+        if len(periods) > 2 or invalid_period is not None:
+            raise ValidationError(
+                f"'{invalid_period or ':'.join(periods)}' has an invalid format. "
+                "Please enter the filing period in the format 'MM-YYYY' or a range as 'MM-YYYY:MM-YYYY'."
+            )
+        return_periods = get_periods_in_range(periods[0], periods[-1], "%m-%Y")
+        if not return_periods or len(return_periods) > self.MAX_PERIODS:
+            raise ValidationError(
+                f"The range should go forward in time and cover at most {self.MAX_PERIODS} months. "
+                "Please enter a valid range."
+            )
+        self.return_periods = return_periods
+        self.return_period = return_periods[0]
+        self.return_period_desc = change_datetime_format(self.return_period, "%m-%Y", "%b %Y")
+
+    def get_return_periods(self) -> List[str]:
+        """
+        Get the return periods to fetch the filing data for.
+        :return: List of return periods in MM-YYYY format
+        """
+        return self.return_periods or [self.return_period]
+
+    def get_output_columns(self) -> List[str]:
+        """
+        Get the columns of the output file. A single return period keeps the filing columns as they
+        are; a range of return periods gets a GSTR1 and a GSTR3B column per period.
+        :return: List of column names
+        """
+        return_periods = self.get_return_periods()
+        if len(return_periods) == 1:
+            return self.TAX_PAYER_COLUMNS + self.TAX_FILING_COLUMNS
+        columns = list(self.TAX_PAYER_COLUMNS)
+        for return_period in return_periods:
+            return_period_desc = change_datetime_format(return_period, "%m-%Y", "%b %Y")
+            columns += [f"gstr1 {return_period_desc}", f"gstr3b {return_period_desc}"]
+        return columns
 
     def execute(self) -> None:
         """
@@ -78,10 +184,17 @@ class TaxFilingStatusTask(BaseTask):
         """
         self.prepare_output_directory()
         files = self.get_input_files()
-        # try:
         self.process_files(files)
-        # except Exception:
-        # self.move_failed_gstins()
+
+    def process_path(self, file_path: str) -> None:
+        """
+        Process a single input file of the directory.
+        :param file_path: Path of the input file
+        """
+        extension = os.path.splitext(file_path)[1][1:].upper()
+        if extension not in self.FILE_CLASSES:
+            raise ValidationError(f"The file `{os.path.basename(file_path)}` is not a valid input file.")
+        self.process_files([self.create_input_file(file_path, extension)])
 
     def prepare_output_directory(self) -> None:
         """
@@ -92,31 +205,150 @@ class TaxFilingStatusTask(BaseTask):
 
     def process_files(self, files: List[BaseFile]) -> None:
         """
-        Process each file in the given list of files.
+        Process the given files, up to `max_parallel_files` at the same time.
+
+        All files share one pool of `max_workers` GSTIN workers and the per-endpoint rate limiters,
+        so processing more files at once does not raise the load on the API.
         :param files: List of file instances to be processed
         """
+        # The event of an earlier run that failed is still set, and the worker reuses the task for every file.
+        self.stop_event.clear()
+        self.reset_pauses()
+        self.api_service.start_run()
         sample_file = files[0].file_path
         parent_dir = Path(sample_file).parent
         processed_dir_path = os.path.join(parent_dir, "processed")
         create_directory_if_not_exists(processed_dir_path)
+        create_directory_if_not_exists(os.path.join(self.directory_path, "failed"))
+
+        totals = {"files": 0, "failed_files": 0, "processed": 0, "failed": 0}
+        with self.record_run_metrics(), self.start_workers(), ProgressReporter("GSTINs") as self.progress:
+            try:
+                for input_file, future in map_as_completed(self.process_file, files, self.max_parallel_files):
+                    totals["files"] += 1
+                    if future.exception() is not None:
+                        totals["failed_files"] += 1
+                        message = f"Failed to process the file {input_file.file_path}. Error: {future.exception()}"
+                        print_line(format_text(message, colour=COLOUR_RED))
+                    else:
+                        processed, failed = future.result()
+                        totals["processed"] += processed
+                        totals["failed"] += failed
+                        self.move_processed_file(processed_dir_path, input_file.file_path)
+                    print_line(
+                        f"Progress: {totals['files']} of {len(files)} files done, "
+                        f"{totals['processed']} GSTINs processed, {totals['failed']} GSTINs failed, "
+                        f"{totals['failed_files']} files failed.\n"
+                    )
+            except BaseException:
+                # Let the files that are still running stop at their next GSTIN.
+                self.stop_event.set()
+                raise
+        self.print_api_stats()
+
+    def process_file(self, input_file: BaseFile) -> Tuple[int, int]:
+        """
+        Generate the output and failed GSTINs files of a single input file.
+        :param input_file: File instance to be processed
+        :return: Tuple of the number of processed and failed GSTINs
+        """
+        print_line(f"Starting processing for file: {input_file.file_path}")
+        start_time = time.time()
+        processed, failed = self.generate_output_file(input_file)
+        time_taken = (time.time() - start_time) / 60
+        print_line(
+            f"Finished processing for file: {input_file.file_path} in "
+            f"{format_text(f'{time_taken:.2f}', COLOUR_ORANGE)} minutes"
+        )
+        return processed, failed
+
+    @contextmanager
+    def start_workers(self) -> Iterator[None]:
+        """
+        Start the GSTIN workers shared by all files of a run: a pool of `max_workers` threads, or a
+        single event loop with the async client when `use_async` is enabled in the settings.
+        """
+        if self.gstin_executor is not None:
+            yield
+            return
+
+        if not self.use_async:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as self.gstin_executor:
+                try:
+                    if len(self.get_return_periods()) == 1:
+                        yield
+                        return
+                    # The filing data of all periods of a GSTIN is fetched concurrently on a second pool,
+                    # so the GSTIN workers waiting for it can not starve it. Both pools share the connections.
+                    requester = self.api_service.requester
+                    if requester.pool_size < self.max_workers * 2:
+                        requester.configure_pool(self.max_workers * 2, self.keep_alive)
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as self.period_executor:
+                        try:
+                            yield
+                        finally:
+                            self.period_executor = None
+                finally:
+                    self.gstin_executor = None
+            return
 
-        for input_file in files:
-            print("=" * 50)
-            print(f"Starting processing for file: {input_file.file_path}")
-            start_time = time.time()
-            self.generate_output_file(input_file)
-            end_time = time.time()
-            time_taken = (end_time - start_time) / 60
-            print(f"Time taken to process the file: {format_text(f'{time_taken:.2f}', COLOUR_ORANGE)} minutes")
-            print(f"Finished processing for file: {input_file.file_path}")
-            print("=" * 50 + "\n")
-            self.move_processed_file(processed_dir_path, input_file.file_path)
-        self.create_failed_gstin_file()
+        with EventLoopThread() as loop_thread:
+            self.async_api_service = AsyncApiService(
+                token=self.token,
+                environment=self.environment,
+                pool_size=self.max_workers,
+                keep_alive=self.keep_alive,
+                cache_mode=self.cache_mode,
+                rate_limits=self.settings.get("rate_limits"),
+                retry_policies=self.settings.get("retry_policies"),
+                circuit_breakers=self.settings.get("circuit_breakers"),
+            )
+            # Share the in-run de-duplication and the metrics with the sync client, so they span all files of the run.
+            self.async_api_service.single_flight = self.api_service.single_flight
+            self.async_api_service.requester.metrics = self.api_service.requester.metrics
+            self.gstin_executor = loop_thread
+            try:
+                yield
+            finally:
+                self.gstin_executor = None
+                loop_thread.run(self.async_api_service.close)
+
+    def record_run_metrics(self):
+        """
+        Record the API metrics of a run and write them to the metrics directory when it ends.
+        """
+        return record_run_metrics(
+            type(self).__name__, self.environment, self.api_service.requester.metrics, self.metrics_dir
+        )
+
+    def print_api_stats(self) -> None:
+        """
+        Print the response cache counters and how many API calls reused a pooled connection.
+        """
+        for endpoint, counters in self.api_service.cache_stats().items():
+            print_line(f"Cache `{endpoint}`: {counters['hits']} hits, {counters['misses']} misses")
+        dedup_stats = self.api_service.dedup_stats()
+        print_line(f"Duplicate lookups served without an API call: {dedup_stats['hits'] + dedup_stats['shared']}")
+        requester = (self.async_api_service or self.api_service).requester
+        for endpoint, stats in requester.rate_limiters.stats().items():
+            print_line(
+                f"Endpoint `{endpoint}`: settled at {stats['limit']} concurrent requests, "
+                f"{stats['throttled']} throttled responses"
+            )
+        print_line(f"Retried requests: {requester.retries}")
+        if self.use_async:
+            return
+        stats = self.api_service.requester.pool_stats()
+        print_line(
+            f"API calls: {stats['requests']}, new connections: {stats['new_connections']}, "
+            f"reused connections: {stats['hits']}\n"
+        )
 
     def move_processed_file(self, processed_dir_path: str, input_file_path: str) -> None:
         basename = os.path.basename(input_file_path)
         processed_file_path = os.path.join(processed_dir_path, basename)
-        shutil.move(input_file_path, processed_file_path)
+        with profile_phase(MOVE_FILES):
+            shutil.move(input_file_path, processed_file_path)
 
     def get_input_files(self) -> List[BaseFile]:
         """
@@ -126,24 +358,35 @@ class TaxFilingStatusTask(BaseTask):
         files = []
         if not os.path.isdir(self.directory_path):
             message = f"{self.directory_path} is not a valid directory."
-            print(format_text(message, colour=COLOUR_RED))
+            print_line(format_text(message, colour=COLOUR_RED))
             return files
 
         supported_extensions = self.FILE_CLASSES.keys()
         for filename in os.listdir(self.directory_path):
             if filename.startswith("~") or filename.startswith(".~"):
                 continue
-            extension = filename.split(".")[-1].upper()
-            if extension not in supported_extensions:
-                print(format_text(f"The file `{filename}` is not a valid input file.\n", colour=COLOUR_RED))
-                continue
             file_path = os.path.join(self.directory_path, filename)
             if not os.path.isfile(file_path):
                 continue
-            file_instance = self.FILE_CLASSES[extension](file_path)
+            extension = filename.split(".")[-1].upper()
+            if extension not in supported_extensions:
+                print_line(format_text(f"The file `{filename}` is not a valid input file.\n", colour=COLOUR_RED))
+                continue
+            file_instance = self.create_input_file(file_path, extension)
             files.append(file_instance)
         return files
 
+    def create_input_file(self, file_path: str, extension: str) -> BaseFile:
+        """
+        Create the file instance of an input file. Excel files are read through the input cache.
+        :param file_path: Path of the input file
+        :param extension: Upper-case extension of the file, a key of `FILE_CLASSES`
+        :return: The file instance
+        """
+        if self.FILE_CLASSES[extension] is ExcelFile:
+            return ExcelFile(file_path, cache=self.input_cache)
+        return self.FILE_CLASSES[extension](file_path)
+
     def get_gstins(self, file: BaseFile) -> List[str]:
         """
         Retrieve GSTINs from the file.
@@ -154,7 +397,7 @@ class TaxFilingStatusTask(BaseTask):
         gstin_column = next((col for col in file_df.columns if col.lower() == "gstin"), None)
         if gstin_column:
             return file_df[gstin_column].tolist()
-        print("Column 'gstin' does not exist.")
+        print_line("Column 'gstin' does not exist.")
         raise ValidationError("Column 'gstin' does not exist.")
 
     def generate_output_file_path(self, file_name: str) -> str:
@@ -167,101 +410,351 @@ class TaxFilingStatusTask(BaseTask):
         base, extension = os.path.splitext(base_name)
         return os.path.join(self.directory_path, "output", f"{base}_output.xlsx")
 
-    def append_failed_gstin_and_log(self, index, gstin, start_time, spinner, message):
-        self.failed_gstins.append(gstin)
-        end_time = time.time()
-        time_taken = end_time - start_time
-        spinner.fail(f"{index}) {message} for GSTIN '{gstin}'. Time taken: {time_taken:.2f} seconds.")
+    def append_failed_gstin_and_log(self, failed_gstins_writer, index, gstin, time_taken, message, label=""):
+        failed_gstins_writer.write_row({"gstin": gstin, "reason": message})
+        self.progress.report_failure(
+            f"{LogSymbols.ERROR.value} {label}{index}) {message} for GSTIN '{gstin}'. "
+            f"Time taken: {time_taken:.2f} seconds."
+        )
 
-    def generate_output_file(self, file):
-        gstins = self.get_gstins(file)
-        output_file_path = self.generate_output_file_path(file.file_path)
-        data = []
+    def parse_tax_payer_response(self, tax_payer_response) -> Dict[str, str]:
+        """
+        Extract the taxpayer data from a taxpayer endpoint response.
+        :param tax_payer_response: Response of the taxpayer endpoint
+        :return: Dictionary of tax payer data
+        :raises GstinFetchError: If the response does not contain taxpayer data
+        """
+        try:
+            tax_payer_data = tax_payer_response.json()["data"]
+        except RequestException:
+            raise GstinFetchError("HTTP Error while fetching taxpayer data")
+        except KeyError:
+            raise GstinFetchError(tax_payer_response.json())
+        if not tax_payer_data.get("gstin"):
+            raise GstinFetchError("Error while fetching tax payer data")
+        return tax_payer_data
 
-        for index, gstin in enumerate(gstins, start=1):
-            with Halo(
-                text=format_text(f"{index}) Processing GSTIN '{gstin}'", colour=COLOUR_ORANGE), spinner="dots"
-            ) as spinner:
-                start_time = time.time()
+    def parse_tax_filing_response(self, tax_filing_response, return_period: str) -> Dict[str, str]:
+        """
+        Extract the filing data from a tax filing endpoint response.
+        :param tax_filing_response: Response of the tax filing endpoint
+        :param return_period: Return period the response is for
+        :return: Dictionary of tax filing data, with placeholders when nothing was filed
+        :raises GstinFetchError: If the response does not contain filing data
+        """
+        try:
+            tax_filing_data = tax_filing_response.json()["data"]
+        except KeyError:
+            raise GstinFetchError(tax_filing_response.json().get("message"))
+        except RequestException:
+            raise GstinFetchError("HTTP Error while fetching tax filing data")
+        if tax_filing_data:
+            return tax_filing_data
+        return_period_desc = change_datetime_format(return_period, "%m-%Y", "%b %Y")
+        return {"gstr1": "-", "gstr3b": "-", "return_period": return_period_desc}
 
-                try:
-                    tax_payer_response = self.api_service.call_taxpayer_endpoint(gstin)
-                    tax_payer_data = tax_payer_response.json()["data"]
-                except HTTPError:
-                    self.append_failed_gstin_and_log(
-                        index, gstin, start_time, spinner, "HTTP Error while fetching taxpayer data"
-                    )
-                    continue
-                except KeyError:
-                    self.append_failed_gstin_and_log(index, gstin, start_time, spinner, tax_payer_response.json())
-                    continue
+    def fetch_tax_filing_data(self, gstin: str, return_period: str) -> Dict[str, str]:
+        """
+        Fetch the tax filing data of a GSTIN for a return period.
+        :param gstin: GSTIN to fetch the data for
+        :param return_period: Return period in MM-YYYY format
+        :return: Dictionary of tax filing data
+        :raises GstinFetchError: If the API call fails
+        """
+        try:
+            tax_filing_response = self.api_service.call_tax_filing_endpoint(gstin, return_period)
+        except CircuitOpenError:
+            raise
+        except RequestException:
+            raise GstinFetchError("HTTP Error while fetching tax filing data")
+        return self.parse_tax_filing_response(tax_filing_response, return_period)
 
-                try:
-                    tax_filing_response = self.api_service.call_tax_filing_endpoint(gstin, self.return_period)
-                    tax_filing_data = tax_filing_response.json()["data"]
-                except KeyError as err:
-                    self.append_failed_gstin_and_log(
-                        index, gstin, start_time, spinner, tax_filing_response.json()["message"]
-                    )
+    def fetch_row_data(self, gstin: str) -> Dict[str, str]:
+        """
+        Fetch the taxpayer data of a GSTIN once and its tax filing data for every return period,
+        and build its output row.
+        :param gstin: GSTIN to fetch the data for
+        :return: A dictionary of relevant data for a single row
+        :raises GstinFetchError: If any of the API calls fails for the GSTIN
+        """
+        try:
+            tax_payer_response = self.api_service.call_taxpayer_endpoint(gstin)
+        except CircuitOpenError:
+            raise
+        except RequestException:
+            raise GstinFetchError("HTTP Error while fetching taxpayer data")
+        tax_payer_data = self.parse_tax_payer_response(tax_payer_response)
+
+        return_periods = self.get_return_periods()
+        if self.period_executor is None:
+            tax_filings = [self.fetch_tax_filing_data(gstin, return_period) for return_period in return_periods]
+        else:
+            futures = [
+                self.period_executor.submit(self.fetch_tax_filing_data, gstin, return_period)
+                for return_period in return_periods
+            ]
+            tax_filings = [future.result() for future in futures]
+        return self.get_row_data(tax_payer_data, dict(zip(return_periods, tax_filings)))
+
+    async def fetch_tax_filing_data_async(self, gstin: str, return_period: str) -> Dict[str, str]:
+        """
+        Async counterpart of `fetch_tax_filing_data` using the async API client.
+        :param gstin: GSTIN to fetch the data for
+        :param return_period: Return period in MM-YYYY format
+        :return: Dictionary of tax filing data
+        :raises GstinFetchError: If the API call fails
+        """
+        try:
+            tax_filing_response = await self.async_api_service.call_tax_filing_endpoint(gstin, return_period)
+        except CircuitOpenError:
+            raise
+        except RequestException:
+            raise GstinFetchError("HTTP Error while fetching tax filing data")
+        return self.parse_tax_filing_response(tax_filing_response, return_period)
+
+    async def fetch_row_data_async(self, gstin: str) -> Dict[str, str]:
+        """
+        Async counterpart of `fetch_row_data` using the async API client.
+        :param gstin: GSTIN to fetch the data for
+        :return: A dictionary of relevant data for a single row
+        :raises GstinFetchError: If any of the API calls fails for the GSTIN
+        """
+        try:
+            tax_payer_response = await self.async_api_service.call_taxpayer_endpoint(gstin)
+        except CircuitOpenError:
+            raise
+        except RequestException:
+            raise GstinFetchError("HTTP Error while fetching taxpayer data")
+        tax_payer_data = self.parse_tax_payer_response(tax_payer_response)
+
+        return_periods = self.get_return_periods()
+        tax_filings = await asyncio.gather(
+            *(self.fetch_tax_filing_data_async(gstin, return_period) for return_period in return_periods)
+        )
+        return self.get_row_data(tax_payer_data, dict(zip(return_periods, tax_filings)))
+
+    def start_pause(self, error: CircuitOpenError) -> bool:
+        """
+        Pause the run because the API is failing, or join the pause another worker started. Logged once
+        per pause, not per worker. The pauses since the API last answered add up to at most
+        `max_pause_seconds`, after which the GSTINs fail instead of waiting.
+        :param error: The error raised by the open circuit breaker
+        :return: True if the worker should wait `error.retry_after` seconds, False if its GSTIN should fail
+        """
+        with self.pause_lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return True
+            if self.paused_seconds + error.retry_after > self.max_pause_seconds:
+                return False
+            self.paused_until = now + error.retry_after
+            self.paused_seconds += error.retry_after
+        message = f"The API is failing, pausing for {error.retry_after:.0f} seconds before trying again."
+        print_line(format_text(message, colour=COLOUR_RED))
+        return True
+
+    def reset_pauses(self) -> None:
+        """
+        Give the run its whole `max_pause_seconds` again, when it starts and whenever the API answers.
+        """
+        with self.pause_lock:
+            self.paused_seconds = 0.0
+
+    def get_pause_failure(self, error: CircuitOpenError) -> str:
+        return f"The API is still failing after pausing for {self.paused_seconds:.0f} seconds: {error}"
+
+    def process_gstin(self, item: Tuple[int, str]) -> Tuple[int, str, Optional[Dict[str, str]], str, float]:
+        """
+        Fetch the row data of a single GSTIN. Runs on a worker thread.
+        :param item: Tuple of the 1-based row index and the GSTIN
+        :return: Tuple of index, GSTIN, row data (None on failure), failure message and time taken
+        """
+        index, gstin = item
+        start_time = time.time()
+        self.progress.start()
+        while True:
+            try:
+                row_data, message = self.fetch_row_data(gstin), ""
+            except GstinFetchError as e:
+                row_data, message = None, e.message
+            except CircuitOpenError as e:
+                if self.start_pause(e):
+                    time.sleep(e.retry_after)
                     continue
-                except HTTPError:
-                    self.append_failed_gstin_and_log(
-                        index, gstin, start_time, spinner, "HTTP Error while fetching tax filing data"
-                    )
+                row_data, message = None, self.get_pause_failure(e)
+            else:
+                # The API answered, so a later outage may pause the run again.
+                self.reset_pauses()
+            self.progress.finish(failed=row_data is None)
+            return index, gstin, row_data, message, time.time() - start_time
+
+    async def process_gstin_async(self, item: Tuple[int, str]) -> Tuple[int, str, Optional[Dict[str, str]], str, float]:
+        """
+        Async counterpart of `process_gstin`. Runs on the event loop thread.
+        :param item: Tuple of the 1-based row index and the GSTIN
+        :return: Tuple of index, GSTIN, row data (None on failure), failure message and time taken
+        """
+        index, gstin = item
+        start_time = time.time()
+        self.progress.start()
+        while True:
+            try:
+                row_data, message = await self.fetch_row_data_async(gstin), ""
+            except GstinFetchError as e:
+                row_data, message = None, e.message
+            except CircuitOpenError as e:
+                if self.start_pause(e):
+                    await asyncio.sleep(e.retry_after)
                     continue
+                row_data, message = None, self.get_pause_failure(e)
+            else:
+                self.reset_pauses()
+            self.progress.finish(failed=row_data is None)
+            return index, gstin, row_data, message, time.time() - start_time
 
-                filing_data = (
-                    tax_filing_data
-                    if tax_filing_data
-                    else {"gstr1": "-", "gstr3b": "-", "return_period": self.return_period_desc}
+    def iter_gstin_results(self, gstins: List[str]) -> Iterator[Tuple[int, str, Optional[Dict[str, str]], str, float]]:
+        """
+        Fetch the row data of all GSTINs concurrently on the workers of the run, yielding the results
+        in input order.
+        :param gstins: List of GSTINs
+        :return: Iterator of `process_gstin` results
+        """
+        with self.start_workers():
+            items = enumerate(gstins, start=1)
+            if self.use_async:
+                # Submit no more than one coroutine per worker, so the event loop does not start
+                # far more requests than the configured concurrency.
+                yield from bounded_ordered_map(
+                    self.process_gstin_async, items, self.max_workers, self.max_workers, self.gstin_executor
+                )
+            else:
+                yield from bounded_ordered_map(
+                    self.process_gstin, items, self.max_workers, executor=self.gstin_executor
                 )
 
-                if tax_payer_data.get('gstin'):
-                    row_data = self.get_row_data(tax_payer_data, filing_data)
-                    data.append(row_data)
-                else:
-                    self.append_failed_gstin_and_log(
-                        index, gstin, start_time, spinner, "Error while fetching tax payer data"
-                    )
-                    continue
+    def preflight_gstins(self, gstins: List, failed_gstins_writer: ExcelRowWriter, label: str = "") -> List[str]:
+        """
+        Validate and de-duplicate the GSTINs of a file before any API call. Invalid GSTINs are
+        added to the failed GSTINs with the reason they were rejected.
+        :param gstins: GSTINs of the input file
+        :param failed_gstins_writer: Writer of the failed GSTINs file of the input file
+        :param label: Prefix of the log lines, naming the input file
+        :return: Valid GSTINs without duplicates, in input order
+        """
+        preflight = preflight_gstins(gstins)
+        for gstin, reason in preflight.rejected:
+            failed_gstins_writer.write_row({"gstin": gstin, "reason": reason})
+            self.progress.report_failure(f"{LogSymbols.ERROR.value} {label}{reason}")
+        if preflight.rejected or preflight.duplicates:
+            message = (
+                f"{label}Skipped {len(preflight.rejected)} invalid and {preflight.duplicates} duplicate GSTINs, "
+                f"fetching {len(preflight.gstins)} GSTINs.\n"
+            )
+            print_line(format_text(message, colour=COLOUR_ORANGE))
+        return preflight.gstins
+
+    def generate_checkpoint_path(self, file_name: str) -> str:
+        """
+        Generate the checkpoint journal path for a given file name.
+        :param file_name: Name of the input file
+        :return: Path to the checkpoint journal
+        """
+        base, extension = os.path.splitext(os.path.basename(file_name))
+        return os.path.join(self.directory_path, "output", f"{base}_checkpoint.jsonl")
+
+    def generate_failed_gstins_file_path(self, file_name: str) -> str:
+        """
+        Generate the failed GSTINs file path for a given file name.
+        :param file_name: Name of the input file
+        :return: Path to the failed GSTINs file
+        """
+        base, extension = os.path.splitext(os.path.basename(file_name))
+        return os.path.join(self.directory_path, "failed", f"{base}_failed_gstins.xlsx")
 
-                end_time = time.time()
-                time_taken = end_time - start_time
-                spinner.succeed(f"{index}) Processed '{gstin}' in {time_taken:.2f} seconds.")
+    def generate_output_file(self, file) -> Tuple[int, int]:
+        """
+        Fetch the data of the GSTINs in a file and stream it to the output file, and the GSTINs that
+        could not be fetched to the failed GSTINs file of the input file.
+        :param file: Input file
+        :return: Tuple of the number of processed and failed GSTINs
+        """
+        # Log lines of files processed at the same time are interleaved, so name the file in them.
+        label = f"[{os.path.basename(file.file_path)}] " if self.max_parallel_files > 1 else ""
+        output_file_path = self.generate_output_file_path(file.file_path)
+        failed_gstins_writer = ExcelRowWriter(
+            self.generate_failed_gstins_file_path(file.file_path), self.FAILED_GSTIN_COLUMNS
+        )
+        try:
+            gstins = self.preflight_gstins(self.get_gstins(file), failed_gstins_writer, label)
+            self.progress.add(len(gstins))
+            processed = self.write_output_file(file, gstins, output_file_path, failed_gstins_writer, label)
+        finally:
+            if failed_gstins_writer.rows_written:
+                failed_gstins_writer.close()
+                print_line(f"{label}Created the failed gstins file - {failed_gstins_writer.file_path}")
+            else:
+                failed_gstins_writer.discard()
+        if processed is None:
+            raise InterruptedError("Stopped before all GSTINs were processed")
+        print_line(f"{label}Created the output file - {output_file_path}")
+        return processed, failed_gstins_writer.rows_written
 
-        df = pd.DataFrame(data)
-        df.to_excel(output_file_path, index=False)
-        print(f"\nCreated the output file - {output_file_path}\n")
+    def write_output_file(self, file, gstins, output_file_path, failed_gstins_writer, label="") -> Optional[int]:
+        """
+        Fetch the data of the GSTINs and stream it to the output file in input order.
+        :param file: Input file
+        :param gstins: Valid GSTINs of the input file
+        :param output_file_path: Path of the output file
+        :param failed_gstins_writer: Writer of the failed GSTINs file of the input file
+        :param label: Prefix of the log lines, naming the input file
+        :return: Number of rows written, or None if the run was stopped before all GSTINs were processed
+        """
+        # Successful rows are journaled as they arrive, so a rerun after a crash only fetches the
+        # remaining GSTINs. Failed GSTINs are not journaled and are retried on the rerun.
+        journal_path = self.generate_checkpoint_path(file.file_path)
+        journal = CheckpointJournal(journal_path, {"return_periods": self.get_return_periods()})
+        # Rows are streamed to the output file in input order; it is created with the rows done so
+        # far even if the run fails.
+        writer = ExcelRowWriter(output_file_path, self.get_output_columns())
+        with journal, writer:
+            done = journal.load()
+            if done:
+                message = f"{label}Resuming from checkpoint, {len(done)} GSTINs were already processed.\n"
+                print_line(format_text(message, colour=COLOUR_ORANGE))
+            pending_gstins = [gstin for gstin in gstins if gstin not in done]
+            self.progress.skip(len(gstins) - len(pending_gstins))
 
-    def move_failed_gstins(self):
-        failed_dir_path = os.path.join(self.directory_path, "failed")
-        create_directory_if_not_exists(failed_dir_path)
-        df = pd.DataFrame(self.failed_gstins, columns=["gstin"])
-        failed_gstins_path = os.path.join(self.directory_path, "failed", "failed_gstins.xlsx")
-        df.to_excel(failed_gstins_path, index=False)
-        print(f"Created the failed gstins file - {failed_gstins_path}\n")
+            with closing(self.iter_gstin_results(pending_gstins)) as results:
+                for index, gstin in enumerate(gstins, start=1):
+                    if self.stop_event.is_set():
+                        return None
+                    if gstin in done:
+                        writer.write_row(done.pop(gstin))
+                        continue
+                    _, _, row_data, message, time_taken = next(results)
+                    if row_data is None:
+                        self.append_failed_gstin_and_log(failed_gstins_writer, index, gstin, time_taken, message, label)
+                        continue
+                    journal.record(gstin, row_data)
+                    writer.write_row(row_data)
 
-    def create_failed_gstin_file(self):
-        df = pd.DataFrame(self.failed_gstins, columns=["gstin"])
-        failed_gstins_path = os.path.join(self.directory_path, "failed_gstins.xlsx")
-        df.to_excel(failed_gstins_path, index=False)
-        print(f"Created the failed gstins file - {failed_gstins_path}\n")
+        journal.remove()
+        return writer.rows_written
 
-    def get_row_data(self, tax_payer_data: Dict[str, str], tax_filing_data: Dict[str, str]) -> Dict[str, str]:
+    def get_row_data(self, tax_payer_data: Dict[str, str], tax_filings: Dict[str, Dict[str, str]]) -> Dict[str, str]:
         """
-        Extract relevant row data from tax payer data and tax filing data.
+        Extract relevant row data from tax payer data and the tax filing data of every return period.
         :param tax_payer_data: Dictionary of tax payer data
-        :param tax_filing_data: Dictionary of tax filing data
+        :param tax_filings: Dictionary of tax filing data by return period
         :return: A dictionary of relevant data for a single row
         """
-        return {
-            "gstin": tax_payer_data["gstin"],
-            "trade_name": tax_payer_data["trade_name"],
-            "legal_name": tax_payer_data["legal_name"],
-            "status": tax_payer_data["status"],
-            "business_type": tax_payer_data["business_type"],
-            "registration_date": tax_payer_data["registration_date"],
-            "return_period": tax_filing_data["return_period"],
-            "gstr1": tax_filing_data["gstr1"],
-            "gstr3b": tax_filing_data["gstr3b"],
-        }
+        row_data = {column: tax_payer_data[column] for column in self.TAX_PAYER_COLUMNS}
+        if len(tax_filings) == 1:
+            (tax_filing_data,) = tax_filings.values()
+            row_data.update({column: tax_filing_data[column] for column in self.TAX_FILING_COLUMNS})
+            return row_data
+        for return_period, tax_filing_data in tax_filings.items():
+            return_period_desc = change_datetime_format(return_period, "%m-%Y", "%b %Y")
+            row_data[f"gstr1 {return_period_desc}"] = tax_filing_data["gstr1"]
+            row_data[f"gstr3b {return_period_desc}"] = tax_filing_data["gstr3b"]
+        return row_data
@@ -1,23 +1,62 @@
 import os
 import shutil
+import threading
+import time
 from datetime import datetime
+from typing import Optional
 
 import pandas as pd
 
-from ..utils.api_calls import ApiService, SimpleRequests
+from ..exceptions import ValidationError
+from ..files.excel import ExcelFile
+from ..files.input_cache import get_input_cache
+from ..files.writers import ExcelRowWriter
+from ..utils.api_calls import ApiService, BulkLookupResult, SimpleRequests
+from ..utils.cache import CacheMode
+from ..utils.checkpoint import CheckpointJournal
+from ..utils.concurrency import DEFAULT_MAX_PARALLEL_FILES, map_as_completed
+from ..utils.gstin import preflight_gstins
+from ..utils.metrics import record_run_metrics
+from ..utils.profiling import MOVE_FILES, READ_INPUT, profile_phase
+from ..utils.progress import ProgressReporter
+from ..utils.retry import DEFAULT_MAX_PAUSE_SECONDS, CircuitOpenError
 from ..utils.settings import load_settings
+from ..utils.terminal import print_line
 from .abstract_task import BaseTask
 
 
 class TaxPayerDetailsTask(BaseTask):
     description = "Task to get taxpayer details for GSTINs"
+    input_extensions = (".csv", ".xlsx", ".xls")
+    DEFAULT_MAX_WORKERS = 8
+    # Number of GSTINs looked up together; their results are written and checkpointed once the whole
+    # lookup is done, so it is one request to a batch endpoint of the default size.
+    BULK_LOOKUP_SIZE = ApiService.DEFAULT_BATCH_SIZE
 
     def __init__(self, token=None):
         self.settings = load_settings()
         environment = self.settings.get("environment", "")
         token = self.settings.get(environment, {}).get("token")
-        self.api_service = ApiService(token=token, environment=self.settings.get("environment"))
-        self.file_path = None
+        self.max_workers = int(self.settings.get("max_workers", self.DEFAULT_MAX_WORKERS))
+        self.api_service = ApiService(
+            token=token,
+            environment=self.settings.get("environment"),
+            pool_size=self.max_workers,
+            batch_endpoints=self.settings.get("batch_endpoints"),
+            cache_mode=self.settings.get("cache_mode", CacheMode.USE.value),
+            rate_limits=self.settings.get("rate_limits"),
+            retry_policies=self.settings.get("retry_policies"),
+            circuit_breakers=self.settings.get("circuit_breakers"),
+        )
+        self.max_parallel_files = int(self.settings.get("max_parallel_files", DEFAULT_MAX_PARALLEL_FILES))
+        self.metrics_dir = self.settings.get("metrics_dir")
+        self.max_pause_seconds = float(self.settings.get("max_pause_seconds", DEFAULT_MAX_PAUSE_SECONDS))
+        self.pause_lock = threading.Lock()
+        self.paused_seconds = 0.0
+        self.input_cache = get_input_cache(self.settings)
+        self.stop_event = threading.Event()
+        self.progress = ProgressReporter("GSTINs")
+        self.input_directory = None
         self.output_fields = [
             "date_of_cancellation",
             "last_updated_date",
@@ -47,105 +86,256 @@ class TaxPayerDetailsTask(BaseTask):
         while True:
             self.input_directory = input("\nEnter the input directory path: ")
             if os.path.isdir(self.input_directory):
-                print("\n")
+                print_line("\n")
                 break
-            print(f"\nInvalid input directory path '{self.input_directory}'")
+            print_line(f"\nInvalid input directory path '{self.input_directory}'")
+
+    def get_output_directory(self) -> Optional[str]:
+        return os.path.join(self.input_directory, "output") if self.input_directory else None
+
+    def set_params(self, directory_path: str) -> None:
+        """Set the parameters without asking the user."""
+        if not os.path.isdir(directory_path):
+            raise ValidationError(f"Invalid input directory path '{directory_path}'")
+        self.input_directory = directory_path
+        self.prepare_directories()
+
+    def prepare_directories(self) -> None:
+        """Create directories to store processed files and output files."""
+        os.makedirs(os.path.join(self.input_directory, "processed"), exist_ok=True)
+        os.makedirs(os.path.join(self.input_directory, "output"), exist_ok=True)
 
     def execute(self) -> None:
         """Execute the task."""
-        # Create directories to store processed files and output files
-        processed_dir = os.path.join(self.input_directory, "processed")
-        output_dir = os.path.join(self.input_directory, "output")
-        os.makedirs(processed_dir, exist_ok=True)
-        os.makedirs(output_dir, exist_ok=True)
+        self.stop_event.clear()
+        self.reset_pauses()
+        self.api_service.start_run()
+        self.prepare_directories()
 
-        print("=" * 50)
-        print("Starting TaxPayer Details Task...")
-        print("=" * 50)
+        print_line("=" * 50)
+        print_line("Starting TaxPayer Details Task...")
+        print_line("=" * 50)
 
         # Get files with supported extensions
         input_files = [
             os.path.join(self.input_directory, file)
             for file in os.listdir(self.input_directory)
-            if os.path.splitext(file)[1].lower() in [".csv", ".xlsx", ".xls"]
+            if os.path.splitext(file)[1].lower() in self.input_extensions
         ]
 
         if not input_files:
-            print("No supported files found in the input directory.")
+            print_line("No supported files found in the input directory.")
             return
 
-        for input_file in input_files:
-            print("\n" + "-" * 50)
-            print(f"Processing File: {os.path.basename(input_file)}")
-            print("-" * 50 + "\n")
+        # Files are processed in parallel; they share the API client, so its rate limiters keep the
+        # load on the API within the configured budget.
+        processed_files = 0
+        with self.record_run_metrics(), ProgressReporter("GSTINs") as self.progress:
+            try:
+                files = map_as_completed(self.process_input_file, input_files, self.max_parallel_files)
+                for input_file, future in files:
+                    processed_files += 1
+                    error = future.exception()
+                    if error is not None:
+                        print_line(f"Failed to process the file {os.path.basename(input_file)}. Error: {error}")
+                    print_line(f"Progress: {processed_files} of {len(input_files)} files done.\n")
+            except BaseException:
+                # Let the files that are still running stop at their next GSTIN.
+                self.stop_event.set()
+                raise
 
-            self.input_file = input_file
-            gstins = self.read_gstins_from_file()
-            if not gstins:
-                print(f"No GSTINs found in the input file {input_file}.")
-                continue
+        for endpoint, counters in self.api_service.cache_stats().items():
+            print_line(f"Cache `{endpoint}`: {counters['hits']} hits, {counters['misses']} misses")
+        dedup_stats = self.api_service.dedup_stats()
+        print_line(f"Duplicate lookups served without an API call: {dedup_stats['hits'] + dedup_stats['shared']}")
 
-            self.file_path = self.generate_output_file_path()
+        print_line("\n" + "=" * 50)
+        print_line("TaxPayer Details Task Completed.")
+        print_line("=" * 50)
 
-            try:
-                taxpayer_details = self.get_taxpayer_details(gstins)
-                if taxpayer_details:
-                    self.write_taxpayer_details_to_file(taxpayer_details)
-                    # Move the processed file to the processed directory
+    def record_run_metrics(self):
+        """Record the API metrics of a run and write them to the metrics directory when it ends."""
+        return record_run_metrics(
+            type(self).__name__, self.api_service.environment, self.api_service.requester.metrics, self.metrics_dir
+        )
+
+    def process_path(self, file_path: str) -> None:
+        """Process a single input file of the input directory."""
+        # The event of an earlier run that failed is still set, and the worker reuses the task for every file.
+        self.stop_event.clear()
+        self.reset_pauses()
+        self.api_service.start_run()
+        with self.record_run_metrics(), ProgressReporter("GSTINs") as self.progress:
+            self.process_input_file(file_path)
+
+    def process_input_file(self, input_file: str) -> None:
+        """Fetch the taxpayer details of the GSTINs in an input file."""
+        print_line("\n" + "-" * 50)
+        print_line(f"Processing File: {os.path.basename(input_file)}")
+        print_line("-" * 50 + "\n")
+
+        failed_gstins_writer = ExcelRowWriter(self.generate_output_file_path(input_file, "failed"), ["gstin", "reason"])
+        try:
+            self.write_output_files(input_file, failed_gstins_writer)
+        finally:
+            self.close_failed_gstins_file(failed_gstins_writer)
+
+    def write_output_files(self, input_file: str, failed_gstins_writer: ExcelRowWriter) -> None:
+        """Write the taxpayer details of an input file and move it to the processed directory."""
+        label = self.get_log_label(input_file)
+        with profile_phase(READ_INPUT):
+            gstins = self.read_gstins_from_file(input_file)
+        gstins = self.preflight_gstins(gstins, failed_gstins_writer, label)
+        if not gstins:
+            print_line(f"{label}No valid GSTINs found in the input file {input_file}.")
+            return
+        self.progress.add(len(gstins))
+
+        output_file = self.generate_output_file_path(input_file)
+
+        try:
+            if self.write_taxpayer_details_to_file(input_file, output_file, gstins, failed_gstins_writer):
+                # Move the processed file to the processed directory
+                processed_dir = os.path.join(self.input_directory, "processed")
+                with profile_phase(MOVE_FILES):
                     shutil.move(input_file, os.path.join(processed_dir, os.path.basename(input_file)))
-                    print(f"File {os.path.basename(input_file)} processed successfully.")
-                else:
-                    print("Failed to get taxpayer details.")
-            except Exception as e:
-                print(f"Failed to get taxpayer details. Error: {e}")
+                print_line(f"File {os.path.basename(input_file)} processed successfully.")
+            else:
+                print_line(f"{label}Failed to get taxpayer details.")
+        except Exception as e:
+            print_line(f"{label}Failed to get taxpayer details. Error: {e}")
 
-        print("\n" + "=" * 50)
-        print("TaxPayer Details Task Completed.")
-        print("=" * 50)
+    def get_log_label(self, input_file: str) -> str:
+        """Get the prefix of the log lines of an input file, naming it when files are processed in parallel."""
+        return f"[{os.path.basename(input_file)}] " if self.max_parallel_files > 1 else ""
 
-    def read_gstins_from_file(self) -> list:
+    def read_gstins_from_file(self, input_file: str) -> list:
         """Read GSTINs from the input file."""
         try:
-            ext = os.path.splitext(self.input_file)[1].lower()
+            ext = os.path.splitext(input_file)[1].lower()
             if ext == ".csv":
-                df = pd.read_csv(self.input_file, header=None)
+                df = pd.read_csv(input_file, header=None)
             elif ext in [".xlsx", ".xls"]:
-                df = pd.read_excel(self.input_file, header=None)
+                # Only the GSTIN column, as the header text in a numeric column would keep it out of the cache.
+                df = ExcelFile(input_file, cache=self.input_cache).read(columns_to_read=[0], header=None)
             else:
                 raise ValueError("Unsupported file format. Only CSV and Excel files are supported.")
 
             gstins = df[0].tolist()  # Assuming the GSTINs are in the first column
+            if gstins and str(gstins[0]).strip().lower() == "gstin":
+                gstins = gstins[1:]
             return gstins
         except FileNotFoundError:
-            print("Input file not found.")
+            print_line("Input file not found.")
         except Exception as e:
-            print(f"Failed to read GSTINs from the input file. Error: {e}")
+            print_line(f"Failed to read GSTINs from the input file. Error: {e}")
 
         return []
 
-    def get_taxpayer_details(self, gstins: list):
-        """Get taxpayer details for the given GSTINs."""
-        taxpayer_details = {}
-        for i, gstin in enumerate(gstins, start=1):
-            try:
-                print(f"{i}) {gstin}\n")
-                response = self.api_service.call_taxpayer_endpoint(gstin)
-                if response.json().get("success"):
-                    data = response.json().get("data", {})
-                    if data:
-                        taxpayer_details[gstin] = self.extract_taxpayer_details(data)
-                    else:
-                        print(f"No details found for GSTIN: {gstin}")
-                else:
-                    message = (
-                        f"Failed to get taxpayer details for GSTIN: {gstin}. "
-                        f"Response status code: {response.status_code}"
-                    )
-                    print(message)
-            except Exception as e:
-                print(f"Failed to get taxpayer details for GSTIN: {gstin}. Error: {e}")
-
-        return taxpayer_details
+    def preflight_gstins(self, gstins: list, failed_gstins_writer: ExcelRowWriter, label: str = "") -> list:
+        """Drop invalid and duplicate GSTINs before any API call, recording the invalid ones as failed."""
+        preflight = preflight_gstins(gstins)
+        for gstin, reason in preflight.rejected:
+            failed_gstins_writer.write_row({"gstin": gstin, "reason": reason})
+        if preflight.rejected or preflight.duplicates:
+            print_line(
+                f"{label}Skipped {len(preflight.rejected)} invalid and {preflight.duplicates} duplicate GSTINs, "
+                f"fetching {len(preflight.gstins)} GSTINs.\n"
+            )
+        return preflight.gstins
+
+    def get_taxpayer_details(self, input_file: str, gstins: list, failed_gstins_writer: ExcelRowWriter):
+        """Get taxpayer details for the given GSTINs, yielding them in input order as they are fetched."""
+        label = self.get_log_label(input_file)
+        journal = CheckpointJournal(self.generate_checkpoint_path(input_file))
+        with journal:
+            done = journal.load()
+            if done:
+                print_line(f"{label}Resuming from checkpoint, {len(done)} GSTINs were already processed.\n")
+                self.progress.skip(sum(1 for gstin in gstins if gstin in done))
+            for start in range(0, len(gstins), self.BULK_LOOKUP_SIZE):
+                if self.stop_event.is_set():
+                    raise InterruptedError("Stopped before all GSTINs were processed")
+                chunk = gstins[start : start + self.BULK_LOOKUP_SIZE]
+                pending_gstins = [gstin for gstin in chunk if gstin not in done]
+                self.progress.start(len(pending_gstins))
+                lookup = self.call_taxpayer_endpoint_bulk(pending_gstins)
+                for i, gstin in enumerate(chunk, start=start + 1):
+                    if gstin in done:
+                        yield done.pop(gstin)
+                        continue
+                    response, error = lookup.responses.get(gstin), lookup.errors.get(gstin)
+                    details = self.handle_taxpayer_response(i, gstin, response, error, failed_gstins_writer, label)
+                    self.progress.finish(failed=details is None)
+                    if details is not None:
+                        journal.record(gstin, details)
+                        yield details
+
+    def handle_taxpayer_response(
+        self, i: int, gstin: str, response, error, failed_gstins_writer: ExcelRowWriter, label: str = ""
+    ):
+        """Get the taxpayer details of a GSTIN from its lookup, recording it as failed if there are none."""
+        try:
+            if error is not None:
+                raise error
+            if response.json().get("success"):
+                data = response.json().get("data", {})
+                if data:
+                    return self.extract_taxpayer_details(data)
+                self.progress.report_failure(f"{label}{i}) No details found for GSTIN: {gstin}")
+                failed_gstins_writer.write_row({"gstin": gstin, "reason": "No details found"})
+            else:
+                message = (
+                    f"{label}{i}) Failed to get taxpayer details for GSTIN: {gstin}. "
+                    f"Response status code: {response.status_code}"
+                )
+                self.progress.report_failure(message)
+                reason = f"Response status code: {response.status_code}"
+                failed_gstins_writer.write_row({"gstin": gstin, "reason": reason})
+        except Exception as e:
+            self.progress.report_failure(f"{label}{i}) Failed to get taxpayer details for GSTIN: {gstin}. Error: {e}")
+            failed_gstins_writer.write_row({"gstin": gstin, "reason": str(e)})
+        return None
+
+    def call_taxpayer_endpoint_bulk(self, gstins: list) -> BulkLookupResult:
+        """
+        Look up many GSTINs, pausing while the API is failing instead of failing every GSTIN. The pauses
+        since the API last answered add up to at most `max_pause_seconds` over the whole run, after which
+        the GSTINs that are still waiting fail with the circuit's error.
+        """
+        result = BulkLookupResult({}, {})
+        while gstins:
+            lookup = self.api_service.call_taxpayer_endpoint_bulk(gstins, self.max_workers)
+            result.responses.update(lookup.responses)
+            paused = {gstin: e for gstin, e in lookup.errors.items() if isinstance(e, CircuitOpenError)}
+            result.errors.update({gstin: e for gstin, e in lookup.errors.items() if gstin not in paused})
+            if len(paused) < len(gstins):
+                # The API answered, so a later outage may pause the run again.
+                self.reset_pauses()
+            gstins = list(paused)
+            if not paused:
+                break
+            retry_after = max(e.retry_after for e in paused.values())
+            with self.pause_lock:
+                paused_seconds = self.paused_seconds
+                give_up = paused_seconds + retry_after > self.max_pause_seconds
+                if not give_up:
+                    self.paused_seconds += retry_after
+            if give_up:
+                print_line(
+                    f"The API is still failing after pausing for {paused_seconds:.0f} seconds, "
+                    f"giving up on {len(paused)} GSTINs."
+                )
+                result.errors.update(paused)
+                break
+            print_line(f"The API is failing, pausing for {retry_after:.0f} seconds before trying again.")
+            time.sleep(retry_after)
+        return result
+
+    def reset_pauses(self) -> None:
+        """Give the run its whole `max_pause_seconds` again, when it starts and whenever the API answers."""
+        with self.pause_lock:
+            self.paused_seconds = 0.0
 
     def extract_taxpayer_details(self, data: dict) -> dict:
         """Extract taxpayer details from the data response."""
@@ -176,22 +366,47 @@ class TaxPayerDetailsTask(BaseTask):
 
         return details
 
-    def generate_output_file_path(self) -> str:
+    def generate_output_file_path(self, input_file: str, suffix: str = "output") -> str:
         """Generate the output file path."""
-        base_name = os.path.splitext(os.path.basename(self.input_file))[0]
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        output_file_name = f"{base_name}_output_{timestamp}.xlsx"
+        output_file_name = f"{base_name}_{suffix}_{timestamp}.xlsx"
         output_dir = os.path.join(self.input_directory, "output")
         output_file_path = os.path.join(output_dir, output_file_name)
         return output_file_path
 
-    def write_taxpayer_details_to_file(self, taxpayer_details: dict):
-        """Write taxpayer details to the output file."""
+    def generate_checkpoint_path(self, input_file: str) -> str:
+        """Generate the checkpoint journal path of the input file."""
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        return os.path.join(self.input_directory, "output", f"{base_name}_checkpoint.jsonl")
+
+    def write_taxpayer_details_to_file(
+        self, input_file: str, output_file: str, gstins: list, failed_gstins_writer: ExcelRowWriter
+    ) -> int:
+        """
+        Fetch the taxpayer details of the GSTINs and stream them to the output file as they arrive.
+        The output file is created with the details fetched so far even if fetching fails.
+        """
+        writer = ExcelRowWriter(output_file, self.output_fields)
         try:
-            output_file = self.file_path
-            df = pd.DataFrame.from_dict(taxpayer_details, orient="index", columns=self.output_fields)
-            df.to_excel(output_file, index=False)
+            for details in self.get_taxpayer_details(input_file, gstins, failed_gstins_writer):
+                writer.write_row(details)
+        finally:
+            if writer.rows_written:
+                writer.close()
+                print_line(f"Taxpayer details written to the output file: {output_file}")
+            else:
+                writer.discard()
+        CheckpointJournal(self.generate_checkpoint_path(input_file)).remove()
+        return writer.rows_written
 
-            print("Taxpayer details written to the output file:", output_file)
+    def close_failed_gstins_file(self, failed_gstins_writer: ExcelRowWriter):
+        """Create the file of the failed GSTINs of an input file, if any failed."""
+        if not failed_gstins_writer.rows_written:
+            failed_gstins_writer.discard()
+            return
+        try:
+            failed_gstins_writer.close()
+            print_line(f"Failed GSTINs written to the file: {failed_gstins_writer.file_path}")
         except Exception as e:
-            print("Failed to write taxpayer details to the output file. Error:", e)
+            print_line(f"Failed to write the failed GSTINs to a file. Error: {e}")
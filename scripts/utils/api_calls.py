@@ -1,20 +1,32 @@
-import enum
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from .cache import CacheMode, ResponseCache, SingleFlight
+from .concurrency import bounded_ordered_map
+from .environments import Env
+from .metrics import ApiMetrics, get_body_size
+from .profiling import FETCH, profile_phase
+from .rate_limit import RateLimiterRegistry, parse_retry_after
+from .retry import CircuitBreakerRegistry, RetryPolicyRegistry, is_server_failure
+from .responses import BufferedResponse
 
-class Env(enum.Enum):
-    PROD = "prod"
-    QA = "qa"
-    DEV = "dev"
 
+class BaseRequests:
+    """
+    Configuration and retry decisions shared by the sync and async HTTP clients, which only differ
+    in how they send requests and wait.
+    """
 
-class SimpleRequests:
-    _instances = {}
+    DEFAULT_POOL_SIZE = 10
 
     def __init__(self, base_url: str, token: str = None) -> None:
         """
-        Initialize the SimpleRequests instance.
+        Initialize the client.
 
         Args:
             base_url: Base URL for API calls.
@@ -22,24 +34,38 @@ class SimpleRequests:
         """
         self.base_url = base_url
         self.headers = {}
+        self.rate_limiters = RateLimiterRegistry()
+        self.retry_policies = RetryPolicyRegistry()
+        self.circuit_breakers = CircuitBreakerRegistry()
+        self.retries = 0
+        self.metrics = ApiMetrics()
         if token:
             self.set_token(token)
 
-    @classmethod
-    def get_instance(cls, base_url: str, token: str = None) -> "SimpleRequests":
+    def configure_rate_limits(self, config: dict) -> None:
         """
-        Get the singleton instance of SimpleRequests for the specified base URL.
+        Replace the per-endpoint rate limiters.
 
         Args:
-            base_url: Base URL for API calls.
-            token: Authorization token (optional).
+            config: AdaptiveLimiter keyword arguments per endpoint path, with a `default` entry for
+                the other endpoints, e.g. {"gst_lookup/taxpayer-info": {"rate": 20, "max_limit": 32}}.
+        """
+        self.rate_limiters = RateLimiterRegistry(config)
 
-        Returns:
-            The SimpleRequests instance.
+    def configure_retries(self, retry_policies: dict = None, circuit_breakers: dict = None) -> None:
         """
-        if base_url not in cls._instances:
-            cls._instances[base_url] = cls(base_url, token)
-        return cls._instances[base_url]
+        Replace the per-endpoint retry policies and circuit breakers.
+
+        Args:
+            retry_policies: RetryPolicy keyword arguments per endpoint path, with a `default` entry
+                for the other endpoints, e.g. {"default": {"max_attempts": 5, "read_timeout": 30}} (optional).
+            circuit_breakers: CircuitBreaker keyword arguments per endpoint path, with a `default`
+                entry for the other endpoints (optional).
+        """
+        if retry_policies is not None:
+            self.retry_policies = RetryPolicyRegistry(retry_policies)
+        if circuit_breakers is not None:
+            self.circuit_breakers = CircuitBreakerRegistry(circuit_breakers)
 
     def set_token(self, token: str) -> None:
         """
@@ -62,6 +88,203 @@ class SimpleRequests:
         """
         return self.base_url + endpoint
 
+    def get_retry_delay(
+        self, method: str, endpoint: str, attempt: int, outcome: Union[BufferedResponse, requests.Response, Exception]
+    ) -> Optional[float]:
+        """
+        Record the outcome of an attempt in the endpoint's circuit breaker, and decide with its retry
+        policy if the request is retried.
+
+        Args:
+            method: HTTP method.
+            endpoint: API endpoint.
+            attempt: Number of the attempt, starting at 1.
+            outcome: The response of the attempt, or the `requests` exception it raised.
+
+        Returns:
+            Seconds to wait before the next attempt, or None if the outcome is final.
+        """
+        retry_policy = self.retry_policies.get(endpoint)
+        circuit_breaker = self.circuit_breakers.get(endpoint)
+        if isinstance(outcome, Exception):
+            circuit_breaker.record_failure()
+            return retry_policy.get_exception_delay(method, attempt, outcome)
+        if is_server_failure(outcome.status_code):
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+        retry_after = parse_retry_after(outcome.headers.get("Retry-After"))
+        return retry_policy.get_response_delay(method, attempt, outcome.status_code, retry_after)
+
+    def record_retry(self, endpoint: str) -> None:
+        self.retries += 1
+        self.metrics.record_retry(endpoint)
+
+
+class SimpleRequests(BaseRequests):
+    _instances = {}
+
+    def __init__(self, base_url: str, token: str = None, pool_size: int = None, keep_alive: bool = True) -> None:
+        """
+        Initialize the SimpleRequests instance.
+
+        Args:
+            base_url: Base URL for API calls.
+            token: Authorization token (optional).
+            pool_size: Maximum number of pooled connections to the host (optional).
+            keep_alive: Whether connections are kept open and reused between requests.
+        """
+        super().__init__(base_url, token)
+        self.session = requests.Session()
+        self.configure_pool(pool_size or self.DEFAULT_POOL_SIZE, keep_alive)
+
+    @classmethod
+    def get_instance(
+        cls, base_url: str, token: str = None, pool_size: int = None, keep_alive: bool = None
+    ) -> "SimpleRequests":
+        """
+        Get the singleton instance of SimpleRequests for the specified base URL.
+
+        Args:
+            base_url: Base URL for API calls.
+            token: Authorization token (optional).
+            pool_size: Maximum number of pooled connections (optional). An existing instance
+                is resized when it is given.
+            keep_alive: Whether connections are reused (optional).
+
+        Returns:
+            The SimpleRequests instance.
+        """
+        if base_url not in cls._instances:
+            cls._instances[base_url] = cls(base_url, token, pool_size, True if keep_alive is None else keep_alive)
+        elif pool_size is not None or keep_alive is not None:
+            instance = cls._instances[base_url]
+            instance.configure_pool(
+                pool_size if pool_size is not None else instance.pool_size,
+                keep_alive if keep_alive is not None else instance.keep_alive,
+            )
+        return cls._instances[base_url]
+
+    def configure_pool(self, pool_size: int, keep_alive: bool = True) -> None:
+        """
+        Size the connection pool used for the base URL.
+
+        The pool should be at least as large as the number of concurrent requests, otherwise
+        the extra connections are opened and thrown away after every request.
+
+        Args:
+            pool_size: Maximum number of connections kept open to the host.
+            keep_alive: Whether connections are kept open and reused between requests.
+        """
+        self.pool_size = max(1, pool_size)
+        self.keep_alive = keep_alive
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        old_adapter = self.session.adapters.get(self.base_url)
+        self.session.mount(self.base_url, adapter)
+        if old_adapter is not None:
+            old_adapter.close()
+        self.session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+
+    def pool_stats(self) -> dict:
+        """
+        Get the connection reuse statistics of the pool.
+
+        Returns:
+            Dictionary with the number of requests sent, new connections opened, requests that
+            reused a pooled connection (hits) and connections currently idle in the pool.
+        """
+        requests_sent = new_connections = idle_connections = 0
+        adapter = self.session.get_adapter(self.base_url)
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools[key]
+            requests_sent += pool.num_requests
+            new_connections += pool.num_connections
+            idle_connections += sum(1 for conn in list(pool.pool.queue) if conn) if pool.pool else 0
+        return {
+            "requests": requests_sent,
+            "new_connections": new_connections,
+            "hits": requests_sent - new_connections,
+            "idle_connections": idle_connections,
+        }
+
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Send a request to the specified endpoint, retrying transient failures.
+
+        The endpoint's circuit breaker rejects the request while the endpoint is down, and its
+        retry policy decides if throttled, server error and connection error outcomes are retried.
+        Requests time out after the connect and read timeouts of the retry policy, unless a `timeout`
+        is given.
+
+        Args:
+            method: HTTP method.
+            endpoint: API endpoint.
+            **kwargs: Additional request parameters.
+
+        Returns:
+            The response of the last attempt.
+        """
+        # Waits for the rate limiter and between retries count as fetching, like the requests themselves.
+        with profile_phase(FETCH):
+            retry_policy = self.retry_policies.get(endpoint)
+            kwargs.setdefault("timeout", (retry_policy.connect_timeout, retry_policy.read_timeout))
+            attempt = 0
+            while True:
+                attempt += 1
+                self.circuit_breakers.get(endpoint).before_request()
+                try:
+                    response = self.send(method, endpoint, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    delay = self.get_retry_delay(method, endpoint, attempt, e)
+                    if delay is None:
+                        raise
+                else:
+                    delay = self.get_retry_delay(method, endpoint, attempt, response)
+                    if delay is None:
+                        return response
+                    response.close()
+                self.record_retry(endpoint)
+                time.sleep(delay)
+
+    def send(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Send a single request to the specified endpoint through the endpoint's rate limiter.
+
+        The limiter waits for a free slot before sending, and adapts to the status code, latency
+        and Retry-After header of the response. The latency, status code and size of the exchange
+        are recorded in the endpoint's metrics.
+
+        Args:
+            method: HTTP method.
+            endpoint: API endpoint.
+            **kwargs: Additional request parameters.
+
+        Returns:
+            The response.
+        """
+        limiter = self.rate_limiters.get(endpoint)
+        limiter.acquire()
+        status_code = retry_after = None
+        start_time = time.monotonic()
+        try:
+            response = self.session.request(method, self.get_url(endpoint), headers=self.headers, **kwargs)
+            status_code = response.status_code
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        except Exception as e:
+            self.metrics.record_error(endpoint, time.monotonic() - start_time, e)
+            raise
+        finally:
+            latency = time.monotonic() - start_time
+            limiter.release(status_code, latency, retry_after)
+        # A streamed body is not read yet, so its size is taken from the headers.
+        if kwargs.get("stream"):
+            bytes_received = int(response.headers.get("Content-Length") or 0)
+        else:
+            bytes_received = len(response.content)
+        bytes_sent = get_body_size(response.request.body)
+        self.metrics.record_response(endpoint, latency, status_code, bytes_sent, bytes_received)
+        return response
+
     def get(self, endpoint: str, **kwargs) -> dict:
         """
         Send a GET request to the specified endpoint.
@@ -73,7 +296,7 @@ class SimpleRequests:
         Returns:
             JSON response as a dictionary.
         """
-        response = requests.get(self.get_url(endpoint), headers=self.headers, **kwargs)
+        response = self.request("GET", endpoint, **kwargs)
         # response.raise_for_status()
         return response
 
@@ -89,7 +312,7 @@ class SimpleRequests:
         Returns:
             JSON response as a dictionary.
         """
-        response = requests.post(self.get_url(endpoint), data=data, headers=self.headers, **kwargs)
+        response = self.request("POST", endpoint, data=data, **kwargs)
         # response.raise_for_status()
         return response
 
@@ -105,7 +328,7 @@ class SimpleRequests:
         Returns:
             JSON response as a dictionary.
         """
-        response = requests.patch(self.get_url(endpoint), data=data, headers=self.headers, **kwargs)
+        response = self.request("PATCH", endpoint, data=data, **kwargs)
         # response.raise_for_status()
         return response
 
@@ -120,11 +343,32 @@ class SimpleRequests:
         Returns:
             HTTP status code.
         """
-        response = requests.delete(self.get_url(endpoint), headers=self.headers, **kwargs)
+        response = self.request("DELETE", endpoint, **kwargs)
         # response.raise_for_status()
         return response.status_code
 
 
+class Lookup(NamedTuple):
+    """A GET lookup of an endpoint for a GSTIN and return period, and where its response is cached."""
+
+    cache_key: str  # Name of the endpoint in the cache.
+    gstin: str
+    return_period: str
+    endpoint: str  # API endpoint, with the query string.
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        """Key of the lookup in the in-run de-duplication."""
+        return self.cache_key, self.gstin, self.return_period
+
+
+class BulkLookupResult(NamedTuple):
+    """Outcome of a bulk lookup, keyed by GSTIN."""
+
+    responses: Dict[str, BufferedResponse]  # Response of every GSTIN that could be looked up.
+    errors: Dict[str, Exception]  # Exception of every GSTIN whose lookup failed.
+
+
 class ApiService:
     BASE_URLS = {
         Env.PROD.value: "https://app.kyss.ai/apis/",
@@ -142,9 +386,225 @@ class ApiService:
     TAX_FILING_END_POINT = "internal/gst/filing?gstin={}&return_period={}"
     PRE_REGISTER_FILE_UPLOAD_ENDPOINT = "accounts/pre-register/file/upload"
 
-    def __init__(self, environment: str, token: str = None):
-        base_url = self.BASE_URLS[environment]
-        self.requester = SimpleRequests.get_instance(base_url, token)
+    TAX_PAYER_CACHE_KEY = "taxpayer"
+    TAX_FILING_STATUS_CACHE_KEY = "tax_filing_status"
+    TAX_FILING_CACHE_KEY = "tax_filing"
+    CACHE_TTLS = {
+        TAX_PAYER_CACHE_KEY: 7 * 24 * 60 * 60,
+        TAX_FILING_STATUS_CACHE_KEY: 24 * 60 * 60,
+        TAX_FILING_CACHE_KEY: 24 * 60 * 60,
+    }
+    # Endpoint the cache hits of an endpoint name are recorded for in the metrics.
+    CACHE_ENDPOINTS = {
+        TAX_PAYER_CACHE_KEY: TAX_PAYER_ENDPOINT,
+        TAX_FILING_STATUS_CACHE_KEY: TAX_FILING_STATUS_END_POINT,
+        TAX_FILING_CACHE_KEY: TAX_FILING_END_POINT,
+    }
+    # Months after the end of a return period before its filings are treated as final.
+    CLOSED_PERIOD_GRACE_MONTHS = 1
+    # Number of responses kept in memory to de-duplicate lookups within a run.
+    IN_RUN_CACHE_SIZE = 10000
+    # Number of GSTINs sent in one request to a batch endpoint, unless configured otherwise.
+    DEFAULT_BATCH_SIZE = 100
+
+    def __init__(
+        self,
+        environment: str,
+        token: str = None,
+        pool_size: int = None,
+        keep_alive: bool = None,
+        cache_mode: CacheMode = CacheMode.USE,
+        cache: ResponseCache = None,
+        rate_limits: dict = None,
+        retry_policies: dict = None,
+        circuit_breakers: dict = None,
+        batch_endpoints: dict = None,
+        base_url: str = None,
+    ):
+        self.requester = self.create_requester(base_url or self.BASE_URLS[environment], token, pool_size, keep_alive)
+        if rate_limits is not None:
+            self.requester.configure_rate_limits(rate_limits)
+        self.requester.configure_retries(retry_policies, circuit_breakers)
+        self.setup_cache(environment, cache_mode, cache)
+        self.batch_endpoints = batch_endpoints or {}
+
+    def create_requester(self, base_url: str, token: str, pool_size: Optional[int], keep_alive: Optional[bool]):
+        """
+        Get the HTTP client of the service: the shared SimpleRequests of the base URL.
+        """
+        return SimpleRequests.get_instance(base_url, token, pool_size=pool_size, keep_alive=keep_alive)
+
+    def setup_cache(self, environment: str, cache_mode: CacheMode, cache: Optional[ResponseCache]) -> None:
+        """
+        Set up the persistent response cache.
+
+        Args:
+            environment: Environment the responses are fetched from; part of the cache key.
+            cache_mode: A `CacheMode` or its value, e.g. "refresh" to ignore cached responses.
+            cache: Cache to use (optional). Defaults to the shared cache next to settings.json.
+        """
+        self.environment = environment
+        self.cache_mode = CacheMode(cache_mode)
+        if cache is None and self.cache_mode is not CacheMode.BYPASS:
+            cache = ResponseCache.get_instance()
+        self.cache = cache
+        self.single_flight = SingleFlight(self.IN_RUN_CACHE_SIZE, remember=self.is_cacheable)
+
+    def start_run(self) -> None:
+        """
+        Forget the responses kept for repeated lookups by an earlier run, so a long-lived client does
+        not answer later runs with them, bypassing the TTLs of the cache and `CacheMode.REFRESH`.
+        """
+        self.single_flight.clear()
+
+    def get_cached_response(self, cache_key: str, gstin: str, return_period: str = "") -> Optional[BufferedResponse]:
+        """
+        Get a cached response for the endpoint, GSTIN and return period.
+
+        Args:
+            cache_key: Name of the endpoint in the cache.
+            gstin: GSTIN the response is for.
+            return_period: Return period the response is for (optional).
+
+        Returns:
+            The cached response, or None if the cache is not read or has no valid entry.
+        """
+        if self.cache_mode is not CacheMode.USE:
+            return None
+        response = self.cache.get(self.environment, cache_key, gstin, return_period)
+        if response is not None:
+            self.requester.metrics.record_cache_hit(self.CACHE_ENDPOINTS[cache_key])
+        return response
+
+    def cache_response(self, cache_key: str, gstin: str, return_period: str, response) -> None:
+        """
+        Store a successful response in the cache.
+
+        Args:
+            cache_key: Name of the endpoint in the cache.
+            gstin: GSTIN the response is for.
+            return_period: Return period the response is for.
+            response: The response to store.
+        """
+        if self.cache_mode is CacheMode.BYPASS or not self.is_cacheable(response):
+            return
+        ttl = self.get_cache_ttl(cache_key, return_period, response)
+        self.cache.set(self.environment, cache_key, gstin, return_period, response, ttl)
+
+    def get_cache_ttl(self, cache_key: str, return_period: str, response) -> Optional[float]:
+        """
+        Get the number of seconds a response stays valid in the cache.
+
+        Filings of a closed return period do not change any more, so they never expire.
+
+        Returns:
+            The TTL in seconds, or None if the response never expires.
+        """
+        if (
+            cache_key == self.TAX_FILING_CACHE_KEY
+            and response.json().get("data")
+            and self.is_closed_period(return_period)
+        ):
+            return None
+        return self.CACHE_TTLS[cache_key]
+
+    def is_closed_period(self, return_period: str) -> bool:
+        """
+        Check if a return period (MM-YYYY) is past its filing window.
+
+        Args:
+            return_period: The return period.
+
+        Returns:
+            True if the period ended more than `CLOSED_PERIOD_GRACE_MONTHS` months ago.
+        """
+        try:
+            period = datetime.strptime(return_period, "%m-%Y")
+        except ValueError:
+            return False
+        now = datetime.now()
+        months_since = (now.year - period.year) * 12 + now.month - period.month
+        return months_since > self.CLOSED_PERIOD_GRACE_MONTHS
+
+    @staticmethod
+    def is_cacheable(response) -> bool:
+        """
+        Check if a response is a successful API response worth caching.
+
+        Args:
+            response: The response to check.
+
+        Returns:
+            True if the response can be cached.
+        """
+        if response.status_code != 200:
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            return False
+        return isinstance(body, dict) and "data" in body and body.get("success", True) is not False
+
+    def get_taxpayer_lookup(self, gstin: str) -> Lookup:
+        return Lookup(self.TAX_PAYER_CACHE_KEY, gstin, "", f"{self.TAX_PAYER_ENDPOINT}{gstin}")
+
+    def get_tax_filing_status_lookup(self, gstin: str) -> Lookup:
+        return Lookup(self.TAX_FILING_STATUS_CACHE_KEY, gstin, "", f"{self.TAX_FILING_STATUS_END_POINT}{gstin}")
+
+    def get_tax_filing_lookup(self, gstin: str, return_period: str) -> Lookup:
+        endpoint = self.TAX_FILING_END_POINT.format(gstin, return_period)
+        return Lookup(self.TAX_FILING_CACHE_KEY, gstin, return_period, endpoint)
+
+    def cached_get(self, lookup: Lookup):
+        """
+        Send the GET request of a lookup unless the cache has a valid response for it.
+
+        Repeated and concurrent lookups of the same endpoint, GSTIN and return period within a run
+        share a single call. Only cacheable responses are kept for later lookups, so an error, e.g. of
+        an expired token, is only shared with the lookups waiting for it.
+
+        Args:
+            lookup: The lookup.
+
+        Returns:
+            The cached or fresh response.
+        """
+
+        fetched = False
+
+        def fetch():
+            nonlocal fetched
+            fetched = True
+            response = self.get_cached_response(lookup.cache_key, lookup.gstin, lookup.return_period)
+            if response is None:
+                response = self.requester.get(lookup.endpoint)
+                self.cache_response(lookup.cache_key, lookup.gstin, lookup.return_period, response)
+            return response
+
+        response = self.single_flight.do(lookup.key, fetch)
+        if not fetched:
+            # Answered by the in-run de-duplication; recorded like a hit of the persistent cache.
+            self.requester.metrics.record_cache_hit(lookup.endpoint)
+        return response
+
+    def cache_stats(self) -> dict:
+        """
+        Get the cache hit and miss counters per endpoint.
+
+        Returns:
+            Dictionary mapping endpoint names to their hit and miss counts.
+        """
+        return self.cache.stats() if self.cache is not None else {}
+
+    def dedup_stats(self) -> dict:
+        """
+        Get the in-run de-duplication counters.
+
+        Returns:
+            Dictionary with the number of executed lookups, lookups answered from memory and
+            lookups that joined an identical lookup in flight.
+        """
+        return self.single_flight.stats()
 
     def call_otp_endpoint(self, data):
         """
@@ -174,7 +634,136 @@ class ApiService:
         Returns:
             JSON response as a dictionary.
         """
-        return self.requester.get(f"{self.TAX_PAYER_ENDPOINT}{gstin}")
+        return self.cached_get(self.get_taxpayer_lookup(gstin))
+
+    def call_taxpayer_endpoint_bulk(self, gstins: Iterable[str], max_workers: int = None) -> BulkLookupResult:
+        """
+        Look up the taxpayer details of many GSTINs.
+
+        When a batch endpoint is configured for the taxpayer lookup, the GSTINs the cache cannot answer
+        are sent to it in batches of `batch_size`. Batches the server does not answer are looked up one
+        by one, like all GSTINs when no batch endpoint is configured: those calls are pipelined over
+        `max_workers` threads and go through the cache and in-run de-duplication of
+        `call_taxpayer_endpoint`.
+
+        Args:
+            gstins: GSTINs to look up; duplicates are looked up once.
+            max_workers: Number of concurrent single lookups (optional). Defaults to the connection
+                pool size.
+
+        Returns:
+            The responses, shaped like those of `call_taxpayer_endpoint`, and the errors by GSTIN.
+        """
+        result = BulkLookupResult({}, {})
+        gstins = list(dict.fromkeys(gstins))
+        batch = self.batch_endpoints.get(self.TAX_PAYER_CACHE_KEY)
+        if batch:
+            gstins = self.add_cached_responses(self.TAX_PAYER_CACHE_KEY, gstins, result)
+            unanswered = []
+            for chunk in self.get_batches(batch, gstins):
+                try:
+                    response = self.requester.post(batch["endpoint"], json={"gstins": chunk})
+                except requests.exceptions.RequestException:
+                    response = None
+                if not self.add_batch_responses(self.TAX_PAYER_CACHE_KEY, chunk, response, result):
+                    unanswered += chunk
+            gstins = unanswered
+
+        def lookup(gstin):
+            try:
+                return self.call_taxpayer_endpoint(gstin)
+            except Exception as e:
+                return e
+
+        outcomes = bounded_ordered_map(lookup, gstins, max_workers or self.requester.pool_size)
+        self.add_lookup_outcomes(gstins, outcomes, result)
+        return result
+
+    def get_batches(self, batch: dict, gstins: List[str]) -> List[List[str]]:
+        """
+        Split GSTINs into the batches sent to a batch endpoint.
+
+        Args:
+            batch: Configuration of the batch endpoint, with its `batch_size` (optional).
+            gstins: GSTINs to send.
+
+        Returns:
+            The batches.
+        """
+        batch_size = int(batch.get("batch_size", self.DEFAULT_BATCH_SIZE))
+        return [gstins[i : i + batch_size] for i in range(0, len(gstins), batch_size)]
+
+    @staticmethod
+    def add_lookup_outcomes(
+        gstins: List[str], outcomes: Iterable[Union[BufferedResponse, Exception]], result: BulkLookupResult
+    ) -> None:
+        """
+        Add the outcomes of the single lookups of a bulk lookup to its result.
+
+        Args:
+            gstins: GSTINs looked up one by one.
+            outcomes: The response or the exception of every GSTIN, in the same order.
+            result: Result of the bulk lookup.
+        """
+        for gstin, outcome in zip(gstins, outcomes):
+            if isinstance(outcome, Exception):
+                result.errors[gstin] = outcome
+            else:
+                result.responses[gstin] = outcome
+
+    def add_cached_responses(self, cache_key: str, gstins: List[str], result: BulkLookupResult) -> List[str]:
+        """
+        Add the cached responses of a bulk lookup to its result.
+
+        Args:
+            cache_key: Name of the endpoint in the cache.
+            gstins: GSTINs to look up.
+            result: Result of the bulk lookup.
+
+        Returns:
+            The GSTINs without a cached response.
+        """
+        missing = []
+        for gstin in gstins:
+            response = self.get_cached_response(cache_key, gstin)
+            if response is None:
+                missing.append(gstin)
+            else:
+                result.responses[gstin] = response
+        return missing
+
+    def add_batch_responses(self, cache_key: str, gstins: List[str], response, result: BulkLookupResult) -> bool:
+        """
+        Split the response of a batch endpoint into one response per GSTIN, add them to the result of
+        the bulk lookup and cache them.
+
+        A batch endpoint receives `{"gstins": [...]}` and answers `{"success": true, "data": {gstin: data}}`;
+        GSTINs without data in the answer get an empty `data`, like the single lookup of an unknown GSTIN.
+
+        Args:
+            cache_key: Name of the endpoint in the cache.
+            gstins: GSTINs sent to the batch endpoint.
+            response: Response of the batch endpoint, or None if the request failed.
+            result: Result of the bulk lookup.
+
+        Returns:
+            False if the batch was not answered and its GSTINs should be looked up one by one.
+        """
+        if response is None or response.status_code != 200:
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            return False
+        if not isinstance(body, dict) or body.get("success") is False or not isinstance(body.get("data"), dict):
+            return False
+        for gstin in gstins:
+            data = body["data"].get(gstin) or {}
+            gstin_response = BufferedResponse(200, json.dumps({"success": True, "data": data}).encode("utf-8"))
+            if data:
+                self.cache_response(cache_key, gstin, "", gstin_response)
+            result.responses[gstin] = gstin_response
+        return True
 
     def call_pre_register_file_upload_endpoint(self, data):
         """
@@ -195,7 +784,7 @@ class ApiService:
         Returns:
             JSON response as a dictionary.
         """
-        return self.requester.get(f"{self.TAX_FILING_STATUS_END_POINT}{gstin}")
+        return self.cached_get(self.get_tax_filing_status_lookup(gstin))
 
     def call_tax_filing_endpoint(self, gstin: str, return_period: str) -> dict:
         """
@@ -208,5 +797,4 @@ class ApiService:
         Returns:
             JSON response as a dictionary.
         """
-        URL = self.TAX_FILING_END_POINT.format(gstin, return_period)
-        return self.requester.get(URL)
+        return self.cached_get(self.get_tax_filing_lookup(gstin, return_period))
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import time
+from typing import Iterable, Optional
+
+import aiohttp
+import requests
+
+from .api_calls import ApiService, BaseRequests, BulkLookupResult, Lookup
+from .metrics import get_body_size
+from .profiling import FETCH, profile_phase
+from .rate_limit import parse_retry_after
+from .responses import BufferedResponse
+
+
+class AsyncSimpleRequests(BaseRequests):
+    def __init__(self, base_url: str, token: str = None, pool_size: int = None, keep_alive: bool = True) -> None:
+        """
+        Initialize the AsyncSimpleRequests instance.
+
+        The underlying aiohttp session is bound to an event loop, so it is only created by `open`,
+        which must be awaited on the loop the requests will run on.
+
+        Args:
+            base_url: Base URL for API calls.
+            token: Authorization token (optional).
+            pool_size: Maximum number of concurrent connections to the host (optional).
+            keep_alive: Whether connections are kept open and reused between requests.
+        """
+        super().__init__(base_url, token)
+        self.pool_size = pool_size or self.DEFAULT_POOL_SIZE
+        self.keep_alive = keep_alive
+        self.session = None
+
+    async def open(self) -> None:
+        """
+        Create the pooled client session.
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size, force_close=not self.keep_alive)
+            self.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self) -> None:
+        """
+        Close the client session and its pooled connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, method: str, endpoint: str, data=None, files=None, **kwargs) -> BufferedResponse:
+        """
+        Send a request to the specified endpoint and read the whole response, retrying transient failures.
+
+        Client errors are raised as the matching `requests` exceptions, so callers can handle the
+        sync and async clients the same way. Requests time out after the connect and read timeouts of
+        the retry policy, unless a `timeout` is given.
+
+        Args:
+            method: HTTP method.
+            endpoint: API endpoint.
+            data: Request data (optional).
+            files: Files to upload as multipart form data, as in `requests` (optional).
+            **kwargs: Additional request parameters.
+
+        Returns:
+            The buffered response of the last attempt.
+        """
+        # Waits for the rate limiter and between retries count as fetching, like the requests themselves.
+        with profile_phase(FETCH):
+            retry_policy = self.retry_policies.get(endpoint)
+            kwargs.setdefault(
+                "timeout",
+                aiohttp.ClientTimeout(sock_connect=retry_policy.connect_timeout, sock_read=retry_policy.read_timeout),
+            )
+            attempt = 0
+            while True:
+                attempt += 1
+                self.circuit_breakers.get(endpoint).before_request()
+                try:
+                    response = await self.send(method, endpoint, data=data, files=files, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    delay = self.get_retry_delay(method, endpoint, attempt, e)
+                    if delay is None:
+                        raise
+                else:
+                    delay = self.get_retry_delay(method, endpoint, attempt, response)
+                    if delay is None:
+                        return response
+                self.record_retry(endpoint)
+                await asyncio.sleep(delay)
+
+    async def send(self, method: str, endpoint: str, data=None, files=None, **kwargs) -> BufferedResponse:
+        """
+        Send a single request to the specified endpoint through the endpoint's rate limiter, and record
+        the exchange in the endpoint's metrics.
+
+        Args:
+            method: HTTP method.
+            endpoint: API endpoint.
+            data: Request data (optional).
+            files: Files to upload as multipart form data, as in `requests` (optional).
+            **kwargs: Additional request parameters.
+
+        Returns:
+            The buffered response.
+        """
+        await self.open()
+        kwargs.pop("stream", None)
+        if files:
+            form = aiohttp.FormData(data or {})
+            for name, file in files.items():
+                form.add_field(name, file)
+            data = form
+        url = self.get_url(endpoint)
+        bytes_sent = get_body_size(json.dumps(kwargs["json"]) if "json" in kwargs else data)
+        limiter = self.rate_limiters.get(endpoint)
+        await limiter.acquire_async()
+        status_code = retry_after = None
+        start_time = time.monotonic()
+        try:
+            try:
+                async with self.session.request(method, url, data=data, headers=self.headers, **kwargs) as response:
+                    content = await response.read()
+                    status_code = response.status
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    headers, response_url = dict(response.headers), str(response.url)
+            except asyncio.TimeoutError as e:
+                raise requests.exceptions.Timeout(str(e) or f"Request to {url} timed out")
+            except aiohttp.ClientConnectionError as e:
+                raise requests.exceptions.ConnectionError(str(e))
+            except aiohttp.ClientError as e:
+                raise requests.exceptions.RequestException(str(e))
+        except Exception as e:
+            self.metrics.record_error(endpoint, time.monotonic() - start_time, e, bytes_sent)
+            raise
+        finally:
+            latency = time.monotonic() - start_time
+            limiter.release(status_code, latency, retry_after)
+        self.metrics.record_response(endpoint, latency, status_code, bytes_sent, len(content))
+        return BufferedResponse(status_code, content, headers, response_url)
+
+    async def get(self, endpoint: str, **kwargs) -> BufferedResponse:
+        """
+        Send a GET request to the specified endpoint.
+
+        Args:
+            endpoint: API endpoint.
+            **kwargs: Additional request parameters.
+
+        Returns:
+            The buffered response.
+        """
+        return await self.request("GET", endpoint, **kwargs)
+
+    async def post(self, endpoint: str, data=None, **kwargs) -> BufferedResponse:
+        """
+        Send a POST request to the specified endpoint.
+
+        Args:
+            endpoint: API endpoint.
+            data: Request data (optional).
+            **kwargs: Additional request parameters.
+
+        Returns:
+            The buffered response.
+        """
+        return await self.request("POST", endpoint, data=data, **kwargs)
+
+    async def patch(self, endpoint: str, data=None, **kwargs) -> BufferedResponse:
+        """
+        Send a PATCH request to the specified endpoint.
+
+        Args:
+            endpoint: API endpoint.
+            data: Request data (optional).
+            **kwargs: Additional request parameters.
+
+        Returns:
+            The buffered response.
+        """
+        return await self.request("PATCH", endpoint, data=data, **kwargs)
+
+    async def delete(self, endpoint: str, **kwargs) -> int:
+        """
+        Send a DELETE request to the specified endpoint.
+
+        Args:
+            endpoint: API endpoint.
+            **kwargs: Additional request parameters.
+
+        Returns:
+            HTTP status code.
+        """
+        response = await self.request("DELETE", endpoint, **kwargs)
+        return response.status_code
+
+
+class AsyncApiService(ApiService):
+    """
+    Asyncio counterpart of `ApiService` with the same endpoint methods.
+
+    Use it as an async context manager so the pooled session is opened and closed on the running loop:
+
+        async with AsyncApiService(environment, token) as api_service:
+            response = await api_service.call_taxpayer_endpoint(gstin)
+    """
+
+    def create_requester(self, base_url: str, token: str, pool_size: Optional[int], keep_alive: Optional[bool]):
+        """
+        Get the HTTP client of the service: a new AsyncSimpleRequests, as its session is bound to a loop.
+        """
+        return AsyncSimpleRequests(base_url, token, pool_size, True if keep_alive is None else keep_alive)
+
+    async def __aenter__(self) -> "AsyncApiService":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        await self.requester.open()
+
+    async def close(self) -> None:
+        await self.requester.close()
+
+    async def cached_get(self, lookup: Lookup):
+        """
+        Send the GET request of a lookup unless the cache has a valid response for it.
+
+        The SQLite cache is read and written on a worker thread, so its disk I/O does not block the loop.
+
+        Args:
+            lookup: The lookup.
+
+        Returns:
+            The cached or fresh response.
+        """
+
+        fetched = False
+
+        async def fetch():
+            nonlocal fetched
+            fetched = True
+            response = await asyncio.to_thread(
+                self.get_cached_response, lookup.cache_key, lookup.gstin, lookup.return_period
+            )
+            if response is None:
+                response = await self.requester.get(lookup.endpoint)
+                await asyncio.to_thread(
+                    self.cache_response, lookup.cache_key, lookup.gstin, lookup.return_period, response
+                )
+            return response
+
+        response = await self.single_flight.do_async(lookup.key, fetch)
+        if not fetched:
+            # Answered by the in-run de-duplication; recorded like a hit of the persistent cache.
+            self.requester.metrics.record_cache_hit(lookup.endpoint)
+        return response
+
+    async def call_otp_endpoint(self, data):
+        """
+        Call the OTP endpoint with given data.
+
+        Args:
+            data: Data for the OTP request.
+        """
+        return await self.requester.post(self.OTP_ENDPOINT, data=data)
+
+    async def call_validate_endpoint(self, data):
+        """
+        Call the validate endpoint with given data.
+
+        Args:
+            data: Data for the validate request.
+        """
+        return await self.requester.post(self.VALIDATE_ENDPOINT, data=data)
+
+    async def call_taxpayer_endpoint(self, gstin):
+        """
+        Call the tax payer endpoint with a given GSTIN.
+
+        Args:
+            gstin: GSTIN to be used for the request.
+
+        Returns:
+            The buffered response.
+        """
+        return await self.cached_get(self.get_taxpayer_lookup(gstin))
+
+    async def call_taxpayer_endpoint_bulk(self, gstins: Iterable[str], max_workers: int = None) -> BulkLookupResult:
+        """
+        Look up the taxpayer details of many GSTINs, like `ApiService.call_taxpayer_endpoint_bulk`.
+
+        Args:
+            gstins: GSTINs to look up; duplicates are looked up once.
+            max_workers: Number of concurrent single lookups (optional). Defaults to the connection
+                pool size.
+
+        Returns:
+            The responses and the errors by GSTIN.
+        """
+        result = BulkLookupResult({}, {})
+        gstins = list(dict.fromkeys(gstins))
+        batch = self.batch_endpoints.get(self.TAX_PAYER_CACHE_KEY)
+        if batch:
+            gstins = await asyncio.to_thread(self.add_cached_responses, self.TAX_PAYER_CACHE_KEY, gstins, result)
+            unanswered = []
+            for chunk in self.get_batches(batch, gstins):
+                try:
+                    response = await self.requester.post(batch["endpoint"], json={"gstins": chunk})
+                except requests.exceptions.RequestException:
+                    response = None
+                answered = await asyncio.to_thread(
+                    self.add_batch_responses, self.TAX_PAYER_CACHE_KEY, chunk, response, result
+                )
+                if not answered:
+                    unanswered += chunk
+            gstins = unanswered
+
+        semaphore = asyncio.Semaphore(max_workers or self.requester.pool_size)
+
+        async def lookup(gstin):
+            async with semaphore:
+                return await self.call_taxpayer_endpoint(gstin)
+
+        outcomes = await asyncio.gather(*(lookup(gstin) for gstin in gstins), return_exceptions=True)
+        self.add_lookup_outcomes(gstins, outcomes, result)
+        return result
+
+    async def call_pre_register_file_upload_endpoint(self, data):
+        """
+        Call the pre-register file upload endpoint with given data.
+
+        Args:
+            data: Data for the file upload request.
+        """
+        return await self.requester.post(self.PRE_REGISTER_FILE_UPLOAD_ENDPOINT, data=data)
+
+    async def call_tax_filing_status_endpoint(self, gstin):
+        """
+        Call the tax filing status endpoint with a given GSTIN.
+
+        Args:
+            gstin: GSTIN to be used for the request.
+
+        Returns:
+            The buffered response.
+        """
+        return await self.cached_get(self.get_tax_filing_status_lookup(gstin))
+
+    async def call_tax_filing_endpoint(self, gstin: str, return_period: str):
+        """
+        Call the tax filing endpoint with a given GSTIN and return period.
+
+        Args:
+            gstin: GSTIN to be used for the request.
+            return_period: return period for which the filing details should be fetched.
+
+        Returns:
+            The buffered response.
+        """
+        return await self.cached_get(self.get_tax_filing_lookup(gstin, return_period))
@@ -0,0 +1,282 @@
+import asyncio
+import enum
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .responses import BufferedResponse
+
+CACHE_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "api_cache.sqlite3")
+
+
+class CacheMode(enum.Enum):
+    USE = "use"  # Serve cached responses and store fresh ones.
+    REFRESH = "refresh"  # Always call the API, but store the fresh responses.
+    BYPASS = "bypass"  # Neither read nor write the cache.
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of API responses keyed by environment, endpoint, GSTIN and return period.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str = CACHE_FILE) -> None:
+        """
+        Initialize the ResponseCache, creating the database file if needed.
+
+        Args:
+            path: Path of the SQLite database file.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                environment TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                gstin TEXT NOT NULL,
+                return_period TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                content BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (environment, endpoint, gstin, return_period)
+            )
+            """
+        )
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def get_instance(cls, path: str = CACHE_FILE) -> "ResponseCache":
+        """
+        Get the shared ResponseCache for the given database file. Expired responses are deleted when it
+        is first opened, so the file does not keep growing.
+
+        Args:
+            path: Path of the SQLite database file.
+
+        Returns:
+            The ResponseCache instance.
+        """
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+                cls._instances[path].purge_expired()
+            return cls._instances[path]
+
+    def get(self, environment: str, endpoint: str, gstin: str, return_period: str = "") -> Optional[BufferedResponse]:
+        """
+        Get a cached response if there is one that has not expired.
+
+        Args:
+            environment: Environment the response was fetched from.
+            endpoint: Name of the endpoint.
+            gstin: GSTIN the response is for.
+            return_period: Return period the response is for (optional).
+
+        Returns:
+            The cached response, or None on a miss.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT status_code, content FROM responses "
+                "WHERE environment = ? AND endpoint = ? AND gstin = ? AND return_period = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (environment, endpoint, gstin, return_period, time.time()),
+            ).fetchone()
+            counters = self.counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+            counters["hits" if row else "misses"] += 1
+        if row is None:
+            return None
+        return BufferedResponse(row[0], row[1])
+
+    def set(
+        self,
+        environment: str,
+        endpoint: str,
+        gstin: str,
+        return_period: str,
+        response,
+        ttl: Optional[float],
+    ) -> None:
+        """
+        Store a response in the cache.
+
+        Args:
+            environment: Environment the response was fetched from.
+            endpoint: Name of the endpoint.
+            gstin: GSTIN the response is for.
+            return_period: Return period the response is for.
+            response: The response to store.
+            ttl: Seconds the response stays valid for, or None if it never expires.
+        """
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (environment, endpoint, gstin, return_period, response.status_code, response.content, now, expires_at),
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Delete all expired responses.
+
+        Returns:
+            Number of responses deleted.
+        """
+        with self.lock:
+            cursor = self.connection.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get the hit and miss counters of this process.
+
+        Returns:
+            Dictionary mapping endpoint names to their hit and miss counts.
+        """
+        with self.lock:
+            return {endpoint: dict(counters) for endpoint, counters in self.counters.items()}
+
+
+class SingleFlight:
+    """
+    Bounded in-memory LRU of results with single-flight semantics.
+
+    Concurrent calls for the same key share one execution of the function, and its result is
+    remembered so that later calls for the key in the same run do not execute it again.
+    """
+
+    def __init__(self, max_size: int = 10000, remember: Callable[[Any], bool] = None) -> None:
+        """
+        Initialize the SingleFlight instance.
+
+        Args:
+            max_size: Maximum number of results kept; the least recently used are evicted first.
+            remember: Predicate deciding if a result is kept for later calls (optional). Results
+                that are not kept are still shared with the calls waiting for them.
+        """
+        self.max_size = max_size
+        self.remember = remember or (lambda result: True)
+        self.lock = threading.Lock()
+        self.results: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.in_flight: Dict[Hashable, Future] = {}
+        self.async_in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.counters = {"calls": 0, "hits": 0, "shared": 0}
+
+    def _get_result(self, key: Hashable):
+        """Get a remembered result and mark it as recently used. Must be called with the lock held."""
+        self.results.move_to_end(key)
+        self.counters["hits"] += 1
+        return self.results[key]
+
+    def _store_result(self, key: Hashable, result: Any) -> None:
+        """Remember a result, evicting the least recently used one. Must be called with the lock held."""
+        if self.max_size <= 0 or not self.remember(result):
+            return
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Get the result of `fn` for the key, executing it at most once at a time per key.
+
+        Args:
+            key: Key identifying the call.
+            fn: Function producing the result.
+
+        Returns:
+            The remembered, shared or fresh result.
+        """
+        with self.lock:
+            if key in self.results:
+                return self._get_result(key)
+            future = self.in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self.in_flight[key] = Future()
+                self.counters["calls"] += 1
+            else:
+                self.counters["shared"] += 1
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.in_flight[key]
+            self._store_result(key, result)
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of `do` for coroutine functions running on one event loop.
+
+        Args:
+            key: Key identifying the call.
+            fn: Coroutine function producing the result.
+
+        Returns:
+            The remembered, shared or fresh result.
+        """
+        with self.lock:
+            if key in self.results:
+                return self._get_result(key)
+            future = self.async_in_flight.get(key)
+            if future is not None:
+                self.counters["shared"] += 1
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self.async_in_flight[key] = asyncio.get_running_loop().create_future()
+        with self.lock:
+            self.counters["calls"] += 1
+        try:
+            result = await fn()
+        except BaseException as e:
+            del self.async_in_flight[key]
+            future.set_exception(e)
+            future.exception()  # Mark the exception as retrieved when nobody else was waiting.
+            raise
+        del self.async_in_flight[key]
+        with self.lock:
+            self._store_result(key, result)
+        future.set_result(result)
+        return result
+
+    def clear(self) -> None:
+        """
+        Forget the remembered results and reset the counters. Calls in flight are still shared.
+        """
+        with self.lock:
+            self.results.clear()
+            self.counters = {"calls": 0, "hits": 0, "shared": 0}
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters of executed calls, remembered-result hits and calls that shared an in-flight call.
+
+        Returns:
+            Dictionary of the counters.
+        """
+        with self.lock:
+            return dict(self.counters)
@@ -0,0 +1,92 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON lines journal of the completed results of a long-running task.
+
+    The first line holds the context the results belong to (e.g. the return period), every other
+    line one result. A journal written for a different context is discarded when it is opened, and a
+    line cut off by a crash is ignored, so the journal can always be resumed from.
+    """
+
+    def __init__(self, path: str, context: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Initialize the CheckpointJournal. The file is only opened by `load`.
+
+        Args:
+            path: Path of the journal file.
+            context: JSON-serializable parameters the results depend on (optional).
+        """
+        self.path = path
+        self.context = context or {}
+        self.file = None
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Read the results of a previous run and open the journal for appending.
+
+        Returns:
+            Dictionary mapping the keys of the completed results to the results.
+        """
+        results = {}
+        content = ""
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as file:
+                content = file.read()
+        lines = content.splitlines()
+        if lines and self._read_line(lines[0]) == {"context": self.context}:
+            for line in lines[1:]:
+                entry = self._read_line(line)
+                if entry is not None:
+                    results[entry["key"]] = entry["result"]
+            self.file = open(self.path, "a", encoding="utf-8")
+            if not content.endswith("\n"):
+                # Terminate a line cut off by a crash, so it does not corrupt the next entry.
+                self.file.write("\n")
+        else:
+            self.file = open(self.path, "w", encoding="utf-8")
+            self._write_line({"context": self.context})
+        return results
+
+    def record(self, key: str, result: Any) -> None:
+        """
+        Append a completed result to the journal.
+
+        Args:
+            key: Key identifying the unit of work, e.g. the GSTIN.
+            result: JSON-serializable result.
+        """
+        self._write_line({"key": key, "result": result})
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self) -> None:
+        """
+        Close and delete the journal once the task has written its final output.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _write_line(self, entry: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(entry, default=str) + "\n")
+        self.file.flush()
+
+    @staticmethod
+    def _read_line(line: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
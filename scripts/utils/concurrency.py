@@ -0,0 +1,192 @@
+import asyncio
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from typing import Any, Awaitable, Callable, Deque, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Number of input files of a directory processed at the same time, unless configured otherwise.
+DEFAULT_MAX_PARALLEL_FILES = 4
+
+
+def bounded_ordered_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int,
+    window: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[R]:
+    """
+    Apply `fn` to every item on a thread pool and yield the results in input order.
+
+    Unlike `Executor.map`, items are submitted lazily: at most `window` items are in flight
+    (submitted but not yet yielded) at any time, so memory stays bounded for long inputs.
+
+    Args:
+        fn: Function to apply to each item. Exceptions raised by it are re-raised to the caller.
+        items: Items to process.
+        max_workers: Number of worker threads when no executor is given.
+        window: Maximum number of in-flight items. Defaults to twice the worker count.
+        executor: Executor to submit to (optional). A private pool is created when omitted.
+
+    Returns:
+        Iterator over the results, in the same order as `items`.
+    """
+    max_workers = max(1, max_workers)
+    window = max(1, window or max_workers * 2)
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    pending: Deque[Future] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
+
+
+def map_as_completed(fn: Callable[[T], R], items: Iterable[T], max_workers: int) -> Iterator[Tuple[T, Future]]:
+    """
+    Apply `fn` to every item on a thread pool and yield each item with its future as soon as it is done.
+
+    Exceptions are not raised but left in the futures, so one failing item does not stop the others.
+    When the caller stops iterating (e.g. on Ctrl-C), items that have not started are cancelled and
+    the running ones are left to finish in the background; the caller should tell them to stop.
+
+    Args:
+        fn: Function to apply to each item.
+        items: Items to process.
+        max_workers: Maximum number of items processed at the same time.
+
+    Returns:
+        Iterator over `(item, future)` pairs in completion order.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = {executor.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def chain_prefetched(iterables: Iterable[Iterable[T]], max_workers: int, buffer_size: int = 2) -> Iterator[T]:
+    """
+    Yield the items of every iterable in order, like `itertools.chain`, while the next iterables are
+    already consumed on a thread pool, e.g. to read the next files while the current one is processed.
+
+    Up to `max_workers` iterables are consumed at a time, each at most `buffer_size` items ahead of the
+    caller, so memory stays bounded. When the caller stops iterating, the threads stop at their next item.
+
+    Args:
+        iterables: Iterables to chain. They are iterated on the worker threads.
+        max_workers: Number of iterables consumed at the same time.
+        buffer_size: Maximum number of items of an iterable waiting for the caller (optional).
+
+    Returns:
+        Iterator over the items of all iterables. Exceptions raised by an iterable are re-raised when
+        the caller gets to it.
+    """
+    max_workers = max(1, max_workers)
+    stopped = threading.Event()
+    done = object()
+
+    def put(buffer: queue.Queue, item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def consume(iterable: Iterable[T], buffer: queue.Queue) -> None:
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(buffer, (item, None)):
+                    return
+            put(buffer, (done, None))
+        except BaseException as e:
+            put(buffer, (done, e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending: Deque[Tuple[queue.Queue, Future]] = deque()
+    iterables = iter(iterables)
+    try:
+        while True:
+            while len(pending) < max_workers:
+                iterable = next(iterables, None)
+                if iterable is None:
+                    break
+                buffer: queue.Queue = queue.Queue(maxsize=max(1, buffer_size))
+                pending.append((buffer, executor.submit(consume, iterable, buffer)))
+            if not pending:
+                return
+            buffer, _ = pending.popleft()
+            while True:
+                item, error = buffer.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    break
+                yield item
+    finally:
+        stopped.set()
+        executor.shutdown(wait=True)
+
+
+class EventLoopThread:
+    """
+    Runs an asyncio event loop on a background thread so synchronous code can drive coroutines.
+
+    `submit` has the same shape as `Executor.submit`, which lets `bounded_ordered_map` multiplex
+    coroutine functions on the loop exactly like plain functions on a thread pool.
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="event-loop", daemon=True)
+
+    def __enter__(self) -> "EventLoopThread":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def submit(self, fn: Callable[..., Awaitable[R]], *args: Any, **kwargs: Any) -> Future:
+        """
+        Schedule the coroutine function `fn` on the loop.
+
+        Args:
+            fn: Coroutine function to run.
+            *args: Positional arguments for `fn`.
+            **kwargs: Keyword arguments for `fn`.
+
+        Returns:
+            A future resolved with the result of the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(fn(*args, **kwargs), self.loop)
+
+    def run(self, fn: Callable[..., Awaitable[R]], *args: Any, **kwargs: Any) -> R:
+        """
+        Run the coroutine function `fn` on the loop and wait for its result.
+        """
+        return self.submit(fn, *args, **kwargs).result()
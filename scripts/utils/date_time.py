@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List
 
 
 def is_valid_period(period: str, format: str) -> bool:
@@ -34,3 +35,29 @@ def change_datetime_format(date_string: str, current_format: str, new_format: st
     datetime_obj = datetime.strptime(date_string, current_format)
     new_date_string = datetime_obj.strftime(new_format)
     return new_date_string
+
+
+def get_periods_in_range(start_period: str, end_period: str, format: str) -> List[str]:
+    """
+    Get every monthly period from the start period to the end period, both included.
+
+    Args:
+        start_period: The first period.
+        end_period: The last period.
+        format: The format of the periods.
+
+    Returns:
+        The periods in chronological order, in the same format. Empty if the end is before the start.
+
+    Example:
+        >>> get_periods_in_range("11-2022", "02-2023", "%m-%Y")
+        ['11-2022', '12-2022', '01-2023', '02-2023']
+    """
+    start = datetime.strptime(start_period, format)
+    end = datetime.strptime(end_period, format)
+    periods = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        periods.append(datetime(year, month, 1).strftime(format))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
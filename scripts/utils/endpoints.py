@@ -0,0 +1,69 @@
+import re
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class EndpointRegistry:
+    """
+    Lazily creates one object (limiter, retry policy, circuit breaker) per endpoint.
+
+    Endpoints are identified by their path without the query string and with numeric ids replaced,
+    so e.g. all GSTIN lookups share the `gst_lookup/taxpayer-info` entry.
+    """
+
+    DEFAULT_KEY = "default"
+
+    def __init__(self, factory: Callable[..., Any], config: Optional[Dict[str, dict]] = None) -> None:
+        """
+        Initialize the EndpointRegistry.
+
+        Args:
+            factory: Callable creating the object of an endpoint from its keyword arguments.
+            config: Keyword arguments for the factory per endpoint path (optional). The `default`
+                entry applies to endpoints without their own entry.
+        """
+        self.factory = factory
+        self.config = config or {}
+        self.items: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_endpoint_key(endpoint: str) -> str:
+        """
+        Get the registry key of an endpoint.
+
+        Args:
+            endpoint: API endpoint, possibly with a query string.
+
+        Returns:
+            The endpoint path with numeric ids replaced by `{id}`.
+        """
+        path = endpoint.split("?", 1)[0].strip("/")
+        return re.sub(r"(?<=/)\d+(?=/|$)", "{id}", path)
+
+    def get(self, endpoint: str) -> Any:
+        """
+        Get the object of an endpoint, creating it on first use.
+
+        Args:
+            endpoint: API endpoint.
+
+        Returns:
+            The object of the endpoint.
+        """
+        key = self.get_endpoint_key(endpoint)
+        with self.lock:
+            if key not in self.items:
+                self.items[key] = self.factory(**self.config.get(key, self.config.get(self.DEFAULT_KEY, {})))
+            return self.items[key]
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Get the stats of every object that has a `stats` method.
+
+        Returns:
+            Dictionary mapping endpoint keys to stats.
+        """
+        with self.lock:
+            items = dict(self.items)
+        return {key: item.stats() for key, item in items.items() if hasattr(item, "stats")}
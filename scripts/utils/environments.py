@@ -0,0 +1,7 @@
+import enum
+
+
+class Env(enum.Enum):
+    PROD = "prod"
+    QA = "qa"
+    DEV = "dev"
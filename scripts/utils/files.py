@@ -1,6 +1,8 @@
 import os
 import shutil
 
+from .profiling import MOVE_FILES, profile_phase
+
 
 def create_directory_if_not_exists(directory_path):
     """
@@ -31,6 +33,7 @@ def move_file_to_destination_dir(source_file_path: str, destination_dir: str, ca
     if os.path.exists(destination_file_path) and can_overwrite:
         os.remove(destination_file_path)
     try:
-        shutil.move(source_file_path, destination_file_path)
+        with profile_phase(MOVE_FILES):
+            shutil.move(source_file_path, destination_file_path)
     except shutil.Error as e:
         print(f"{str(e)}\n")
@@ -1,6 +1,68 @@
-import re
-from typing import Optional
-from ..utils.exceptions import ValidationError
+from typing import Any, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from ..exceptions import ValidationError
+
+GSTIN_LENGTH = 15
+CODE_POINTS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+VALID_STATE_CODES = list(range(1, 39)) + [96, 97, 99]
+
+REASON_VALID = "valid"
+REASON_BLANK = "blank"
+REASON_NOT_A_STRING = "not_a_string"
+REASON_INVALID_FORMAT = "invalid_format"
+REASON_INVALID_STATE_CODE = "invalid_state_code"
+REASON_INVALID_CHECK_DIGIT = "invalid_check_digit"
+
+REASON_MESSAGES = {
+    REASON_BLANK: "GSTIN is blank!",
+    REASON_NOT_A_STRING: "`{gstin}` should be a string!",
+    REASON_INVALID_FORMAT: "`{gstin}` is an invalid GSTIN!",
+    REASON_INVALID_STATE_CODE: "`{gstin}` has an invalid state code!",
+    REASON_INVALID_CHECK_DIGIT: "`{gstin}` has an invalid check digit!",
+}
+
+# Value of every ASCII character in the mod-36 alphabet, -1 for characters outside it.
+_CHAR_VALUES = np.full(128, -1, dtype=np.int64)
+_CHAR_VALUES[[ord(char) for char in CODE_POINTS]] = np.arange(len(CODE_POINTS))
+# Value of every character of the mod-36 alphabet, for checking one GSTIN at a time.
+_CODE_POINT_VALUES = {char: value for value, char in enumerate(CODE_POINTS)}
+
+# Character class of every GSTIN position: state code digits, PAN (5 letters, 4 digits, 1 letter),
+# entity number, the fixed 'Z' (or 'D') and the check digit.
+_DIGIT_POSITIONS = [0, 1, 7, 8, 9, 10]
+_LETTER_POSITIONS = [2, 3, 4, 5, 6, 11]
+_Z_OR_D_POSITION = 13
+
+# Luhn mod N factors of the first 14 characters: 2 for the rightmost one, alternating with 1.
+_CHECK_DIGIT_FACTORS = np.array([2 if (GSTIN_LENGTH - 2 - i) % 2 == 0 else 1 for i in range(GSTIN_LENGTH - 1)])
+
+
+class GstinValidationResult(NamedTuple):
+    """Result of validating a batch of GSTINs, with one entry per input value."""
+
+    gstins: np.ndarray  # Normalized (stripped, uppercase) GSTINs; non-string values are kept as they are.
+    is_valid: np.ndarray  # Boolean mask of the valid GSTINs.
+    reasons: np.ndarray  # Reason code of every value, `REASON_VALID` for valid GSTINs.
+
+
+class GstinPreflightResult(NamedTuple):
+    """Partition of input rows into clean unique GSTINs and rejected rows."""
+
+    gstins: List[str]  # Valid, normalized GSTINs without duplicates, in order of first appearance.
+    rejected: List[Tuple[Any, str]]  # Original value and reason message of every invalid row.
+    duplicates: int  # Number of valid rows dropped because their GSTIN appeared before.
+
+
+def _is_missing(value) -> bool:
+    """Check if a value is None or a NaN-like missing value (NaN, NaT, pandas NA)."""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except (TypeError, ValueError):
+        return True
 
 
 def calculate_check_digit(gstin_without_check_digit: str) -> str:
@@ -14,57 +76,153 @@ def calculate_check_digit(gstin_without_check_digit: str) -> str:
 
     Example:
     --------
-    >>> gstin = "27AAECS1234M1Z5"
+    >>> gstin = "27AAACO5584G1Z9"
     >>> gstin_without_check_digit = gstin[:-1]
     >>> check_digit = calculate_check_digit(gstin_without_check_digit)
     >>> check_digit
-    '5'
+    '9'
     """
     factor = 1
     total = 0
-    code_points = list(range(48, 58)) + list(range(65, 91))
-    input_mod = len(code_points)
+    input_mod = len(CODE_POINTS)
 
     for char in reversed(gstin_without_check_digit):
-        digit = code_points.index(ord(char))
+        digit = _CODE_POINT_VALUES[char]
         factor = 1 if factor % 2 == 0 else 2
         sum_of_digits = sum(divmod(digit * factor, input_mod))
         total += sum_of_digits
 
     remainder = total % input_mod
-    return chr(code_points[(input_mod - remainder) % input_mod])
+    return CODE_POINTS[(input_mod - remainder) % input_mod]
 
 
-def validate_gstin(gstin: str) -> Optional[str]:
+def validate_gstins(values: Iterable) -> GstinValidationResult:
     """
-    Validates the provided GSTIN (Goods and Services Tax Identification Number) string by
-    checking if it follows the correct format and if the check digit is correct.
+    Validates a batch of GSTINs (list, pandas Series or NumPy array) in one vectorized pass,
+    checking the format, the state code and the mod-36 check digit of every value.
 
-    :param gstin: A GSTIN string to be validated.
-    :return: The validated GSTIN string or raises ValidationError if the GSTIN is invalid.
+    Values are stripped and uppercased before validation. Only the string check runs per value in
+    Python; everything else works on a NumPy matrix of character codes.
+
+    :param values: The values to validate.
+    :return: The normalized GSTINs, a boolean mask of the valid ones and a reason code per value.
 
     Example:
     --------
-    >>> gstin = "27AAECS1234M1Z5"
-    >>> valid_gstin = validate_gstin(gstin)
-    >>> valid_gstin
-    '27AAECS1234M1Z5'
+    >>> result = validate_gstins([" 27aaaco5584g1z9", "27AAACO5584G1Z5", None])
+    >>> result.is_valid.tolist()
+    [True, False, False]
+    >>> result.reasons.tolist()
+    ['valid', 'invalid_check_digit', 'blank']
     """
-    if not isinstance(gstin, str):
-        raise ValidationError(f"`{gstin}` should be a string!")
-    gstin = gstin.strip()
-    pattern = r"^(?i)\d{2}[a-z]{5}\d{4}[a-z]\w[zd]\w$"
+    values = np.asarray(values, dtype=object).ravel()
+    count = len(values)
+    reasons = np.full(count, REASON_VALID, dtype=object)
+    gstins = values.copy()
+
+    is_string = np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=count)
+    is_missing = np.fromiter((_is_missing(value) for value in values), dtype=bool, count=count)
+    reasons[~is_string] = REASON_NOT_A_STRING
+    reasons[is_missing & ~is_string] = REASON_BLANK
+
+    string_indices = np.flatnonzero(is_string)
+    strings = np.char.upper(np.char.strip(values[string_indices].astype(str)))
+    gstins[string_indices] = strings
+    lengths = np.char.str_len(strings)
+    reasons[string_indices[lengths == 0]] = REASON_BLANK
+    reasons[string_indices[(lengths != 0) & (lengths != GSTIN_LENGTH)]] = REASON_INVALID_FORMAT
+
+    candidate_indices = string_indices[lengths == GSTIN_LENGTH]
+    candidates = strings[lengths == GSTIN_LENGTH].astype(f"U{GSTIN_LENGTH}")
+    codes = candidates.view(np.uint32).reshape(-1, GSTIN_LENGTH).astype(np.int64)
+    char_values = np.where(codes < 128, _CHAR_VALUES[np.minimum(codes, 127)], -1)
+
+    is_digit = (char_values >= 0) & (char_values < 10)
+    is_letter = char_values >= 10
+    is_well_formed = (
+        is_digit[:, _DIGIT_POSITIONS].all(axis=1)
+        & is_letter[:, _LETTER_POSITIONS].all(axis=1)
+        & (char_values >= 0).all(axis=1)
+        & np.isin(codes[:, _Z_OR_D_POSITION], [ord("Z"), ord("D")])
+    )
+    reasons[candidate_indices[~is_well_formed]] = REASON_INVALID_FORMAT
+
+    state_codes = char_values[:, 0] * 10 + char_values[:, 1]
+    has_valid_state_code = np.isin(state_codes, VALID_STATE_CODES)
+    reasons[candidate_indices[is_well_formed & ~has_valid_state_code]] = REASON_INVALID_STATE_CODE
+
+    products = char_values[:, :-1] * _CHECK_DIGIT_FACTORS
+    totals = (products // len(CODE_POINTS) + products % len(CODE_POINTS)).sum(axis=1)
+    expected_check_digits = (len(CODE_POINTS) - totals % len(CODE_POINTS)) % len(CODE_POINTS)
+    has_valid_check_digit = char_values[:, -1] == expected_check_digits
+    reasons[
+        candidate_indices[is_well_formed & has_valid_state_code & ~has_valid_check_digit]
+    ] = REASON_INVALID_CHECK_DIGIT
+
+    return GstinValidationResult(gstins, reasons == REASON_VALID, reasons)
+
+
+def get_reason_message(reason: str, gstin: Any) -> str:
+    """
+    Get the human readable message of a validation reason code.
+
+    :param reason: The reason code returned by `validate_gstins`.
+    :param gstin: The value the reason applies to.
+    :return: The message.
+    """
+    return REASON_MESSAGES[reason].format(gstin=gstin)
+
+
+def preflight_gstins(values: Iterable) -> GstinPreflightResult:
+    """
+    Prepares the GSTIN column of an input file before any network call: normalizes and validates
+    every row, drops duplicates and partitions the rows into clean GSTINs and rejects.
+
+    :param values: The GSTIN values of the input rows.
+    :return: The clean unique GSTINs, the rejected rows with their reason and the duplicate count.
+
+    Example:
+    --------
+    >>> result = preflight_gstins(["27AAACO5584G1Z9", " 27aaaco5584g1z9", "27AAACO5584G1Z5"])
+    >>> result.gstins, result.duplicates
+    (['27AAACO5584G1Z9'], 1)
+    >>> result.rejected
+    [('27AAACO5584G1Z5', '`27AAACO5584G1Z5` has an invalid check digit!')]
+    """
+    values = np.asarray(values, dtype=object).ravel()
+    result = validate_gstins(values)
 
-    if not re.match(pattern, gstin):
-        raise ValidationError(f"`{gstin}` is an invalid GSTIN!")
+    valid_gstins = result.gstins[result.is_valid].astype(str)
+    _, first_indices = np.unique(valid_gstins, return_index=True)
+    gstins = valid_gstins[np.sort(first_indices)].tolist()
 
-    gstin_without_check_digit = gstin[:-1]
-    expected_check_digit = calculate_check_digit(gstin_without_check_digit)
+    rejected = [
+        (values[index], get_reason_message(result.reasons[index], result.gstins[index]))
+        for index in np.flatnonzero(~result.is_valid)
+    ]
+    return GstinPreflightResult(gstins, rejected, len(valid_gstins) - len(gstins))
 
-    if gstin[-1] != expected_check_digit:
-        raise ValidationError(f"`{gstin}` has an invalid check digit!")
 
-    return gstin
+def validate_gstin(gstin: str) -> str:
+    """
+    Validates the provided GSTIN (Goods and Services Tax Identification Number) string by
+    checking if it follows the correct format, has a known state code and if the check digit is correct.
+
+    :param gstin: A GSTIN string to be validated.
+    :return: The validated GSTIN string (stripped and uppercased) or raises ValidationError if the GSTIN is invalid.
+
+    Example:
+    --------
+    >>> gstin = "27AAACO5584G1Z9"
+    >>> valid_gstin = validate_gstin(gstin)
+    >>> valid_gstin
+    '27AAACO5584G1Z9'
+    """
+    result = validate_gstins([gstin])
+    reason = result.reasons[0]
+    if reason != REASON_VALID:
+        raise ValidationError(get_reason_message(reason, result.gstins[0]), errors=[reason])
+    return result.gstins[0]
 
 
 def is_gstin_valid(gstin: str) -> bool:
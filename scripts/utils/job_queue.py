@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+QUEUE_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "worker_queue.sqlite3")
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class Job(NamedTuple):
+    """An input file waiting to be processed by a task."""
+
+    id: int
+    directory: str  # Watched directory the file was found in.
+    file_path: str
+    attempts: int  # Number of times the job was started, including the current one.
+
+
+class JobQueue:
+    """
+    Durable local queue of input files, stored in SQLite so jobs survive restarts of the worker.
+
+    A file is identified by its path, size and modification time: the same file is queued once, and
+    queued again when it is replaced. Jobs that were running when the worker stopped are pending again
+    when the queue is opened.
+    """
+
+    def __init__(self, path: str = QUEUE_FILE) -> None:
+        """
+        Initialize the JobQueue, creating the database file if needed.
+
+        Args:
+            path: Path of the SQLite database file.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                directory TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                not_before REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (file_path, size, mtime)
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, not_before)")
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+            (STATUS_PENDING, time.time(), STATUS_RUNNING),
+        )
+
+    def enqueue(self, directory: str, file_path: str, size: int, mtime: float) -> bool:
+        """
+        Queue an input file, unless this version of the file was queued before.
+
+        Args:
+            directory: Watched directory the file was found in.
+            file_path: Path of the input file.
+            size: Size of the file in bytes.
+            mtime: Modification time of the file.
+
+        Returns:
+            True if the file was queued.
+        """
+        now = time.time()
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO jobs "
+                "(directory, file_path, size, mtime, status, not_before, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (directory, file_path, size, mtime, STATUS_PENDING, now, now, now),
+            )
+        return cursor.rowcount > 0
+
+    def claim(self) -> Optional[Job]:
+        """
+        Take the oldest pending job that is due and mark it as running.
+
+        Returns:
+            The job, or None if no job is due.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id, directory, file_path, attempts FROM jobs WHERE status = ? AND not_before <= ? "
+                "ORDER BY not_before, id LIMIT 1",
+                (STATUS_PENDING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (STATUS_RUNNING, now, row[0]),
+            )
+        return Job(row[0], row[1], row[2], row[3] + 1)
+
+    def complete(self, job: Job) -> None:
+        self._update(job, STATUS_DONE)
+
+    def fail(self, job: Job, error: str, retry_delay: Optional[float] = None) -> None:
+        """
+        Record a failed job.
+
+        Args:
+            job: The job that failed.
+            error: Description of the failure.
+            retry_delay: Seconds after which the job is retried, or None if it is not retried.
+        """
+        if retry_delay is None:
+            self._update(job, STATUS_FAILED, error)
+        else:
+            self._update(job, STATUS_PENDING, error, time.time() + retry_delay)
+
+    def release(self, job: Job) -> None:
+        """
+        Put a job that was interrupted back in the queue, without counting the attempt.
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts - 1, updated_at = ? WHERE id = ?",
+                (STATUS_PENDING, time.time(), job.id),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Get the number of jobs per status.
+
+        Returns:
+            Dictionary of statuses to job counts.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {STATUS_PENDING: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0, **dict(rows)}
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def _update(self, job: Job, status: str, error: Optional[str] = None, not_before: Optional[float] = None) -> None:
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, not_before = ?, updated_at = ? WHERE id = ?",
+                (status, error, not_before if not_before is not None else now, now, job.id),
+            )
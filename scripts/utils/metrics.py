@@ -0,0 +1,322 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .endpoints import EndpointRegistry
+from .terminal import COLOUR_RED, format_text, print_line
+
+METRICS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "metrics")
+METRIC_PREFIX = "gst_api"
+
+# Upper bounds in seconds of the latency histogram buckets; the last bucket is unbounded.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 20, 30, 60)
+PERCENTILES = (0.5, 0.95, 0.99)
+# Name, type and description of the metrics in the Prometheus files. The values are those of the
+# last run, so counts are gauges: the file is replaced by every run.
+PROMETHEUS_METRICS = [
+    ("run_timestamp_seconds", "gauge", "Unix time the last run finished."),
+    ("run_duration_seconds", "gauge", "Duration of the last run."),
+    ("request_duration_seconds", "histogram", "Latency of the API requests of the last run."),
+    ("request_duration_quantile_seconds", "gauge", "Estimated latency percentiles of the last run."),
+    ("responses", "gauge", "API responses of the last run by status code."),
+    ("request_errors", "gauge", "API requests of the last run that failed without a response."),
+    ("sent_bytes", "gauge", "Bytes of request bodies sent in the last run."),
+    ("received_bytes", "gauge", "Bytes of response bodies received in the last run."),
+    ("retries", "gauge", "Retried API requests of the last run."),
+    ("cache_hits", "gauge", "Lookups of the last run answered by the response cache or an identical lookup."),
+]
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed buckets, so recording is O(log buckets) and memory stays constant
+    however many requests a run sends. Percentiles are interpolated within their bucket.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile of the observed latencies.
+
+        Args:
+            q: The percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            The estimated latency in seconds, or 0 if nothing was observed.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                # Only the observed range of the bucket is interpolated over.
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def cumulative_counts(self) -> List[Tuple[str, int]]:
+        """
+        Get the cumulative bucket counts, as Prometheus histograms expose them.
+
+        Returns:
+            List of (upper bound, count of observations up to it) tuples, ending with "+Inf".
+        """
+        result, total = [], 0
+        for bound, count in zip([*map(repr, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class EndpointMetrics:
+    """
+    Request metrics of a single endpoint: latencies, status codes, errors, bytes, retries and cache hits.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.status_codes: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    def record_response(self, latency: float, status_code: int, bytes_sent: int, bytes_received: int) -> None:
+        with self.lock:
+            self.latency.observe(latency)
+            self.status_codes[status_code] += 1
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+
+    def record_error(self, latency: float, error: BaseException, bytes_sent: int = 0) -> None:
+        with self.lock:
+            self.latency.observe(latency)
+            self.errors[type(error).__name__] += 1
+            self.bytes_sent += bytes_sent
+
+    def record_retry(self) -> None:
+        with self.lock:
+            self.retries += 1
+
+    def record_cache_hit(self) -> None:
+        with self.lock:
+            self.cache_hits += 1
+
+    def stats(self) -> dict:
+        """
+        Get the summary of the endpoint's metrics.
+
+        Returns:
+            Dictionary of the request count, latency percentiles in seconds, status code and error
+            counts, bytes transferred, retries and cache hits.
+        """
+        with self.lock:
+            latency = self.latency
+            return {
+                "requests": latency.count,
+                "latency": {
+                    **{f"p{round(q * 100)}": round(latency.percentile(q), 6) for q in PERCENTILES},
+                    "mean": round(latency.sum / latency.count, 6) if latency.count else 0.0,
+                    "max": round(latency.max, 6),
+                },
+                "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+                "errors": dict(self.errors),
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "retries": self.retries,
+                "cache_hits": self.cache_hits,
+            }
+
+
+class ApiMetrics(EndpointRegistry):
+    """
+    Lazily creates one EndpointMetrics per endpoint, keyed like the rate limiters.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(EndpointMetrics)
+
+    def reset(self) -> None:
+        """
+        Forget the metrics of all endpoints, e.g. at the start of a run.
+        """
+        with self.lock:
+            self.items = {}
+
+    def record_response(self, endpoint: str, latency: float, status_code: int, bytes_sent: int, bytes_received: int):
+        self.get(endpoint).record_response(latency, status_code, bytes_sent, bytes_received)
+
+    def record_error(self, endpoint: str, latency: float, error: BaseException, bytes_sent: int = 0) -> None:
+        self.get(endpoint).record_error(latency, error, bytes_sent)
+
+    def record_retry(self, endpoint: str) -> None:
+        self.get(endpoint).record_retry()
+
+    def record_cache_hit(self, endpoint: str) -> None:
+        self.get(endpoint).record_cache_hit()
+
+
+def get_body_size(body) -> int:
+    """
+    Get the size in bytes of a request body, or 0 if it is streamed from a file or generator.
+    """
+    if isinstance(body, bytes):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return 0
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    return "{" + ",".join(f'{name}="{escape_label_value(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def format_prometheus(task: str, environment: str, metrics: ApiMetrics, finished_at: float, duration: float) -> str:
+    """
+    Format the metrics of a run in the Prometheus text exposition format.
+
+    Args:
+        task: Name of the task of the run.
+        environment: Environment the API calls went to.
+        metrics: Metrics of the run.
+        finished_at: Unix time the run finished.
+        duration: Duration of the run in seconds.
+
+    Returns:
+        The metrics, for a file of the node exporter's textfile collector.
+    """
+    run_labels = {"task": task, "environment": environment}
+    samples: Dict[str, list] = {name: [] for name, _, _ in PROMETHEUS_METRICS}
+    samples["run_timestamp_seconds"].append(("", run_labels, f"{finished_at:.3f}"))
+    samples["run_duration_seconds"].append(("", run_labels, f"{duration:.3f}"))
+
+    with metrics.lock:
+        items = sorted(metrics.items.items())
+    for endpoint, item in items:
+        labels = {**run_labels, "endpoint": endpoint}
+        with item.lock:
+            for bound, count in item.latency.cumulative_counts():
+                samples["request_duration_seconds"].append(("_bucket", {**labels, "le": bound}, count))
+            samples["request_duration_seconds"].append(("_sum", labels, f"{item.latency.sum:.6f}"))
+            samples["request_duration_seconds"].append(("_count", labels, item.latency.count))
+            for q in PERCENTILES:
+                value = f"{item.latency.percentile(q):.6f}"
+                samples["request_duration_quantile_seconds"].append(("", {**labels, "quantile": str(q)}, value))
+            for code, count in sorted(item.status_codes.items()):
+                samples["responses"].append(("", {**labels, "status_code": str(code)}, count))
+            for error, count in sorted(item.errors.items()):
+                samples["request_errors"].append(("", {**labels, "error": error}, count))
+            samples["sent_bytes"].append(("", labels, item.bytes_sent))
+            samples["received_bytes"].append(("", labels, item.bytes_received))
+            samples["retries"].append(("", labels, item.retries))
+            samples["cache_hits"].append(("", labels, item.cache_hits))
+
+    lines = []
+    for name, metric_type, description in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {description}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {metric_type}")
+        for suffix, labels, value in samples[name]:
+            lines.append(f"{METRIC_PREFIX}_{name}{suffix}{format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_files(
+    task: str, environment: str, metrics: ApiMetrics, started_at: float, directory: str = METRICS_DIR
+) -> Tuple[str, str]:
+    """
+    Write the metrics of a run as a JSON summary and a Prometheus textfile.
+
+    A JSON summary is kept per run, to compare runs; the Prometheus file of a task and environment is
+    replaced by every run, as the textfile collector expects, and is written atomically.
+
+    Args:
+        task: Name of the task of the run.
+        environment: Environment the API calls went to.
+        metrics: Metrics of the run.
+        started_at: Unix time the run started.
+        directory: Directory of the metrics files (optional).
+
+    Returns:
+        Tuple of the paths of the JSON and Prometheus files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    finished_at = time.time()
+    summary = {
+        "task": task,
+        "environment": environment,
+        "started_at": datetime.fromtimestamp(started_at).isoformat(timespec="seconds"),
+        "finished_at": datetime.fromtimestamp(finished_at).isoformat(timespec="seconds"),
+        "duration_seconds": round(finished_at - started_at, 3),
+        "endpoints": metrics.stats(),
+    }
+    name = f"{task}_{environment}_{datetime.fromtimestamp(started_at):%Y%m%d%H%M%S}"
+    json_path = os.path.join(directory, f"{name}.json")
+    suffix = 1
+    while os.path.exists(json_path):
+        suffix += 1
+        json_path = os.path.join(directory, f"{name}_{suffix}.json")
+    with open(json_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    prom_path = os.path.join(directory, f"{task}_{environment}.prom")
+    with open(f"{prom_path}.tmp", "w") as f:
+        f.write(format_prometheus(task, environment, metrics, finished_at, finished_at - started_at))
+    os.replace(f"{prom_path}.tmp", prom_path)
+    return json_path, prom_path
+
+
+@contextmanager
+def record_run_metrics(
+    task: str, environment: str, metrics: ApiMetrics, directory: Optional[str] = None
+) -> Iterator[None]:
+    """
+    Record the API metrics of a task run and write them when the run ends, even if it failed.
+    Failing to write them is reported but does not fail the run.
+
+    Args:
+        task: Name of the task of the run.
+        environment: Environment the API calls go to.
+        metrics: Metrics of the API clients used by the run; they are reset when the run starts.
+        directory: Directory of the metrics files (optional). Defaults to `METRICS_DIR`.
+    """
+    metrics.reset()
+    started_at = time.time()
+    try:
+        yield
+    finally:
+        try:
+            json_path, _ = write_metrics_files(
+                task, environment or "unknown", metrics, started_at, directory or METRICS_DIR
+            )
+            print_line(f"API metrics written to {os.path.abspath(json_path)}")
+        except OSError as e:
+            print_line(format_text(f"Failed to write the API metrics. Error: {e}", colour=COLOUR_RED))
@@ -0,0 +1,307 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from .terminal import COLOUR_RED, format_text, print_line
+
+# Phases of a task run in the wall-clock breakdown.
+PARAMETERS = "parameters"
+READ_INPUT = "read input"
+FETCH = "fetch"
+WRITE_OUTPUT = "write output"
+MOVE_FILES = "move files"
+
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "profiles")
+PROFILES_DIR_NAME = "profiles"
+# Functions in the text report, by cumulative and by own time, and allocation sites in the memory snapshot.
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+# A memory snapshot is taken at the end of a phase when the traced memory has grown by this factor
+# since the last one, so the snapshot kept is the one closest to the peak without one per phase.
+SNAPSHOT_GROWTH = 1.25
+MIN_SNAPSHOT_BYTES = 1024 * 1024
+
+_active_profiler: Optional["RunProfiler"] = None
+_no_phase = nullcontext()
+
+
+class PhaseStats:
+    """
+    Timings of a phase. Phases run on several threads at once, so the wall time only counts the time at
+    least one thread was in the phase, while the thread time adds up the time of every thread.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.thread_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.active = 0
+        self.active_since = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "thread_seconds": round(self.thread_seconds, 4),
+        }
+
+
+class RunProfiler:
+    """
+    Profiles a task run: a CPU profile of all threads, the wall time per phase of the run and the peak
+    memory with a snapshot of the largest allocation sites.
+
+    The code of the run marks its phases with `profile_phase`, which does nothing when no run is
+    profiled. Profiling slows the run down, tracing the memory the most.
+
+        with RunProfiler("TaxFilingStatusTask") as profiler:
+            task.execute()
+        profiler.write_reports(directory)
+    """
+
+    def __init__(self, name: str, memory: bool = True) -> None:
+        """
+        Initialize the RunProfiler.
+
+        Args:
+            name: Name of the profiled run, used in the report file names.
+            memory: Whether the memory allocations are traced (optional).
+        """
+        self.name = name
+        self.memory = memory
+        self.lock = threading.Lock()
+        self.phases: Dict[str, PhaseStats] = {}
+        self.profiler = cProfile.Profile()
+        self.thread_profilers: List[cProfile.Profile] = []
+        self.started_at = time.time()
+        self.start_time = 0.0
+        self.wall_seconds = 0.0
+        self.peak_memory = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_memory = 0
+        self.snapshot_lock = threading.Lock()
+        self.stopped_tracing = False
+
+    def __enter__(self) -> "RunProfiler":
+        global _active_profiler
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.stopped_tracing = True
+        # Before Python 3.12 a profiler only sees the thread that enabled it, so every thread started
+        # during the run enables one of its own.
+        if sys.version_info < (3, 12):
+            threading.setprofile(self.start_thread_profiler)
+        self.started_at = time.time()
+        self.start_time = time.perf_counter()
+        _active_profiler = self
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _active_profiler
+        self.profiler.disable()
+        _active_profiler = None
+        self.wall_seconds = time.perf_counter() - self.start_time
+        if sys.version_info < (3, 12):
+            threading.setprofile(None)
+        if self.memory and tracemalloc.is_tracing():
+            self.take_snapshot(force=self.snapshot is None)
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self.stopped_tracing:
+                tracemalloc.stop()
+
+    def start_thread_profiler(self, *args) -> None:
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.thread_profilers.append(profiler)
+        # Replaces this function as the profile function of the thread.
+        profiler.enable()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time a phase of the run.
+
+        Args:
+            name: Name of the phase, e.g. `FETCH`.
+        """
+        start_time = time.perf_counter()
+        with self.lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            if not stats.active:
+                stats.active_since = start_time
+            stats.active += 1
+        try:
+            yield
+        finally:
+            end_time = time.perf_counter()
+            with self.lock:
+                stats.calls += 1
+                stats.thread_seconds += end_time - start_time
+                stats.active -= 1
+                if not stats.active:
+                    stats.wall_seconds += end_time - stats.active_since
+            if self.memory:
+                self.take_snapshot()
+
+    def take_snapshot(self, force: bool = False) -> None:
+        """
+        Take a memory snapshot if the traced memory grew enough since the last one.
+        """
+        current = tracemalloc.get_traced_memory()[0]
+        if not force and current < max(self.snapshot_memory * SNAPSHOT_GROWTH, MIN_SNAPSHOT_BYTES):
+            return
+        # Another thread taking a snapshot at the same time is close enough.
+        if self.snapshot_lock.acquire(blocking=False):
+            try:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_memory = current
+            finally:
+                self.snapshot_lock.release()
+
+    def get_stats(self) -> pstats.Stats:
+        """
+        Get the CPU profile of all threads of the run.
+        """
+        stats = pstats.Stats(self.profiler)
+        with self.lock:
+            thread_profilers = list(self.thread_profilers)
+        for profiler in thread_profilers:
+            profiler.disable()
+            try:
+                stats.add(profiler)
+            except TypeError:
+                # The thread did not run any profiled code.
+                pass
+        return stats
+
+    def get_summary(self) -> dict:
+        """
+        Get the wall-clock breakdown and the memory use of the run.
+
+        Returns:
+            Dictionary of the run's wall time, the timings per phase, the peak traced memory and the
+            largest allocation sites of the memory snapshot.
+        """
+        with self.lock:
+            phases = {name: stats.to_dict() for name, stats in self.phases.items()}
+        summary = {
+            "name": self.name,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "wall_seconds": round(self.wall_seconds, 4),
+            "phases": phases,
+        }
+        if self.memory:
+            summary["peak_memory_mb"] = round(self.peak_memory / (1024 * 1024), 2)
+            summary["memory_snapshot"] = {
+                "traced_memory_mb": round(self.snapshot_memory / (1024 * 1024), 2),
+                "top_allocations": [
+                    {
+                        "location": f"{statistic.traceback[0].filename}:{statistic.traceback[0].lineno}",
+                        "size_mb": round(statistic.size / (1024 * 1024), 3),
+                        "count": statistic.count,
+                    }
+                    for statistic in self.snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+                ]
+                if self.snapshot is not None
+                else [],
+            }
+        return summary
+
+    def format_report(self, summary: dict, stats: pstats.Stats) -> str:
+        """
+        Format the summary and the top functions of the CPU profile as a text report.
+        """
+        lines = [f"Profile of {summary['name']} started at {summary['started_at']}", ""]
+        lines.append(f"{'Phase':<16} {'Calls':>9} {'Wall s':>10} {'Share':>7} {'Thread s':>10}")
+        for name, phase in sorted(summary["phases"].items(), key=lambda item: -item[1]["wall_seconds"]):
+            share = phase["wall_seconds"] / summary["wall_seconds"] if summary["wall_seconds"] else 0
+            lines.append(
+                f"{name:<16} {phase['calls']:>9} {phase['wall_seconds']:>10.3f} {share:>7.1%} "
+                f"{phase['thread_seconds']:>10.3f}"
+            )
+        lines.append(f"{'run':<16} {'':>9} {summary['wall_seconds']:>10.3f}")
+        lines.append("Phases on several threads overlap, so their shares can add up to more than 100%.")
+
+        if self.memory:
+            snapshot = summary["memory_snapshot"]
+            lines += ["", f"Peak traced memory: {summary['peak_memory_mb']:.1f} MB"]
+            lines.append(f"Largest allocation sites at {snapshot['traced_memory_mb']:.1f} MB traced:")
+            for allocation in snapshot["top_allocations"]:
+                lines.append(f"  {allocation['size_mb']:>10.3f} MB {allocation['count']:>9} {allocation['location']}")
+
+        for sort_key in ("cumulative", "tottime"):
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats(sort_key).print_stats(TOP_FUNCTIONS)
+            lines += ["", f"Top functions by {sort_key} time:", stream.getvalue().strip()]
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, directory: str = PROFILES_DIR) -> List[str]:
+        """
+        Write the CPU profile, the JSON summary and the text report of the run.
+
+        The CPU profile is in the `pstats` format, for e.g. `python -m pstats` or snakeviz.
+
+        Args:
+            directory: Directory of the report files (optional).
+
+        Returns:
+            Paths of the written files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        base_path = os.path.join(directory, f"{self.name}_{datetime.fromtimestamp(self.started_at):%Y%m%d%H%M%S}")
+        stats = self.get_stats()
+        summary = self.get_summary()
+        stats.dump_stats(f"{base_path}.prof")
+        with open(f"{base_path}.json", "w") as f:
+            json.dump(summary, f, indent=2)
+        with open(f"{base_path}.txt", "w") as f:
+            f.write(self.format_report(summary, stats))
+        return [f"{base_path}.prof", f"{base_path}.json", f"{base_path}.txt"]
+
+
+def profile_phase(name: str):
+    """
+    Time a phase of the profiled run; does nothing when no run is profiled.
+
+        with profile_phase(READ_INPUT):
+            df = file.read()
+
+    Args:
+        name: Name of the phase, e.g. `READ_INPUT`.
+    """
+    profiler = _active_profiler
+    return profiler.phase(name) if profiler is not None else _no_phase
+
+
+def get_profiles_directory(output_directory: Optional[str]) -> str:
+    """
+    Get the directory of the profiles of a task: next to its output directory, or `PROFILES_DIR` for
+    tasks without one.
+    """
+    if not output_directory:
+        return PROFILES_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(output_directory)), PROFILES_DIR_NAME)
+
+
+def write_profile_reports(profiler: RunProfiler, directory: str) -> None:
+    """
+    Write the reports of a profiled run. Failing to write them is reported but does not fail the run.
+    """
+    try:
+        paths = profiler.write_reports(directory)
+        print_line(f"Profile written to {os.path.abspath(paths[-1])}")
+    except OSError as e:
+        print_line(format_text(f"Failed to write the profile. Error: {e}", colour=COLOUR_RED))
@@ -0,0 +1,176 @@
+import shutil
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from .terminal import COLOUR_RED, format_text, print_line, set_status_line
+
+# Seconds between refreshes of the status line on a terminal, and between progress lines otherwise.
+TTY_REFRESH_INTERVAL = 0.5
+PLAIN_REFRESH_INTERVAL = 10.0
+# Failure messages printed per refresh; the rest are only counted, the failed files have them all.
+MAX_FAILURES_PER_REFRESH = 20
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Format a duration for a progress line.
+
+    :param seconds: float - The duration in seconds.
+    :return: str - The duration, e.g. "45s", "3m05s" or "1h02m".
+
+    Example:
+    --------
+    >>> format_duration(185)
+    '3m05s'
+    """
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+class ProgressReporter:
+    """
+    Aggregate progress of a task run: completed, failed and in-flight items, throughput and ETA.
+
+    A background thread refreshes the progress at a fixed rate, so the cost does not grow with the
+    number of items. On a terminal the progress is a status line redrawn below the log; otherwise it
+    is a plain line every `PLAIN_REFRESH_INTERVAL` seconds. Failures are logged in batches at every
+    refresh instead of one line per item. All methods are thread-safe.
+
+        with ProgressReporter("GSTINs") as progress:
+            progress.add(len(gstins))
+            for gstin in gstins:
+                progress.start()
+                if fetch(gstin):
+                    progress.finish()
+                else:
+                    progress.finish(failed=True)
+                    progress.report_failure(f"Failed to fetch {gstin}")
+    """
+
+    def __init__(self, unit: str = "items", interval: Optional[float] = None) -> None:
+        """
+        Initialize the ProgressReporter.
+
+        :param unit: Name of the items in the progress line, e.g. "GSTINs".
+        :param interval: Seconds between refreshes (optional). Defaults to the interval for the output.
+        """
+        self.unit = unit
+        self.is_tty = sys.stdout.isatty()
+        self.interval = interval or (TTY_REFRESH_INTERVAL if self.is_tty else PLAIN_REFRESH_INTERVAL)
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.failures: List[str] = []
+        self.unreported_failures = 0
+        self.start_time = time.monotonic()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ProgressReporter":
+        self.start_time = time.monotonic()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stopped.set()
+        self.thread.join()
+        self.flush_failures()
+        if self.is_tty:
+            set_status_line(None)
+        print_line(self.get_status())
+
+    def add(self, count: int) -> None:
+        """
+        Add items to the total, e.g. the GSTINs of a file that is started.
+        """
+        with self.lock:
+            self.total += count
+
+    def start(self, count: int = 1) -> None:
+        """
+        Mark items as in flight.
+        """
+        with self.lock:
+            self.in_flight += count
+
+    def finish(self, failed: bool = False, count: int = 1) -> None:
+        """
+        Mark in-flight items as done.
+
+        :param failed: Whether the items failed.
+        :param count: Number of items.
+        """
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - count)
+            if failed:
+                self.failed += count
+            else:
+                self.completed += count
+
+    def skip(self, count: int) -> None:
+        """
+        Remove items from the total that do not need processing, e.g. the ones done by a previous run.
+        """
+        with self.lock:
+            self.total = max(0, self.total - count)
+
+    def report_failure(self, message: str) -> None:
+        """
+        Log a failure with the next batch of failures.
+        """
+        with self.lock:
+            if len(self.failures) < MAX_FAILURES_PER_REFRESH:
+                self.failures.append(message)
+            else:
+                self.unreported_failures += 1
+
+    def get_status(self) -> str:
+        """
+        Get the progress line.
+
+        :return: str - e.g. "GSTINs: 1200/5000 done, 12 failed, 16 in flight | 85.3 GSTINs/s | ETA 44s | ...".
+        """
+        with self.lock:
+            completed, failed, in_flight, total = self.completed, self.failed, self.in_flight, self.total
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        rate = (completed + failed) / elapsed
+        remaining = max(0, total - completed - failed)
+        eta = format_duration(remaining / rate) if rate > 0 else "-"
+        return (
+            f"{self.unit}: {completed + failed}/{total} done, {failed} failed, {in_flight} in flight"
+            f" | {rate:.1f} {self.unit}/s | ETA {eta} | elapsed {format_duration(elapsed)}"
+        )
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.refresh()
+
+    def refresh(self) -> None:
+        self.flush_failures()
+        status = self.get_status()
+        if self.is_tty:
+            width = shutil.get_terminal_size().columns
+            set_status_line(status[: max(0, width - 1)])
+        else:
+            print_line(status)
+
+    def flush_failures(self) -> None:
+        """
+        Log the failures since the last refresh.
+        """
+        with self.lock:
+            failures, self.failures = self.failures, []
+            unreported, self.unreported_failures = self.unreported_failures, 0
+        for failure in failures:
+            print_line(format_text(failure, colour=COLOUR_RED))
+        if unreported:
+            print_line(format_text(f"... and {unreported} more failures, see the failed files.", colour=COLOUR_RED))
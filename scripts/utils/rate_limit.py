@@ -0,0 +1,255 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+from .endpoints import EndpointRegistry
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date (optional).
+
+    Returns:
+        Number of seconds to wait, or None if the value is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the request rate. Not thread-safe; the owning limiter holds the lock.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        """
+        Initialize the TokenBucket.
+
+        Args:
+            rate: Tokens added per second.
+            burst: Maximum number of tokens in the bucket (optional). Defaults to one second's worth.
+        """
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise the number of seconds until the next token.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdaptiveLimiter:
+    """
+    Client-side limiter for one endpoint combining a token bucket with an AIMD concurrency limit.
+
+    The concurrency limit grows by one for every `limit` healthy responses (additive increase) and
+    is multiplied by `decrease_factor` on throttling, server errors, connection errors or when the
+    smoothed latency rises well above its baseline (multiplicative decrease). A Retry-After header
+    pauses the endpoint for the requested time.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        """
+        Initialize the AdaptiveLimiter.
+
+        Args:
+            initial_limit: Number of concurrent requests allowed at the start.
+            min_limit: Lowest concurrency limit.
+            max_limit: Highest concurrency limit.
+            rate: Maximum requests per second (optional). No rate limit when omitted.
+            burst: Token bucket capacity (optional).
+            decrease_factor: Factor the concurrency limit is multiplied by on congestion.
+            latency_tolerance: Ratio of smoothed to baseline latency treated as congestion.
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease_at = 0.0
+        self.baseline_latency = None
+        self.smoothed_latency = None
+        self.counters = {"requests": 0, "throttled": 0, "decreases": 0}
+        self.condition = threading.Condition()
+        # Futures of the async callers waiting for a slot, woken on their own loop by `release`.
+        self.async_waiters: List[asyncio.Future] = []
+
+    def _try_acquire(self) -> Optional[float]:
+        """
+        Take a slot if one is free. Must be called with the condition held.
+
+        Returns:
+            0 if a slot was taken, None if the concurrency limit is reached, otherwise the number of
+            seconds to wait for the pause or rate limit.
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        if self.bucket is not None:
+            wait = self.bucket.take()
+            if wait:
+                return wait
+        self.in_flight += 1
+        self.counters["requests"] += 1
+        return 0.0
+
+    def acquire(self) -> None:
+        """
+        Block until a request may be sent.
+        """
+        with self.condition:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return
+                self.condition.wait(timeout=wait)
+
+    async def acquire_async(self) -> None:
+        """
+        Wait on the running event loop until a request may be sent. At the concurrency limit, the caller
+        waits until `release` frees a slot instead of polling.
+        """
+        while True:
+            with self.condition:
+                wait = self._try_acquire()
+                if wait is None:
+                    waiter = asyncio.get_running_loop().create_future()
+                    self.async_waiters.append(waiter)
+            if wait == 0:
+                return
+            if wait is not None:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await waiter
+            finally:
+                with self.condition:
+                    if waiter in self.async_waiters:
+                        self.async_waiters.remove(waiter)
+
+    def release(self, status_code: Optional[int], latency: float, retry_after: Optional[float] = None) -> None:
+        """
+        Release the slot of a finished request and adapt the limits to its outcome.
+
+        Args:
+            status_code: HTTP status code, or None if no response was received.
+            latency: Seconds the request took.
+            retry_after: Seconds the server asked to wait before the next request (optional).
+        """
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+            congested = status_code is None or status_code == 429 or status_code >= 500
+            if status_code == 429:
+                self.counters["throttled"] += 1
+            if not congested:
+                congested = self._observe_latency(latency)
+
+            if congested:
+                # Only back off once per round trip, so a burst of failures of requests that were
+                # already in flight does not collapse the limit to the minimum.
+                if now - self.last_decrease_at > (self.smoothed_latency or latency):
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self.last_decrease_at = now
+                    self.counters["decreases"] += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+            waiters, self.async_waiters = self.async_waiters, []
+        for waiter in waiters:
+            if not waiter.get_loop().is_closed():
+                waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _observe_latency(self, latency: float) -> bool:
+        """
+        Track the smoothed and baseline latency. Must be called with the condition held.
+
+        Returns:
+            True if the smoothed latency is above the tolerated multiple of the baseline.
+        """
+        if self.baseline_latency is None:
+            self.baseline_latency = self.smoothed_latency = latency
+            return False
+        self.smoothed_latency = 0.8 * self.smoothed_latency + 0.2 * latency
+        # Let the baseline drift up slowly towards the smoothed latency, so it follows lasting
+        # changes in server speed instead of holding on to one unusually fast response.
+        drifted = self.baseline_latency + 0.01 * (self.smoothed_latency - self.baseline_latency)
+        self.baseline_latency = min(latency, drifted)
+        return self.smoothed_latency > self.baseline_latency * self.latency_tolerance
+
+    def stats(self) -> dict:
+        """
+        Get the current limit and counters of the limiter.
+
+        Returns:
+            Dictionary of the concurrency limit, in-flight requests and counters.
+        """
+        with self.condition:
+            return {"limit": int(self.limit), "in_flight": self.in_flight, **self.counters}
+
+
+class RateLimiterRegistry(EndpointRegistry):
+    """
+    Lazily creates one AdaptiveLimiter per endpoint.
+    """
+
+    def __init__(self, config: Optional[Dict[str, dict]] = None) -> None:
+        """
+        Initialize the RateLimiterRegistry.
+
+        Args:
+            config: AdaptiveLimiter keyword arguments per endpoint path (optional). The `default`
+                entry applies to endpoints without their own entry.
+        """
+        super().__init__(AdaptiveLimiter, config)
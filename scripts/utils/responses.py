@@ -0,0 +1,68 @@
+import json
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class BufferedResponse:
+    """
+    A fully read HTTP response.
+
+    Exposes the parts of `requests.Response` the tasks rely on, so responses that did not come
+    from `requests` (async client, cache) can be handled by the same code.
+    """
+
+    def __init__(self, status_code: int, content: bytes, headers: dict = None, url: str = "") -> None:
+        """
+        Initialize the BufferedResponse instance.
+
+        Args:
+            status_code: HTTP status code.
+            content: Raw response body.
+            headers: Response headers (optional).
+            url: URL the response was received from (optional).
+        """
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.url = url
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    def json(self, **kwargs) -> dict:
+        """
+        Decode the response body as JSON.
+
+        Returns:
+            JSON response as a dictionary.
+        """
+        try:
+            return json.loads(self.content, **kwargs)
+        except json.JSONDecodeError as e:
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos)
+
+    def iter_content(self, chunk_size: int = 1024):
+        """
+        Iterate over the response body in chunks.
+
+        Args:
+            chunk_size: Number of bytes per chunk.
+        """
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def raise_for_status(self) -> None:
+        """
+        Raise an HTTPError if the status code indicates an error.
+        """
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
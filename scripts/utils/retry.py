@@ -0,0 +1,214 @@
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import requests
+
+from .endpoints import EndpointRegistry
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Seconds the tasks pause in total for an open circuit breaker before they give up on the GSTINs they wait for.
+DEFAULT_MAX_PAUSE_SECONDS = 300
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without sending the request while the circuit breaker of an endpoint is open"""
+
+    def __init__(self, message, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """
+    Decides if and when a failed request is sent again.
+
+    Delays grow exponentially with full jitter. Requests with non-idempotent methods (e.g. POST) are
+    only retried when they certainly did not reach the server, unless `retry_non_idempotent` is set.
+
+    The policy also holds the timeouts of the endpoint's requests, so a server that accepts connections
+    but never answers fails the request and counts against the circuit breaker instead of hanging.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+        retry_non_idempotent: bool = False,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+    ) -> None:
+        """
+        Initialize the RetryPolicy.
+
+        Args:
+            max_attempts: Maximum number of attempts, including the first one.
+            base_delay: Upper bound of the delay before the first retry, in seconds.
+            max_delay: Upper bound of any delay, in seconds.
+            retry_statuses: HTTP status codes that are retried.
+            retry_non_idempotent: Whether non-idempotent requests are retried like idempotent ones.
+            connect_timeout: Seconds to wait for a connection to the server.
+            read_timeout: Seconds to wait for the server to send data, between any two bytes of the response.
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_non_idempotent = retry_non_idempotent
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Get the delay before the next attempt.
+
+        Args:
+            attempt: Number of the attempt that failed, starting at 1.
+            retry_after: Seconds the server asked to wait (optional).
+
+        Returns:
+            The delay in seconds.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0)
+
+    def is_retryable(self, method: str) -> bool:
+        return self.retry_non_idempotent or method.upper() in IDEMPOTENT_METHODS
+
+    def get_response_delay(
+        self, method: str, attempt: int, status_code: int, retry_after: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Get the delay before retrying a request that received a response.
+
+        Returns:
+            The delay in seconds, or None if the request should not be retried.
+        """
+        if attempt >= self.max_attempts or status_code not in self.retry_statuses or not self.is_retryable(method):
+            return None
+        return self.get_delay(attempt, retry_after)
+
+    def get_exception_delay(self, method: str, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Get the delay before retrying a request that failed without a response.
+
+        Returns:
+            The delay in seconds, or None if the request should not be retried.
+        """
+        if attempt >= self.max_attempts or isinstance(error, CircuitOpenError):
+            return None
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            # The connection was never established, so the request was not sent.
+            return self.get_delay(attempt)
+        if not isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return None
+        return self.get_delay(attempt) if self.is_retryable(method) else None
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and requests fail immediately
+    with CircuitOpenError. After `reset_timeout` seconds a single probe request is let through
+    (half-open); its success closes the circuit and its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Seconds callers are asked to wait while the half-open probe is in flight.
+    PROBE_WAIT = 1.0
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        """
+        Initialize the CircuitBreaker.
+
+        Args:
+            failure_threshold: Number of consecutive failures that opens the circuit.
+            reset_timeout: Seconds the circuit stays open before a probe request is allowed.
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.counters = {"opened": 0, "rejected": 0}
+        self.lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """
+        Check that a request may be sent.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or a probe request is already in flight.
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                return
+            self.counters["rejected"] += 1
+            retry_after = remaining if self.state == self.OPEN else self.PROBE_WAIT
+        raise CircuitOpenError(f"Circuit open, retry in {retry_after:.1f} seconds", retry_after)
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.counters["opened"] += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """
+        Get the state and counters of the circuit breaker.
+
+        Returns:
+            Dictionary of the state, consecutive failures and counters.
+        """
+        with self.lock:
+            return {"state": self.state, "failures": self.failures, **self.counters}
+
+
+def is_server_failure(status_code: Optional[int]) -> bool:
+    """
+    Check if a request outcome counts as a failure of the server for the circuit breaker.
+
+    Args:
+        status_code: HTTP status code, or None if no response was received.
+
+    Returns:
+        True for missing responses and 5xx status codes.
+    """
+    return status_code is None or status_code >= 500
+
+
+class RetryPolicyRegistry(EndpointRegistry):
+    """
+    Lazily creates one RetryPolicy per endpoint.
+    """
+
+    def __init__(self, config: Optional[Dict[str, dict]] = None) -> None:
+        super().__init__(RetryPolicy, config)
+
+
+class CircuitBreakerRegistry(EndpointRegistry):
+    """
+    Lazily creates one CircuitBreaker per endpoint.
+    """
+
+    def __init__(self, config: Optional[Dict[str, dict]] = None) -> None:
+        super().__init__(CircuitBreaker, config)
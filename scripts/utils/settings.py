@@ -2,9 +2,7 @@ import json
 import os
 import time
 
-import requests
-
-from .api_calls import ApiService, Env
+from .environments import Env
 from .terminal import COLOUR_RED, format_text
 
 SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "settings.json")
@@ -29,6 +27,11 @@ def save_settings(settings):
 
 
 def generate_token(environment: Env):
+    # The HTTP client is only needed to sign in, so it is not imported to show the task menu.
+    import requests
+
+    from .api_calls import ApiService
+
     api_service = ApiService(environment.value)
     simple_requests = api_service.requester
 
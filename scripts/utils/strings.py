@@ -16,3 +16,25 @@ def camel_case_to_sentence(input_string: str) -> str:
     formatted_splits: List[str] = [word.lower() if i else word.capitalize() for i, word in enumerate(splits)]
     formatted_string: str = " ".join(formatted_splits)
     return formatted_string
+
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+
+def parse_size(value: str) -> int:
+    """
+    Parses a size such as "50MB" or "1.5 GB" into bytes.
+
+    Args:
+        value (str): The size, a number with an optional unit of B, KB, MB or GB.
+
+    Returns:
+        int: The size in bytes.
+
+    Raises:
+        ValueError: If the size is not a number with a known unit.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B)?\s*", value.upper())
+    if match is None:
+        raise ValueError(f"Invalid size '{value}'. Please enter a number with a unit, e.g. 50MB.")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2) or "B"])
@@ -1,7 +1,11 @@
+import sys
+import threading
+
 BOLD = "\033[1m"
 UNDERLINE = "\033[4m"
 BLINK = "\033[5m"
 RESET = "\033[0m"
+CLEAR_LINE = "\r\033[K"
 
 COLOUR_RED = "red"
 COLOUR_BLUE = "blue"
@@ -12,6 +16,10 @@ COLOUR_YELLOW = "yellow"
 COLOUR_ORANGE = "orange"
 COLOUR_MAGENTA = "magenta"
 
+_output_lock = threading.Lock()
+# Line redrawn below the printed lines, e.g. the progress of a task; None when there is none.
+_status_line = None
+
 COLOURS = {
     COLOUR_RED: "\033[31m",
     COLOUR_BLUE: "\033[34m",
@@ -45,3 +53,31 @@ def get_clean_input(prompt: str, input_type: type = str) -> any:
     Note: ValueError is not handled in this function. The caller is responsible for handling it.
     """
     return input_type(input(prompt).strip())
+
+
+def print_line(text: str = "") -> None:
+    """
+    Print a line in a single write, so lines printed by threads processing files in parallel do not interleave.
+
+    :param text: str - The line to print, without the trailing newline.
+    """
+    with _output_lock:
+        if _status_line is None:
+            sys.stdout.write(f"{text}\n")
+        else:
+            sys.stdout.write(f"{CLEAR_LINE}{text}\n{_status_line}")
+        sys.stdout.flush()
+
+
+def set_status_line(text: str = None) -> None:
+    """
+    Show a status line below the lines printed by `print_line`, replacing the previous one. Only use it
+    when stdout is a terminal.
+
+    :param text: str - The status line, shorter than the terminal width; None removes the status line.
+    """
+    global _status_line
+    with _output_lock:
+        sys.stdout.write(f"{CLEAR_LINE}{text or ''}")
+        sys.stdout.flush()
+        _status_line = text
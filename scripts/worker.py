@@ -0,0 +1,238 @@
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Type
+
+from .exceptions import ValidationError
+from .tasks.abstract_task import BaseTask
+from .tasks.registry import discover_tasks
+from .utils.job_queue import QUEUE_FILE, Job, JobQueue
+from .utils.terminal import COLOUR_RED, format_text, print_line
+
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_SETTLE_TIME = 10.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 60.0
+
+
+def log(message: str) -> None:
+    print_line(f"{datetime.now():%Y-%m-%d %H:%M:%S} {message}")
+
+
+class WatchedDirectory:
+    """
+    A directory the worker watches, with the task that processes the files dropped in it.
+
+    The task is created once and processes all files of the directory, so its HTTP connection pools,
+    caches and token stay warm between jobs. The responses it keeps for repeated lookups within a job
+    are forgotten when the next job starts.
+    """
+
+    def __init__(self, directory: str, task_class: Type[BaseTask], params: Optional[dict] = None) -> None:
+        """
+        Initialize the WatchedDirectory.
+
+        :param directory: Directory the input files are dropped in.
+        :param task_class: Task that processes the input files.
+        :param params: Parameters of the task, as accepted by its `set_params`.
+        """
+        if task_class.process_path is BaseTask.process_path:
+            raise ValidationError(f"{task_class.__name__} can not process the files of a watched directory.")
+        if not os.path.isdir(directory):
+            raise ValidationError(f"The watched directory `{directory}` does not exist.")
+        self.directory = os.path.abspath(directory)
+        self.task_class = task_class
+        self.task = task_class()
+        self.task.set_params(self.directory, **(params or {}))
+
+    def find_input_files(self, settle_time: float) -> Dict[str, os.stat_result]:
+        """
+        Find the input files of the directory that have not changed for `settle_time` seconds, skipping
+        files that are still being copied and the lock files of spreadsheet applications.
+
+        :param settle_time: Seconds a file must be unchanged for.
+        :return: Dictionary of the paths of the files to their stat results.
+        """
+        now = time.time()
+        files = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(("~", ".")) or not entry.is_file():
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in self.task_class.input_extensions:
+                    continue
+                stat = entry.stat()
+                if now - stat.st_mtime >= settle_time:
+                    files[entry.path] = stat
+        return files
+
+
+class Worker:
+    """
+    Headless worker that processes the files dropped in watched directories.
+
+    New files are put in a durable local queue and processed one at a time by the task of their
+    directory. Like the interactive tasks, a task moves a file to the processed directory of its
+    directory when it succeeds. A file that is left in place failed, and is retried after a growing
+    delay up to `max_attempts` times; after that it stays in the directory and is only queued again
+    when it is replaced. A file that was being processed when the worker stopped is processed again
+    on the next start, resuming from the checkpoint of its task.
+    """
+
+    def __init__(
+        self,
+        watched_directories: List[WatchedDirectory],
+        queue: JobQueue,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        settle_time: float = DEFAULT_SETTLE_TIME,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+    ) -> None:
+        """
+        Initialize the Worker.
+
+        :param watched_directories: Directories to watch.
+        :param queue: Queue of the files to process.
+        :param poll_interval: Seconds between scans of the watched directories.
+        :param settle_time: Seconds a file must be unchanged before it is queued.
+        :param max_attempts: Maximum number of times a file is processed before it is given up on.
+        :param retry_delay: Seconds before the first retry of a failed file; doubles with every retry.
+        """
+        self.watched_directories: Dict[str, WatchedDirectory] = {
+            watched.directory: watched for watched in watched_directories
+        }
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "Worker":
+        """
+        Create a Worker from the `worker` section of the settings:
+
+            "worker": {
+                "watch": [
+                    {
+                        "directory": "/data/filing",
+                        "task": "TaxFilingStatusTask",
+                        "params": {"return_period": "03-2023"}
+                    },
+                    {"directory": "/data/details", "task": "TaxPayerDetailsTask"}
+                ],
+                "poll_interval": 5,
+                "settle_time": 10,
+                "max_attempts": 3,
+                "retry_delay": 60,
+                "queue_file": "worker_queue.sqlite3"
+            }
+
+        :param settings: The settings.
+        :return: The Worker.
+        """
+        config = settings.get("worker") or {}
+        if not config.get("watch"):
+            raise ValidationError("No directories to watch, add them to `worker.watch` in the settings.")
+
+        task_specs = discover_tasks()
+        watched_directories = []
+        for watch in config["watch"]:
+            task_spec = task_specs.get(watch.get("task"))
+            if task_spec is None:
+                raise ValidationError(f"Unknown task `{watch.get('task')}` for `{watch.get('directory')}`.")
+            watched = WatchedDirectory(watch.get("directory", ""), task_spec.load(), watch.get("params"))
+            watched_directories.append(watched)
+
+        return cls(
+            watched_directories,
+            JobQueue(config.get("queue_file", QUEUE_FILE)),
+            poll_interval=float(config.get("poll_interval", DEFAULT_POLL_INTERVAL)),
+            settle_time=float(config.get("settle_time", DEFAULT_SETTLE_TIME)),
+            max_attempts=int(config.get("max_attempts", DEFAULT_MAX_ATTEMPTS)),
+            retry_delay=float(config.get("retry_delay", DEFAULT_RETRY_DELAY)),
+        )
+
+    def run(self) -> None:
+        """
+        Watch the directories and process the queued files until the worker is stopped by Ctrl-C or SIGTERM.
+        """
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
+        for directory, watched in self.watched_directories.items():
+            log(f"Watching {directory} for {watched.task_class.__name__}")
+
+        next_scan = 0.0
+        try:
+            while True:
+                if time.monotonic() >= next_scan:
+                    self.scan()
+                    next_scan = time.monotonic() + self.poll_interval
+                job = self.queue.claim()
+                if job is None:
+                    time.sleep(max(0.0, min(self.poll_interval, next_scan - time.monotonic())))
+                    continue
+                self.run_job(job)
+        except KeyboardInterrupt:
+            log("Worker stopped.")
+        finally:
+            self.queue.close()
+
+    @staticmethod
+    def handle_sigterm(signum, frame) -> None:
+        raise KeyboardInterrupt()
+
+    def scan(self) -> None:
+        """
+        Queue the new input files of the watched directories.
+        """
+        for directory, watched in self.watched_directories.items():
+            try:
+                files = watched.find_input_files(self.settle_time)
+            except OSError as e:
+                log(format_text(f"Failed to scan {directory}. Error: {e}", colour=COLOUR_RED))
+                continue
+            for file_path, stat in sorted(files.items(), key=lambda item: item[1].st_mtime):
+                if self.queue.enqueue(directory, file_path, stat.st_size, stat.st_mtime):
+                    log(f"Queued {file_path}")
+
+    def run_job(self, job: Job) -> None:
+        """
+        Process a queued file with the task of its directory and record the outcome.
+
+        :param job: The job to run.
+        """
+        watched = self.watched_directories.get(job.directory)
+        if watched is None or not os.path.isfile(job.file_path):
+            reason = "the directory is no longer watched" if watched is None else "the file no longer exists"
+            log(f"Skipped {job.file_path}, {reason}.")
+            self.queue.fail(job, reason)
+            return
+
+        log(f"Processing {job.file_path} with {watched.task_class.__name__} (attempt {job.attempts})")
+        start_time = time.time()
+        try:
+            watched.task.process_path(job.file_path)
+            error = "The file was not processed." if os.path.exists(job.file_path) else None
+        except KeyboardInterrupt:
+            self.queue.release(job)
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        time_taken = time.time() - start_time
+
+        if error is None:
+            self.queue.complete(job)
+            log(f"Processed {job.file_path} in {time_taken:.2f} seconds.")
+        elif job.attempts < self.max_attempts:
+            retry_delay = self.retry_delay * 2 ** (job.attempts - 1)
+            self.queue.fail(job, error, retry_delay)
+            message = f"Failed {job.file_path}: {error} Retrying in {retry_delay:.0f} seconds."
+            log(format_text(message, colour=COLOUR_RED))
+        else:
+            self.queue.fail(job, error)
+            message = f"Failed {job.file_path}: {error} Giving up after {job.attempts} attempts."
+            log(format_text(message, colour=COLOUR_RED))
+
+        counts = self.queue.counts()
+        log(f"Queue: {counts['pending']} pending, {counts['done']} done, {counts['failed']} failed.")
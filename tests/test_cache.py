@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scripts.utils.cache import ResponseCache, SingleFlight
+from scripts.utils.responses import BufferedResponse
+
+GSTIN = "27AAACO5584G1Z9"
+
+
+def test_cached_response_is_returned_until_it_expires(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("scripts.utils.cache.time.time", lambda: now[0])
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+
+    cache.set("production", "taxpayer", GSTIN, "", BufferedResponse(200, b'{"ok": true}'), ttl=60)
+    cache.set("production", "filing", GSTIN, "2023-24", BufferedResponse(404, b"{}"), ttl=None)
+    response = cache.get("production", "taxpayer", GSTIN)
+
+    assert (response.status_code, response.content) == (200, b'{"ok": true}')
+    assert cache.get("sandbox", "taxpayer", GSTIN) is None
+    assert cache.get("production", "filing", GSTIN, "2022-23") is None
+
+    now[0] += 60
+    assert cache.get("production", "taxpayer", GSTIN) is None
+    assert cache.get("production", "filing", GSTIN, "2023-24").status_code == 404
+    assert cache.stats() == {"taxpayer": {"hits": 1, "misses": 2}, "filing": {"hits": 1, "misses": 1}}
+    assert cache.purge_expired() == 1
+
+
+def test_responses_persist_in_the_database_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path).set("production", "taxpayer", GSTIN, "", BufferedResponse(200, b"{}"), ttl=None)
+
+    cache = ResponseCache.get_instance(path)
+
+    assert cache.get("production", "taxpayer", GSTIN).content == b"{}"
+    assert ResponseCache.get_instance(path) is cache
+
+
+def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(4) as executor:
+        leader = executor.submit(single_flight.do, GSTIN, fetch)
+        started.wait(5)
+        followers = [executor.submit(single_flight.do, GSTIN, fetch) for _ in range(3)]
+        while single_flight.stats()["shared"] < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [future.result() for future in [leader, *followers]]
+
+    assert results == ["result"] * 4
+    assert calls == [1]
+    assert single_flight.do(GSTIN, fetch) == "result"
+    assert single_flight.stats() == {"calls": 1, "hits": 1, "shared": 3}
+
+
+def test_only_results_passing_the_predicate_are_remembered():
+    single_flight = SingleFlight(remember=lambda result: result != "retry later")
+    results = iter(["retry later", "result"])
+
+    assert single_flight.do(GSTIN, lambda: next(results)) == "retry later"
+    assert single_flight.do(GSTIN, lambda: next(results)) == "result"
+    assert single_flight.do(GSTIN, lambda: "not called") == "result"
+
+
+def test_failures_are_not_remembered():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        single_flight.do(GSTIN, fail)
+    assert single_flight.do(GSTIN, lambda: "result") == "result"
+
+
+def test_least_recently_used_result_is_evicted_and_clear_forgets_all():
+    single_flight = SingleFlight(max_size=2)
+    for key in ["a", "b"]:
+        single_flight.do(key, lambda: key)
+    single_flight.do("a", lambda: "fresh")
+    single_flight.do("c", lambda: "c")
+
+    assert single_flight.do("b", lambda: "fresh") == "fresh"
+    single_flight.clear()
+    assert single_flight.do("a", lambda: "fresh") == "fresh"
+    assert single_flight.stats() == {"calls": 1, "hits": 0, "shared": 0}
+
+
+def test_concurrent_async_calls_share_one_execution():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def fetch_all():
+        return await asyncio.gather(*(single_flight.do_async(GSTIN, fetch) for _ in range(4)))
+
+    assert asyncio.run(fetch_all()) == ["result"] * 4
+    assert calls == [1]
+    assert single_flight.stats() == {"calls": 1, "hits": 0, "shared": 3}
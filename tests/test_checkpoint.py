@@ -0,0 +1,43 @@
+from scripts.utils.checkpoint import CheckpointJournal
+
+CONTEXT = {"return_period": "2023-24"}
+
+
+def test_results_of_a_previous_run_are_resumed(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with CheckpointJournal(path, CONTEXT) as journal:
+        assert journal.load() == {}
+        journal.record("27AAACO5584G1Z9", {"status": "Filed"})
+        journal.record("29AAACO5584G1Z5", {"status": "Not Filed"})
+
+    with CheckpointJournal(path, CONTEXT) as journal:
+        assert journal.load() == {"27AAACO5584G1Z9": {"status": "Filed"}, "29AAACO5584G1Z5": {"status": "Not Filed"}}
+
+
+def test_line_cut_off_by_a_crash_is_ignored(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with CheckpointJournal(path, CONTEXT) as journal:
+        journal.load()
+        journal.record("a", 1)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"key": "b", "res')
+
+    with CheckpointJournal(path, CONTEXT) as journal:
+        assert journal.load() == {"a": 1}
+        journal.record("c", 3)
+    with CheckpointJournal(path, CONTEXT) as journal:
+        assert journal.load() == {"a": 1, "c": 3}
+
+
+def test_journal_of_another_context_is_discarded(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with CheckpointJournal(path, CONTEXT) as journal:
+        journal.load()
+        journal.record("a", 1)
+
+    with CheckpointJournal(path, {"return_period": "2022-23"}) as journal:
+        assert journal.load() == {}
+    with CheckpointJournal(path, CONTEXT) as journal:
+        assert journal.load() == {}
+        journal.remove()
+    assert not (tmp_path / "journal.jsonl").exists()
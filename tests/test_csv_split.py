@@ -0,0 +1,51 @@
+import pathlib
+
+import pandas as pd
+import pytest
+
+from scripts.files.csv import CsvFile, CsvSplitter
+
+HEADER = b"gstin,address\n"
+ROWS = [
+    b'27AAACO5584G1Z9,"12 Main Road,\nPune"\n',
+    b'29AAACO5584G1Z5,"Shop ""A""\n\nBengaluru"\n',
+    b"07AAACO5584G1Z1,Delhi\n",
+]
+DATA = HEADER + b"".join(ROWS * 4)
+
+
+def read_chunks(paths):
+    return [pathlib.Path(path).read_bytes() for path in paths]
+
+
+def test_quoted_newlines_do_not_split_records(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_bytes(DATA)
+
+    paths = CsvFile(str(path)).split(str(tmp_path / "chunks"), chunk_size=5)
+
+    assert read_chunks(paths) == [HEADER + b"".join((ROWS * 4)[i : i + 5]) for i in (0, 5, 10)]
+    chunks = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    pd.testing.assert_frame_equal(chunks, pd.read_csv(path))
+    assert CsvFile(str(path)).count_rows() == 12
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 16, len(DATA)])
+def test_records_cut_by_block_boundaries_are_kept_whole(tmp_path, block_size):
+    data = DATA.rstrip(b"\n")
+    with CsvSplitter(str(tmp_path), chunk_size=4) as splitter:
+        for offset in range(0, len(data), block_size):
+            splitter.feed(data[offset : offset + block_size])
+
+    assert b"".join(chunk[len(HEADER) :] for chunk in read_chunks(splitter.chunk_paths)) == data[len(HEADER) :]
+    assert splitter.chunk_row_counts == [4, 4, 4]
+
+
+def test_chunks_stay_within_the_byte_limit(tmp_path):
+    with CsvSplitter(str(tmp_path), max_chunk_bytes=len(HEADER) + 80) as splitter:
+        splitter.feed(DATA)
+
+    chunks = read_chunks(splitter.chunk_paths)
+    assert all(len(chunk) <= len(HEADER) + 80 for chunk in chunks)
+    assert b"".join(chunk[len(HEADER) :] for chunk in chunks) == DATA[len(HEADER) :]
+    assert sum(splitter.chunk_row_counts) == 12
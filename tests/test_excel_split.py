@@ -0,0 +1,41 @@
+import re
+import zipfile
+
+import pandas as pd
+import pytest
+
+from scripts.files import excel
+from scripts.files.excel import ExcelFile
+
+
+@pytest.fixture
+def stale_dimension_file(tmp_path):
+    """An Excel file of 100 rows whose sheet dimension claims it has only 10."""
+    source, path = tmp_path / "source.xlsx", tmp_path / "input.xlsx"
+    pd.DataFrame({"gstin": [f"GSTIN{i}" for i in range(100)], "row": range(100)}).to_excel(source, index=False)
+    with zipfile.ZipFile(source) as source_archive, zipfile.ZipFile(path, "w") as archive:
+        for item in source_archive.infolist():
+            data = source_archive.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1:B10"', data)
+            archive.writestr(item, data)
+    return path
+
+
+def test_split_keeps_every_row_despite_a_stale_dimension(tmp_path, stale_dimension_file):
+    output_dir = tmp_path / "chunks"
+    output_dir.mkdir()
+
+    paths = ExcelFile(str(stale_dimension_file)).split(str(output_dir), 30)
+
+    assert [len(pd.read_excel(path)) for path in paths] == [30, 30, 30, 10]
+    assert pd.concat([pd.read_excel(path) for path in paths])["row"].tolist() == list(range(100))
+    assert ExcelFile(str(stale_dimension_file)).count_rows() == 100
+
+
+def test_split_fails_when_fewer_rows_are_read_than_the_file_has(tmp_path, stale_dimension_file, monkeypatch):
+    count_sheet_rows = excel.count_sheet_rows
+    monkeypatch.setattr(excel, "count_sheet_rows", lambda *args: count_sheet_rows(*args) + 5)
+
+    with pytest.raises(ValueError, match="The file has 105 rows, but only 100 rows were read"):
+        ExcelFile(str(stale_dimension_file)).split(str(tmp_path), 30)
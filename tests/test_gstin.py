@@ -0,0 +1,49 @@
+import re
+
+import numpy as np
+
+from scripts.utils.gstin import (
+    VALID_STATE_CODES,
+    calculate_check_digit,
+    is_gstin_valid,
+    validate_gstin,
+    validate_gstins,
+)
+
+GSTIN_PATTERN = re.compile(r"^\d{2}[A-Z]{5}\d{4}[A-Z][0-9A-Z][ZD][0-9A-Z]$")
+
+
+def with_check_digit(gstin_without_check_digit):
+    return gstin_without_check_digit + calculate_check_digit(gstin_without_check_digit)
+
+
+def is_valid_one_at_a_time(value):
+    """Reference validator: checks a single value with a regex and `calculate_check_digit`."""
+    if not isinstance(value, str):
+        return False
+    gstin = value.strip().upper()
+    if not GSTIN_PATTERN.match(gstin) or int(gstin[:2]) not in VALID_STATE_CODES:
+        return False
+    return gstin[-1] == calculate_check_digit(gstin[:-1])
+
+
+def test_foreign_country_state_code_is_valid():
+    gstin = with_check_digit("96AAACO5584G1Z")
+
+    assert validate_gstin(gstin) == gstin
+    assert validate_gstins([gstin]).is_valid.tolist() == [True]
+
+
+def test_batch_validation_matches_single_value_validation():
+    valid = [with_check_digit(f"{state:02d}AAACO5584G1Z") for state in range(100)]
+    bad_check_digit = [gstin[:-1] + ("0" if gstin[-1] != "0" else "1") for gstin in valid[:10]]
+    values = valid + bad_check_digit
+    values += [f" {valid[27].lower()} ", "27AAACO5584G1Z", "27AAAC05584G1Z9", "27AAACO5584G1X9", "27ÄAACO5584G1Z9"]
+    values += ["", "   ", None, np.nan, 27, 12.5]
+
+    result = validate_gstins(values)
+
+    expected = [is_valid_one_at_a_time(value) for value in values]
+    assert result.is_valid.tolist() == expected
+    assert [is_gstin_valid(value) for value in values] == expected
+    assert np.flatnonzero(result.is_valid[: len(valid)]).tolist() == VALID_STATE_CODES
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from scripts.utils.rate_limit import AdaptiveLimiter, parse_retry_after
+
+
+def test_limit_grows_on_healthy_responses_and_halves_on_throttling():
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=8)
+
+    for _ in range(8):
+        limiter.acquire()
+        limiter.release(200, 0.01)
+    assert limiter.stats()["limit"] == 5
+
+    limiter.acquire()
+    limiter.release(429, 0.01)
+    assert limiter.stats() == {"limit": 2, "in_flight": 0, "requests": 9, "throttled": 1, "decreases": 1}
+
+
+def test_limit_stays_within_bounds():
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=1, max_limit=2)
+
+    for status_code in [None, 500, 503]:
+        limiter.last_decrease_at = 0
+        limiter.acquire()
+        limiter.release(status_code, 0.01)
+    assert limiter.stats()["limit"] == 1
+
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(200, 0.01)
+    assert limiter.stats()["limit"] == 2
+
+
+def test_retry_after_pauses_new_requests():
+    limiter = AdaptiveLimiter()
+    limiter.acquire()
+    limiter.release(429, 0.01, retry_after=30)
+
+    with limiter.condition:
+        assert 29 < limiter._try_acquire() <= 30
+
+
+def test_async_waiter_is_woken_by_a_release_from_another_thread():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+
+    async def wait_for_slot():
+        limiter.acquire()
+        threading.Timer(0.05, limiter.release, args=(200, 0.01)).start()
+        await asyncio.wait_for(limiter.acquire_async(), timeout=5)
+
+    asyncio.run(wait_for_slot())
+    assert limiter.stats()["in_flight"] == 1
+    assert limiter.async_waiters == []
+
+
+def test_cancelled_async_waiter_is_removed():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    limiter.acquire()
+
+    async def give_up():
+        try:
+            await asyncio.wait_for(limiter.acquire_async(), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(give_up())
+    assert limiter.async_waiters == []
+    assert limiter.stats()["in_flight"] == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12
+    assert parse_retry_after("-3") == 0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,67 @@
+import pytest
+import requests
+
+from scripts.utils.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, is_server_failure
+
+
+def test_retry_delays_stay_within_the_exponential_bound():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=1.5)
+
+    for attempt, bound in [(1, 0.5), (2, 1.0), (3, 1.5), (4, 1.5)]:
+        assert all(0 <= policy.get_delay(attempt) <= bound for _ in range(50))
+    assert policy.get_delay(1, retry_after=7) == 7
+
+
+def test_response_retries_depend_on_status_method_and_attempt():
+    policy = RetryPolicy(max_attempts=3)
+
+    assert policy.get_response_delay("GET", 1, 503) is not None
+    assert policy.get_response_delay("GET", 1, 404) is None
+    assert policy.get_response_delay("POST", 1, 503) is None
+    assert policy.get_response_delay("GET", 3, 503) is None
+    assert RetryPolicy(retry_non_idempotent=True).get_response_delay("POST", 1, 503) is not None
+
+
+def test_exception_retries_only_resend_requests_that_may_be_repeated():
+    policy = RetryPolicy(max_attempts=3)
+
+    assert policy.get_exception_delay("POST", 1, requests.exceptions.ConnectTimeout()) is not None
+    assert policy.get_exception_delay("POST", 1, requests.exceptions.ReadTimeout()) is None
+    assert policy.get_exception_delay("GET", 1, requests.exceptions.ReadTimeout()) is not None
+    assert policy.get_exception_delay("GET", 1, ValueError()) is None
+    assert policy.get_exception_delay("GET", 1, CircuitOpenError("open", 1.0)) is None
+
+
+def test_circuit_opens_after_consecutive_failures_and_probes_after_the_timeout(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("scripts.utils.retry.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_request()
+    assert error.value.retry_after == 10
+
+    now[0] += 10
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_request()
+    assert error.value.retry_after == CircuitBreaker.PROBE_WAIT
+
+    breaker.record_failure()
+    assert breaker.stats() == {"state": CircuitBreaker.OPEN, "failures": 3, "opened": 2, "rejected": 2}
+    now[0] += 10
+    breaker.before_request()
+    breaker.record_success()
+    breaker.before_request()
+    assert breaker.stats()["state"] == CircuitBreaker.CLOSED
+
+
+def test_server_failures_are_missing_responses_and_5xx_statuses():
+    assert is_server_failure(None)
+    assert is_server_failure(503)
+    assert not is_server_failure(429)
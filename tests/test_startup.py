@@ -0,0 +1,19 @@
+import statistics
+
+import pytest
+
+from benchmarks.startup import DEFAULT_BUDGET, DEFAULT_RUNS, measure_startup
+
+
+def test_startup_without_heavy_imports():
+    result = measure_startup()
+
+    assert result["tasks"] > 0
+    assert result["imported"] == []
+
+
+@pytest.mark.benchmark
+def test_startup_within_budget():
+    results = [measure_startup() for _ in range(DEFAULT_RUNS)]
+
+    assert statistics.median(result["elapsed"] for result in results) <= DEFAULT_BUDGET
@@ -0,0 +1,40 @@
+import tempfile
+
+import pandas as pd
+import pytest
+
+from scripts.files.writers import ExcelRowWriter
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    """Directory openpyxl streams the rows of write-only workbooks to."""
+    path = tmp_path / "temp"
+    path.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(path))
+    return path
+
+
+def test_close_creates_the_file_with_the_rows_written(tmp_path, temp_dir):
+    file_path = tmp_path / "output.xlsx"
+    with ExcelRowWriter(str(file_path), ["gstin", "details"]) as writer:
+        writer.write_row({"gstin": "27AAACO5584G1Z9", "details": {"status": "Active"}})
+        writer.write_row({"gstin": "29AAACO5584G1Z5"})
+
+    df = pd.read_excel(file_path)
+    assert df["gstin"].tolist() == ["27AAACO5584G1Z9", "29AAACO5584G1Z5"]
+    assert df["details"].tolist()[0] == "{'status': 'Active'}"
+    assert list(temp_dir.iterdir()) == []
+
+
+def test_discard_leaves_neither_the_file_nor_the_temporary_file(tmp_path, temp_dir):
+    file_path = tmp_path / "output.xlsx"
+    writer = ExcelRowWriter(str(file_path), ["gstin"])
+    writer.write_row({"gstin": "27AAACO5584G1Z9"})
+    assert list(temp_dir.iterdir()) != []
+
+    writer.discard()
+    writer.close()
+
+    assert not file_path.exists()
+    assert list(temp_dir.iterdir()) == []
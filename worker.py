@@ -0,0 +1,26 @@
+import sys
+
+from scripts.exceptions import ValidationError
+from scripts.utils.settings import load_settings
+from scripts.utils.terminal import COLOUR_RED, format_text
+from scripts.worker import Worker
+
+
+def main():
+    settings = load_settings()
+    environment = settings.get("environment")
+    if not settings.get(environment or "", {}).get("token"):
+        message = "No API token in the settings. Run executor.py once to select an environment and log in."
+        print(format_text(message, colour=COLOUR_RED, bold=True))
+        sys.exit(1)
+
+    try:
+        worker = Worker.from_settings(settings)
+    except ValidationError as e:
+        print(format_text(str(e), colour=COLOUR_RED, bold=True))
+        sys.exit(1)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()